@@ -0,0 +1,52 @@
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+from .sqlite_store import connect_store
+
+
+class AlertLedger:
+    """Persisted record of which (person, date) alerts were already delivered.
+
+    Lets the monitoring loop skip people it has already alerted today, even
+    across process restarts.
+    """
+
+    def __init__(self, path: Optional[str] = "data/alert_ledger.sqlite3"):
+        self.path = path or ":memory:"
+        self._lock = threading.Lock()
+        self._db = connect_store(
+            path,
+            "CREATE TABLE IF NOT EXISTS alerts ("
+            "person TEXT NOT NULL, day TEXT NOT NULL, alerted_at TEXT NOT NULL, PRIMARY KEY (person, day))"
+        )
+
+    @staticmethod
+    def person_key(record: Dict[str, Any]) -> str:
+        """Stable identity of a birthday/event record"""
+        return f"{record.get('name', '')}|{record.get('date', '')}"
+
+    def has_alerted(self, record: Dict[str, Any], day: date) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM alerts WHERE person = ? AND day = ?", (self.person_key(record), day.isoformat())
+            ).fetchone()
+        return row is not None
+
+    def mark_alerted(self, record: Dict[str, Any], day: date):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO alerts (person, day, alerted_at) VALUES (?, ?, ?)",
+                (self.person_key(record), day.isoformat(), datetime.now().isoformat())
+            )
+            self._db.commit()
+
+    def prune(self, before: date) -> int:
+        """Forget alerts older than ``before``; returns the number removed"""
+        with self._lock:
+            removed = self._db.execute("DELETE FROM alerts WHERE day < ?", (before.isoformat(),)).rowcount
+            self._db.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,10 +1,297 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from typing import Any, AsyncIterator, Callable, Collection, Dict, Iterator, List, Optional, Tuple
+from .cascade_scheduler import current_cascade
+from .checkpoint_store import CheckpointStore
+from .errors import LLMEmptyResponseError
+from .llm_transport import LLMTransport
+from .message_bus import MessageBus
+from .person_memory import PersonMemory
+from .precompute_store import PrecomputeStore
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+TokenListener = Callable[[str, Optional[str], str], None]
+
+# Listener of whoever started the current task's work (see ``streaming_tokens``);
+# inherited by child tasks and bus handlers like ``current_cascade``
+_context_token_listener: ContextVar[Optional[Tuple[TokenListener, Optional[Collection[str]]]]] = ContextVar(
+    "token_listener", default=None)
+
+
+@contextmanager
+def streaming_tokens(listener: TokenListener, steps: Optional[Collection[str]] = None) -> Iterator[None]:
+    """Stream completions made within this context to ``listener`` (only those of ``steps``, if given).
+
+    Covers every agent and the cascades started in the context, but unlike
+    ``Agent.add_token_listener`` leaves the agents themselves untouched: other
+    callers sharing them neither see these tokens nor get their calls streamed.
+    """
+    token = _context_token_listener.set((listener, steps))
+    try:
+        yield
+    finally:
+        _context_token_listener.reset(token)
+
+
 class Agent:
     """Base Agent class for the family connection system"""
-    
-    def __init__(self, name: str, system_prompt: str):
+
+    # Completion settings, overridden per agent
+    model = "gpt-4o"
+    max_tokens = 500
+    temperature = 0.7
+    # Seconds a completion may be served from the response cache (0 disables)
+    cache_ttl = 6 * 60 * 60
+    # Message bus topics this agent handles (topic -> method name), and the
+    # worker tasks and queue bound of each of those subscriptions
+    subscriptions: Dict[str, str] = {}
+    concurrency = 4
+    queue_size = 100
+    # Channel of this agent's entries in its interaction log (agents that keep one)
+    log_channel: Optional[str] = None
+
+    def __init__(self, name: str, system_prompt: str, transport: Optional[LLMTransport] = None):
         self.name = name
         self.system_prompt = system_prompt
-        
-    async def llm_call(self, prompt: str) -> str:
-        """Base method for LLM calls - to be implemented by subclasses"""
-        raise NotImplementedError("Subclasses must implement llm_call method") 
\ No newline at end of file
+        self.transport = transport
+        # Callbacks receiving (agent name, step, text delta) while completions stream in
+        self.token_listeners: List[TokenListener] = []
+        # Outputs generated ahead of the day (see MemoryAgent.precompute)
+        self.precomputed: Optional[PrecomputeStore] = None
+        # Running summary of earlier interactions per person (see MemoryAgent.remember_interaction)
+        self.person_memory: Optional[PersonMemory] = None
+        # Outputs of completed cascade steps, replayed when a cascade is resumed
+        self.checkpoints: Optional[CheckpointStore] = None
+        self.bus: Optional[MessageBus] = None
+
+    def subscribe(self, bus: MessageBus):
+        """Attach to ``bus`` and subscribe this agent's handlers to their topics"""
+        self.bus = bus
+        for topic, method in self.subscriptions.items():
+            bus.subscribe(topic, self.name, getattr(self, method), self.concurrency, self.queue_size)
+
+    def add_token_listener(self, listener: TokenListener):
+        """Stream all of this agent's completions to ``listener`` as they are generated"""
+        self.token_listeners.append(listener)
+
+    def remove_token_listener(self, listener: TokenListener):
+        if listener in self.token_listeners:
+            self.token_listeners.remove(listener)
+
+    def _listeners(self, step: Optional[str]) -> List[TokenListener]:
+        """This agent's token listeners plus the current context's for ``step`` (see ``streaming_tokens``)"""
+        listeners = list(self.token_listeners)
+        streaming = _context_token_listener.get()
+        if streaming is not None and (streaming[1] is None or step in streaming[1]):
+            listeners.append(streaming[0])
+        return listeners
+
+    def get_cache_ttl(self) -> float:
+        """How long this agent's completions stay valid in the response cache"""
+        return self.cache_ttl
+
+    def history(self, record: Dict[str, Any]) -> Optional[str]:
+        """What is remembered about ``record``'s person from earlier interactions, if anything"""
+        return self.person_memory.get(record) if self.person_memory is not None and record else None
+
+    def log_interaction(self, entry: Dict[str, Any], person: Optional[str] = None):
+        """Append ``entry`` to this agent's channel of ``self.interactions``, once per cascade.
+
+        A resumed cascade replays its handlers. Entries it already logged
+        before the interruption are marked in the checkpoint store and are
+        not written again.
+        """
+        cascade = current_cascade.get()
+        checkpoints = self.checkpoints if cascade else None
+        marker = f"log.{self.log_channel}.{entry.get('type', '')}"
+        if checkpoints is not None and checkpoints.has(cascade, marker):
+            return
+        entry_id = self.interactions.append(self.log_channel, entry, person=person, cascade=cascade)
+        if checkpoints is not None:
+            checkpoints.put(cascade, marker, "", str(entry_id))
+
+    def format_data(self, value: Any, **options) -> str:
+        """Serialize data for a prompt using the transport's compaction policy"""
+        return self.transport.compactor.json(value, **options)
+
+    def forward_text(self, text: str, max_chars: int) -> str:
+        """Include upstream LLM output in a prompt, truncated when compaction is on"""
+        return self.transport.compactor.text(text, max_chars)
+
+    async def llm_call(self, prompt: str, step: Optional[str] = None, max_tokens: Optional[int] = None,
+                       json_output: bool = False, deadline: Optional[float] = None,
+                       record: Optional[Dict[str, Any]] = None) -> str:
+        """Make a non-blocking call through the shared LLM transport.
+
+        ``step`` names the workflow step (e.g. "elderly.reminder") for
+        token accounting. When token listeners are registered (on the agent
+        or with ``streaming_tokens``) the completion is streamed to them while it is generated; the full text is still
+        returned. ``deadline`` overrides the transport's per-call deadline.
+        Failures raise ``LLMError`` subclasses, including
+        ``LLMEmptyResponseError`` when the provider returns no text.
+
+        The transport's router picks the model and default ``max_tokens``
+        for ``step``; output failing the step's validation is regenerated on
+        the next larger tier (streamed calls are not retried).
+
+        ``record`` is the person the prompt is about. For steps covered by
+        the transport's similarity cache, a completion for a similar prompt
+        about someone else is reused with this person's details filled in.
+
+        Inside a cascade, with a checkpoint store attached, the step's output
+        is checkpointed; a resumed cascade gets it back without an LLM call
+        as long as the prompt is unchanged.
+        """
+        if self.transport is None:
+            raise RuntimeError(f"{self.name} has no LLM transport configured")
+        cascade = current_cascade.get()
+        checkpoints = self.checkpoints if cascade and step else None
+        if checkpoints is not None:
+            content = checkpoints.get(cascade, step, prompt)
+            if content is not None:
+                with tracer.span("llm_call", agent=self.name, step=step, cascade=cascade, cache="checkpoint"):
+                    self.transport.usage.record(self.name, step, cascade, 0, 0, cached=True)
+                    for listener in self._listeners(step):
+                        listener(self.name, step, content)
+                return content
+        content = await self._similar_or_routed_call(prompt, step, max_tokens, json_output, deadline, record)
+        if checkpoints is not None:
+            checkpoints.put(cascade, step, prompt, content)
+        return content
+
+    async def _similar_or_routed_call(self, prompt: str, step: Optional[str], max_tokens: Optional[int],
+                                      json_output: bool, deadline: Optional[float],
+                                      record: Optional[Dict[str, Any]]) -> str:
+        similar = self.transport.similarity_cache
+        if record is None or similar is None or not similar.covers(step):
+            return await self._routed_call(prompt, step, max_tokens, json_output, deadline)
+        cascade = current_cascade.get()
+        with tracer.span("llm_call", agent=self.name, step=step, cascade=cascade) as span:
+            content = similar.get(step, prompt, record)
+            if content is not None:
+                span.set(cache="similar")
+            else:
+                # A similar prompt's completion may already be on its way
+                content = await similar.join(step, prompt, record)
+                if content is not None:
+                    span.set(cache="coalesced")
+            if content is not None:
+                self.transport.usage.record(self.name, step, cascade, 0, 0, cached=True)
+                for listener in self._listeners(step):
+                    listener(self.name, step, content)
+                return content
+        flight = similar.begin(step, prompt, record)
+        content = None
+        try:
+            content = await self._routed_call(prompt, step, max_tokens, json_output, deadline)
+            similar.put(step, prompt, record, content, self.get_cache_ttl())
+        finally:
+            similar.finish(flight, content)
+        return content
+
+    async def _routed_call(self, prompt: str, step: Optional[str], max_tokens: Optional[int], json_output: bool,
+                           deadline: Optional[float]) -> str:
+        router = self.transport.router
+        route = router.route(step)
+        max_tokens = max_tokens or (route.max_tokens if route else None) or self.max_tokens
+        if self._listeners(step) and not json_output:
+            if route is None:
+                return await self._llm_call_streamed(prompt, step, max_tokens, deadline, self.model)
+            tier = route.tiers[0]
+            started = time.perf_counter()
+            content = await self._llm_call_streamed(prompt, step, max_tokens, deadline, tier.model, tier.name)
+            router.record(tier, time.perf_counter() - started)
+            return content
+        if route is None:
+            return await self._complete(self.model, prompt, step, max_tokens, json_output, deadline)
+
+        for i, tier in enumerate(route.tiers):
+            last = i == len(route.tiers) - 1
+            started = time.perf_counter()
+            try:
+                content = await self._complete(tier.model, prompt, step, max_tokens, json_output, deadline, tier.name)
+            except LLMEmptyResponseError:
+                if last:
+                    raise
+                content = None
+            accepted = route.accepts(content)
+            router.record(tier, time.perf_counter() - started, fell_back=not accepted and not last)
+            if accepted or last:
+                return content
+            logger.info("%s: %s output from the %s tier failed validation, retrying on %s",
+                        self.name, step, tier.name, route.tiers[i + 1].name)
+
+    async def _complete(self, model: str, prompt: str, step: Optional[str], max_tokens: int, json_output: bool,
+                        deadline: Optional[float], tier: Optional[str] = None) -> str:
+        content = await self.transport.complete(
+            model=model,
+            system_prompt=self.system_prompt,
+            prompt=prompt,
+            max_tokens=max_tokens,
+            temperature=self.temperature,
+            cache_ttl=self.get_cache_ttl(),
+            json_output=json_output,
+            agent=self.name,
+            step=step,
+            deadline=deadline,
+            tier=tier
+        )
+        if not content:
+            raise LLMEmptyResponseError(f"{self.name} got an empty completion for {step or 'an unnamed step'}")
+        return content
+
+    async def precomputed_call(self, record: Dict[str, Any], day: date, prompt: str, step: str,
+                               context: Optional[str] = None) -> str:
+        """``llm_call`` for ``record``'s occurrence on ``day``, kept in the precompute store.
+
+        A stored output generated from the same record (and ``context``, the
+        prompt's other per-person inputs) is returned without calling the
+        LLM (and handed to token listeners in one piece).
+        """
+        if self.precomputed is not None:
+            content = self.precomputed.get(record, day, step, context)
+            if content is not None:
+                for listener in self._listeners(step):
+                    listener(self.name, step, content)
+                return content
+        content = await self.llm_call(prompt, step=step, record=record)
+        if self.precomputed is not None:
+            self.precomputed.put(record, day, step, content, context)
+        return content
+
+    async def llm_stream(self, prompt: str, step: Optional[str] = None, max_tokens: Optional[int] = None,
+                         deadline: Optional[float] = None, model: Optional[str] = None,
+                         tier: Optional[str] = None) -> AsyncIterator[str]:
+        """Async iterator over the completion's text deltas as they arrive"""
+        if self.transport is None:
+            raise RuntimeError(f"{self.name} has no LLM transport configured")
+        async for delta in self.transport.stream(
+            model=model or self.model,
+            system_prompt=self.system_prompt,
+            prompt=prompt,
+            max_tokens=max_tokens or self.max_tokens,
+            temperature=self.temperature,
+            cache_ttl=self.get_cache_ttl(),
+            agent=self.name,
+            step=step,
+            deadline=deadline,
+            tier=tier
+        ):
+            yield delta
+
+    async def _llm_call_streamed(self, prompt: str, step: Optional[str], max_tokens: Optional[int],
+                                 deadline: Optional[float], model: Optional[str] = None,
+                                 tier: Optional[str] = None) -> str:
+        chunks = []
+        async for delta in self.llm_stream(prompt, step, max_tokens, deadline, model, tier):
+            chunks.append(delta)
+            for listener in self._listeners(step):
+                listener(self.name, step, delta)
+        if not chunks:
+            raise LLMEmptyResponseError(f"{self.name} got an empty completion for {step or 'an unnamed step'}")
+        return "".join(chunks)
@@ -0,0 +1,128 @@
+import logging
+import os
+from array import array
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from .birthday_stream import iter_records
+from .contact_table import ContactTable, day_of_year
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ("birthdays", "events")
+_FEB_29 = day_of_year(2, 29)
+
+
+class BirthdayStore:
+    """Indexed view of the birthday/event data file.
+
+    Records are kept in compact ``ContactTable`` columns, with a per-day
+    index of row numbers, so looking up a date costs O(k) in the number of
+    matches instead of re-reading and re-parsing every record. The file is
+    streamed into the tables (never fully loaded as dicts) and only when
+    its mtime or size changes.
+    """
+
+    def __init__(self, data_file_path: str):
+        self.data_file_path = data_file_path
+        self.tables: Dict[str, ContactTable] = {section: ContactTable() for section in SECTIONS}
+        self._day_index: Dict[str, Dict[int, array]] = {section: {} for section in SECTIONS}
+        self._signature: Optional[Tuple[int, int]] = None
+
+    @property
+    def data(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Plain dict form of the whole file (rebuilt on access; O(N))"""
+        self.refresh()
+        return {section: table.records() for section, table in self.tables.items()}
+
+    def refresh(self) -> bool:
+        """Rebuild the index if the data file changed; return True if it was rebuilt"""
+        try:
+            stat = os.stat(self.data_file_path)
+        except FileNotFoundError:
+            if self._signature != (0, -1):
+                logger.warning("Memory Agent: Birthday file not found at %s", self.data_file_path)
+                self._load({section: ContactTable() for section in SECTIONS})
+                self._signature = (0, -1)
+                return True
+            return False
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+
+        try:
+            tables = {section: ContactTable.from_records(iter_records(self.data_file_path, section))
+                      for section in SECTIONS}
+        except ValueError:
+            logger.warning("Memory Agent: Invalid JSON in birthday file")
+            tables = {section: ContactTable() for section in SECTIONS}
+        self._load(tables)
+        self._signature = signature
+        return True
+
+    def _load(self, tables: Dict[str, ContactTable]):
+        self.tables = tables
+        for section, table in tables.items():
+            index: Dict[int, array] = {}
+            for row, day_number in enumerate(table.days):
+                index.setdefault(day_number, array('I')).append(row)
+            self._day_index[section] = index
+
+    @staticmethod
+    def _day_numbers(day: date) -> List[int]:
+        day_numbers = [day_of_year(day.month, day.day)]
+        # Feb 29 records are celebrated on Feb 28 in non-leap years
+        if day.month == 2 and day.day == 28:
+            try:
+                date(day.year, 2, 29)
+            except ValueError:
+                day_numbers.append(_FEB_29)
+        return day_numbers
+
+    def _lookup(self, section: str, day: date) -> List[Dict[str, Any]]:
+        self.refresh()
+        table = self.tables[section]
+        index = self._day_index[section]
+        # Fresh dicts, so callers can annotate records without touching the store
+        return [table.record(row) for day_number in self._day_numbers(day) for row in index.get(day_number, ())]
+
+    def birthdays_on(self, day: date) -> List[Dict[str, Any]]:
+        """Birthdays falling on the given calendar day"""
+        return self._lookup("birthdays", day)
+
+    def events_on(self, day: date) -> List[Dict[str, Any]]:
+        """Events falling on the given calendar day"""
+        return self._lookup("events", day)
+
+    def next_birthday_date(self, start: date, max_days: int = 366) -> Optional[date]:
+        """First date on or after ``start`` on which someone has a birthday"""
+        self.refresh()
+        index = self._day_index["birthdays"]
+        if not index:
+            return None
+        for offset in range(max_days + 1):
+            day = start + timedelta(days=offset)
+            if any(index.get(day_number) for day_number in self._day_numbers(day)):
+                return day
+        return None
+
+    def _lookup_range(self, section: str, start: date, end: date) -> List[Tuple[date, Dict[str, Any]]]:
+        self.refresh()
+        table = self.tables[section]
+        matches = []
+        for row in table.rows_between(start, end):
+            contact = table.contact(row)
+            occurrence = contact.occurs_on(start.year)
+            if occurrence < start:
+                occurrence = contact.occurs_on(start.year + 1)
+            matches.append((occurrence, table.record(row)))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def birthdays_between(self, start: date, end: date) -> List[Tuple[date, Dict[str, Any]]]:
+        """(occurrence date, birthday) pairs from start to end inclusive, in date order"""
+        return self._lookup_range("birthdays", start, end)
+
+    def events_between(self, start: date, end: date) -> List[Tuple[date, Dict[str, Any]]]:
+        """(occurrence date, event) pairs from start to end inclusive, in date order"""
+        return self._lookup_range("events", start, end)
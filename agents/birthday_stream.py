@@ -0,0 +1,161 @@
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+NDJSON_SUFFIXES = (".jsonl", ".ndjson")
+
+_decoder = json.JSONDecoder()
+
+
+class _ChunkReader:
+    """Incremental JSON value reader over a text file read in fixed-size chunks"""
+
+    def __init__(self, file, chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop consumed text so the buffer never holds more than ~one record
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ("" at end of file)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in birthday file, found '{found or 'end of file'}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A value ending exactly at the buffer edge (e.g. a number) may be cut short
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        """Yield the elements of the JSON array at the current position one at a time"""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in birthday file, found '{separator or 'end of file'}'")
+
+
+def _iter_document(file, section: str, chunk_size: int) -> Iterator[Dict[str, Any]]:
+    reader = _ChunkReader(file, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if reader.peek() == "[":
+            # Arrays are walked element by element, so unrelated sections are
+            # skipped without being held in memory either
+            for item in reader.array_items():
+                if key == section:
+                    yield item
+        else:
+            reader.value()
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError(f"Expected ',' or '}}' in birthday file, found '{separator or 'end of file'}'")
+
+
+def _iter_ndjson(file, section: str) -> Iterator[Dict[str, Any]]:
+    # One record per line; rows marked "kind": "event" belong to events
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        kind = "events" if record.get("kind") == "event" else "birthdays"
+        if kind == section:
+            yield record
+
+
+def iter_records(path: str, section: str = "birthdays", chunk_size: int = 64 * 1024) -> Iterator[Dict[str, Any]]:
+    """Stream records of one section ("birthdays" or "events") from a data file.
+
+    Supports NDJSON/JSON Lines files and the ``{"birthdays": [...], "events": [...]}``
+    document layout, which is parsed incrementally in ``chunk_size`` pieces.
+    Memory use stays bounded by the largest single record, not the file.
+    """
+    with open(path, 'r') as file:
+        if path.endswith(NDJSON_SUFFIXES):
+            yield from _iter_ndjson(file, section)
+        else:
+            yield from _iter_document(file, section, chunk_size)
+
+
+def month_day_keys(day: date) -> List[str]:
+    """"MM-DD" suffixes of record dates that fall on ``day``"""
+    keys = [f"{day.month:02d}-{day.day:02d}"]
+    # Feb 29 records are celebrated on Feb 28 in non-leap years
+    if day.month == 2 and day.day == 28 and not (day.year % 4 == 0 and (day.year % 100 != 0 or day.year % 400 == 0)):
+        keys.append("02-29")
+    return keys
+
+
+def falls_on(record: Dict[str, Any], keys: List[str]) -> bool:
+    """Whether a record's "YYYY-MM-DD" date matches one of the ``month_day_keys``"""
+    record_date = record.get("date")
+    # Cheap string comparison instead of strptime on every record
+    return isinstance(record_date, str) and len(record_date) == 10 and record_date[5:] in keys
+
+
+
+def next_occurrence(records: Iterable[Dict[str, Any]], start: date, max_days: int = 366) -> Optional[date]:
+    """First date on or after ``start`` that one of ``records`` falls on, in one pass over them.
+
+    Only the distinct "MM-DD" keys are kept (at most 366), so a streamed
+    file is never held in memory.
+    """
+    keys = {record["date"][5:] for record in records
+            if isinstance(record.get("date"), str) and len(record["date"]) == 10}
+    if not keys:
+        return None
+    for offset in range(max_days + 1):
+        day = start + timedelta(days=offset)
+        if any(key in keys for key in month_day_keys(day)):
+            return day
+    return None
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from datetime import date
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, List, Optional
+from .precompute_store import PrecomputeStore
+from .tracing import tracer
+
+# Id of the cascade the current task belongs to; inherited by child tasks,
+# so every LLM call made on behalf of a cascade can be attributed to it
+current_cascade: ContextVar[Optional[str]] = ContextVar("current_cascade", default=None)
+
+
+class CascadeResult:
+    """Outcome and latency of one birthday reminder cascade"""
+
+    __slots__ = ("key", "cascade_id", "started_at", "latency", "error")
+
+    def __init__(self, key: str, cascade_id: str, started_at: float, latency: float, error: Optional[BaseException] = None):
+        self.key = key
+        self.cascade_id = cascade_id
+        self.started_at = started_at
+        self.latency = latency
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "cascade_id": self.cascade_id,
+            "latency": round(self.latency, 3),
+            "ok": self.ok,
+            "error": repr(self.error) if self.error else None
+        }
+
+
+class CascadeScheduler:
+    """Runs reminder cascades concurrently with a cap on cascades in flight.
+
+    Different people are processed in parallel, while cascades for the same
+    person (same key) are serialized in submission order so each person's
+    own steps never interleave. A cascade's id combines the key, a
+    fingerprint of the record and the date, so it is the same when the
+    cascade is resumed but differs between two people sharing a name.
+    """
+
+    def __init__(self, max_concurrent_cascades: int = 10):
+        self.max_concurrent_cascades = max_concurrent_cascades
+        self.last_results: List[CascadeResult] = []
+
+    def _make_runner(self, handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+                     key: Callable[[Dict[str, Any]], str]) -> Callable[[Dict[str, Any]], Awaitable[CascadeResult]]:
+        semaphore = asyncio.Semaphore(self.max_concurrent_cascades)
+        person_locks: Dict[str, asyncio.Lock] = {}
+
+        async def run_one(item: Dict[str, Any]) -> CascadeResult:
+            item_key = key(item)
+            cascade_id = f"{item_key}#{PrecomputeStore.fingerprint(item)[:12]}@{date.today().isoformat()}"
+            lock = person_locks.setdefault(item_key, asyncio.Lock())
+            queued_at = time.perf_counter()
+            async with lock:
+                async with semaphore:
+                    current_cascade.set(cascade_id)
+                    started_at = time.perf_counter()
+                    error = None
+                    with tracer.span("cascade", cascade=cascade_id, queue_wait=started_at - queued_at) as span:
+                        try:
+                            await handler(item)
+                        except Exception as e:
+                            error = e
+                            span.set(error=repr(e))
+                    return CascadeResult(item_key, cascade_id, started_at, time.perf_counter() - started_at, error)
+
+        return run_one
+
+    async def run(self, items: List[Dict[str, Any]], handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+                  key: Callable[[Dict[str, Any]], str] = lambda item: item.get("name", "")) -> List[CascadeResult]:
+        """Run ``handler`` for every item and return per-cascade results in input order"""
+        run_one = self._make_runner(handler, key)
+        results = await asyncio.gather(*(run_one(item) for item in items))
+        self.last_results = list(results)
+        return self.last_results
+
+    async def run_stream(self, items: AsyncIterable[Dict[str, Any]], handler: Callable[[Dict[str, Any]], Awaitable[Any]],
+                         key: Callable[[Dict[str, Any]], str] = lambda item: item.get("name", "")) -> List[CascadeResult]:
+        """Like ``run``, but starts each cascade as soon as its item arrives from an async iterator"""
+        run_one = self._make_runner(handler, key)
+        tasks = []
+        async for item in items:
+            tasks.append(asyncio.ensure_future(run_one(item)))
+        results = await asyncio.gather(*tasks)
+        self.last_results = list(results)
+        return self.last_results
+
+    @staticmethod
+    def summarize(results: List[CascadeResult]) -> Dict[str, Any]:
+        """Aggregate latency figures for a batch of cascades"""
+        latencies = sorted(r.latency for r in results)
+        if not latencies:
+            return {"cascades": 0, "failed": 0}
+        return {
+            "cascades": len(latencies),
+            "failed": sum(1 for r in results if not r.ok),
+            "min": round(latencies[0], 3),
+            "median": round(latencies[len(latencies) // 2], 3),
+            "max": round(latencies[-1], 3)
+        }
@@ -0,0 +1,79 @@
+import threading
+from datetime import date, datetime
+from typing import List, Optional
+from .sqlite_store import connect_store
+
+
+class CheckpointStore:
+    """Durable inputs and outputs of each completed cascade step.
+
+    Entries are keyed by (cascade id, step). An output is only served for
+    the same prompt it was generated from, so a step whose inputs changed is
+    regenerated. After a crash, re-running a cascade returns its completed
+    steps from here, and only the steps still missing call the LLM. A
+    cascade's checkpoints are cleared once it has finished.
+    """
+
+    def __init__(self, path: Optional[str] = "data/checkpoints.sqlite3"):
+        self.path = path or ":memory:"
+        self._lock = threading.Lock()
+        self._db = connect_store(
+            path,
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "cascade TEXT NOT NULL, step TEXT NOT NULL, prompt TEXT NOT NULL, output TEXT NOT NULL, "
+            "created_at TEXT NOT NULL, PRIMARY KEY (cascade, step))"
+        )
+        self.stats = {"restored": 0, "missing": 0, "changed": 0, "saved": 0, "cleared": 0}
+
+    def get(self, cascade: str, step: str, prompt: str) -> Optional[str]:
+        """The saved output of ``step`` in ``cascade``, or None if missing or made from another prompt"""
+        with self._lock:
+            row = self._db.execute("SELECT prompt, output FROM checkpoints WHERE cascade = ? AND step = ?",
+                                   (cascade, step)).fetchone()
+            if row is None:
+                self.stats["missing"] += 1
+                return None
+            if row[0] != prompt:
+                self.stats["changed"] += 1
+                return None
+            self.stats["restored"] += 1
+            return row[1]
+
+    def has(self, cascade: str, step: str) -> bool:
+        """Whether ``step`` of ``cascade`` completed, whatever its prompt"""
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM checkpoints WHERE cascade = ? AND step = ?",
+                                    (cascade, step)).fetchone() is not None
+
+    def put(self, cascade: str, step: str, prompt: str, output: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints (cascade, step, prompt, output, created_at) VALUES (?, ?, ?, ?, ?)",
+                (cascade, step, prompt, output, datetime.now().isoformat())
+            )
+            self._db.commit()
+            self.stats["saved"] += 1
+
+    def clear(self, cascade: str):
+        """Forget a finished cascade's checkpoints"""
+        with self._lock:
+            self._db.execute("DELETE FROM checkpoints WHERE cascade = ?", (cascade,))
+            self._db.commit()
+            self.stats["cleared"] += 1
+
+    def pending(self) -> List[str]:
+        """Cascades with checkpoints that never finished"""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT cascade FROM checkpoints ORDER BY cascade")]
+
+    def prune(self, before: date) -> int:
+        """Forget checkpoints written before ``before`` (their cascades' day has passed); returns rows removed"""
+        with self._lock:
+            removed = self._db.execute("DELETE FROM checkpoints WHERE created_at < ?",
+                                       (before.isoformat(),)).rowcount
+            self._db.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,198 @@
+import logging
+import sys
+from array import array
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # optional: vectorized queries fall back to pure Python scans
+    np = None
+
+# Days are numbered in a leap-year calendar so Feb 29 always has its own slot
+_LEAP_YEAR = 2000
+_FEB_29 = 60
+_KNOWN_FIELDS = ("name", "relationship", "date", "type", "age", "interests", "notes")
+
+
+def day_of_year(month: int, day: int) -> int:
+    """1-based day number of (month, day) in a leap-year calendar (Feb 29 = 60)"""
+    return date(_LEAP_YEAR, month, day).timetuple().tm_yday
+
+
+def _month_day(day_number: int) -> Tuple[int, int]:
+    day = date(_LEAP_YEAR, 1, 1) + timedelta(days=day_number - 1)
+    return day.month, day.day
+
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+class Contact:
+    """Lightweight read-only view of one contact row"""
+
+    __slots__ = ("name", "relationship", "day_of_year", "year", "age", "interests", "notes", "type")
+
+    def __init__(self, name: str, relationship: Optional[str], day_of_year: int, year: int, age: Optional[int],
+                 interests: Tuple[str, ...], notes: Optional[str], type: Optional[str]):
+        self.name = name
+        self.relationship = relationship
+        self.day_of_year = day_of_year
+        self.year = year
+        self.age = age
+        self.interests = interests
+        self.notes = notes
+        self.type = type
+
+    def occurs_on(self, year: int) -> date:
+        """Calendar date of this contact's anniversary in ``year``"""
+        month, day = _month_day(self.day_of_year)
+        if (month, day) == (2, 29) and not _is_leap(year):
+            return date(year, 2, 28)
+        return date(year, month, day)
+
+
+class ContactTable:
+    """Column-oriented, compact in-memory store of birthday or event records.
+
+    Instead of one dict per record, each field lives in its own column:
+    day-of-year, year and age as packed machine integers, and repeated
+    strings (relationship, event type, interests) interned into a shared
+    vocabulary. Date matching compares small ints, vectorized with NumPy
+    when it is installed, so records never need their dates re-parsed.
+    """
+
+    def __init__(self):
+        self.vocabulary: List[Optional[str]] = [None]
+        self._vocabulary_ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.relationship_ids = array('H')
+        self.type_ids = array('H')
+        self.days = array('H')
+        self.years = array('H')
+        self.ages = array('h')
+        self.interests: List[Tuple[str, ...]] = []
+        self.notes: List[Optional[str]] = []
+        # Unknown extra fields, stored only for the rare rows that have them
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        self._np_days = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        vocabulary_id = self._vocabulary_ids.get(value)
+        if vocabulary_id is None:
+            vocabulary_id = len(self.vocabulary)
+            self.vocabulary.append(sys.intern(value))
+            self._vocabulary_ids[value] = vocabulary_id
+        return vocabulary_id
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Add a record with a "YYYY-MM-DD" date and return its row number"""
+        record_date = record["date"]
+        year, month, day = int(record_date[0:4]), int(record_date[5:7]), int(record_date[8:10])
+        day_number = day_of_year(month, day)
+        if len(record_date) != 10 or (month, day) == (2, 29) and not _is_leap(year):
+            raise ValueError(f"Invalid date {record_date!r}")
+
+        row = len(self.names)
+        self.names.append(record.get("name", "Unknown"))
+        self.relationship_ids.append(self._intern(record.get("relationship")))
+        self.type_ids.append(self._intern(record.get("type")))
+        self.days.append(day_number)
+        self.years.append(year)
+        extra = {key: value for key, value in record.items() if key not in _KNOWN_FIELDS}
+        age = record.get("age")
+        if isinstance(age, int) and not isinstance(age, bool) and 0 <= age < 32768:
+            self.ages.append(age)
+        else:
+            self.ages.append(-1)
+            if age is not None:
+                extra["age"] = age
+        interests = record.get("interests")
+        if isinstance(interests, list) and all(isinstance(interest, str) for interest in interests):
+            self.interests.append(tuple(self.vocabulary[self._intern(interest)] for interest in interests))
+        else:
+            self.interests.append(())
+            if interests is not None:
+                extra["interests"] = interests
+        self.notes.append(record.get("notes"))
+        if extra:
+            self.extras[row] = extra
+        self._np_days = None
+        return row
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "ContactTable":
+        table = cls()
+        for record in records:
+            try:
+                table.append(record)
+            except (KeyError, TypeError, ValueError):
+                logger.warning("Memory Agent: Invalid date format for %s", record.get('name', 'Unknown'))
+        return table
+
+    def contact(self, row: int) -> Contact:
+        age = self.ages[row]
+        return Contact(
+            self.names[row], self.vocabulary[self.relationship_ids[row]], self.days[row], self.years[row],
+            age if age >= 0 else None, self.interests[row], self.notes[row], self.vocabulary[self.type_ids[row]]
+        )
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Rebuild the plain dict form of a row (the shape used in prompts)"""
+        month, day = _month_day(self.days[row])
+        record: Dict[str, Any] = {"name": self.names[row]}
+        relationship = self.vocabulary[self.relationship_ids[row]]
+        if relationship is not None:
+            record["relationship"] = relationship
+        record["date"] = f"{self.years[row]:04d}-{month:02d}-{day:02d}"
+        record_type = self.vocabulary[self.type_ids[row]]
+        if record_type is not None:
+            record["type"] = record_type
+        if self.ages[row] >= 0:
+            record["age"] = self.ages[row]
+        if self.interests[row]:
+            record["interests"] = list(self.interests[row])
+        if self.notes[row] is not None:
+            record["notes"] = self.notes[row]
+        record.update(self.extras.get(row, {}))
+        return record
+
+    def records(self, rows: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        return [self.record(row) for row in (range(len(self)) if rows is None else rows)]
+
+    def _day_numbers_between(self, start: date, end: date) -> List[Tuple[int, int]]:
+        # Inclusive day-number ranges covering start..end, split at the year boundary
+        if (end - start).days >= 365:
+            return [(1, 366)]
+        first = day_of_year(start.month, start.day)
+        last = day_of_year(end.month, end.day)
+        # In non-leap years Feb 29 birthdays are celebrated on Feb 28
+        if (end.month, end.day) == (2, 28) and not _is_leap(end.year):
+            last = _FEB_29
+        if start.year == end.year:
+            return [(first, last)]
+        return [(first, 366), (1, last)]
+
+    def rows_between(self, start: date, end: date) -> List[int]:
+        """Row numbers whose anniversary falls between start and end inclusive"""
+        # Lookup table of wanted day numbers, applied to the whole day column
+        wanted = bytearray(367)
+        for first, last in self._day_numbers_between(start, end):
+            wanted[first:last + 1] = b"\x01" * (last - first + 1)
+        if np is not None:
+            if self._np_days is None:
+                self._np_days = np.array(self.days, dtype=np.uint16)
+            return np.flatnonzero(np.frombuffer(bytes(wanted), dtype=bool)[self._np_days]).tolist()
+        return [row for row, day_number in enumerate(self.days) if wanted[day_number]]
+
+    def rows_on(self, day: date) -> List[int]:
+        """Row numbers whose anniversary falls on the given day"""
+        return self.rows_between(day, day)
@@ -1,12 +1,23 @@
-import asyncio
-import json
-from datetime import datetime
-from typing import Dict, Any
+import logging
+from datetime import date, datetime
+from typing import Dict, Any, Optional
 from .base_agent import Agent
-import openai
+from .llm_transport import LLMTransport, get_shared_transport
+from .interaction_log import InteractionLog
+from .precompute_store import PrecomputeStore
+from .workflow import Workflow, Step
+from .prompt_compaction import PERSON_FIELDS
+
+logger = logging.getLogger(__name__)
 
 class ElderlyAgent(Agent):
-    def __init__(self, openai_api_key: str):
+    max_tokens = 300
+    temperature = 0.8
+    log_channel = "elderly"
+    subscriptions = {"remind_birthday": "remind_birthday"}
+    
+    def __init__(self, openai_api_key: str, transport: Optional[LLMTransport] = None,
+                 interaction_log: Optional[InteractionLog] = None, precomputed: Optional[PrecomputeStore] = None):
         super().__init__(
             name="Elderly Agent",
             system_prompt="""You are a friendly, empathetic AI assistant designed specifically for elderly users. 
@@ -17,54 +28,77 @@ class ElderlyAgent(Agent):
             4. Use simple, clear language that's easy to understand
             5. Be patient and supportive
             
-            Always speak in a warm, conversational tone as if talking to a dear friend."""
+            Always speak in a warm, conversational tone as if talking to a dear friend.""",
+            transport=transport or get_shared_transport(openai_api_key)
         )
-        self.openai_client = openai.OpenAI(api_key=openai_api_key)
         self.master_agent = None
-        self.user_responses = []
+        # Bounded in memory; persisted when the log has a path
+        self.interactions = interaction_log or InteractionLog(None)
+        self.precomputed = precomputed
         
     def register_master_agent(self, master_agent):
-        """Register the master agent for communication"""
+        """Register the master agent and subscribe to its reminders"""
         self.master_agent = master_agent
-        print(f"Elderly Agent: Registered with Master Agent")
+        self.subscribe(master_agent.bus)
+        logger.info("Elderly Agent: Registered with Master Agent")
         
     async def remind_birthday(self, birthday_info: Dict[str, Any], master_guidance: str):
         """Remind the elderly user about a birthday using LLM-generated personalized message"""
         name = birthday_info.get("name", "someone")
-        relationship = birthday_info.get("relationship", "family member")
         
+        # Follow-up suggestions only depend on the name, not on the reminder text
+        suggestions_prompt = f"""
+        Based on the birthday reminder for {name}, generate 3-4 simple suggestions for the elderly user.
+        Make them actionable and easy to understand.
+        Examples: "Would you like to call them?", "Should I help you send a message?"
+        """
+        
+        async def reminder_step(results: Dict[str, Any]) -> str:
+            reminder_message = await self.prepare_reminder(birthday_info, master_guidance, date.today())
+            logger.info("Elderly Agent: %s", reminder_message)
+            return reminder_message
+            
+        async def suggestions_step(results: Dict[str, Any]) -> str:
+            suggestions_response = await self.llm_call(suggestions_prompt, step="elderly.suggestions")
+            logger.info("Elderly Agent Suggestions: %s", suggestions_response)
+            return suggestions_response
+            
+        async def user_response_step(results: Dict[str, Any]):
+            # Simulate user response for demo
+            await self.simulate_user_response(birthday_info, results["reminder"])
+            
+        # Reminder and suggestions run concurrently; the simulated response
+        # (and the rest of the cascade) starts as soon as the reminder is ready
+        workflow = Workflow([
+            Step("reminder", reminder_step),
+            Step("suggestions", suggestions_step),
+            Step("user_response", user_response_step, depends_on=["reminder"])
+        ])
+        await workflow.run()
+        
+    async def prepare_reminder(self, birthday_info: Dict[str, Any], master_guidance: str, day: date) -> str:
+        """Personalized reminder text for a birthday on ``day`` (precomputed when available)"""
         # Use LLM to generate a personalized birthday reminder
+        history = self.history(birthday_info)
+        history_line = f"\n        Earlier years: {history}" if history else ""
         prompt = f"""
         Generate a warm, personalized birthday reminder for an elderly user.
         
-        Birthday Info: {json.dumps(birthday_info, indent=2)}
-        Master Agent Guidance: {master_guidance}
+        Birthday Info: {self.format_data(birthday_info, fields=PERSON_FIELDS)}
+        Master Agent Guidance: {self.forward_text(master_guidance, 800)}{history_line}
         
         Create a message that:
         1. Is warm and personal
         2. Mentions the person's name and relationship
-        3. Suggests ways to connect (call, message, etc.)
+        3. Suggests ways to connect (call, message, etc.), building on earlier years if known
         4. Uses simple, clear language
         5. Feels like talking to a caring friend
         
         Format your response as a natural conversation starter.
         """
         
-        reminder_message = await self.llm_call(prompt)
-        print(f"Elderly Agent: {reminder_message}")
-        
-        # Generate follow-up suggestions
-        suggestions_prompt = f"""
-        Based on the birthday reminder for {name}, generate 3-4 simple suggestions for the elderly user.
-        Make them actionable and easy to understand.
-        Examples: "Would you like to call them?", "Should I help you send a message?"
-        """
-        
-        suggestions_response = await self.llm_call(suggestions_prompt)
-        print(f"Elderly Agent Suggestions: {suggestions_response}")
-        
-        # Simulate user response for demo
-        await self.simulate_user_response(birthday_info, reminder_message)
+        # The reminder includes the person's memory summary, so a newer summary regenerates it
+        return await self.precomputed_call(birthday_info, day, prompt, "elderly.reminder", context=history)
         
     async def simulate_user_response(self, birthday_info: Dict[str, Any], reminder_message: str):
         """Simulate user response for demo purposes"""
@@ -82,43 +116,26 @@ class ElderlyAgent(Agent):
         Generate just the user's response, nothing else.
         """
         
-        user_response = await self.llm_call(prompt)
-        print(f"Elderly Agent: User response: {user_response}")
+        user_response = await self.llm_call(prompt, step="elderly.user_response")
+        logger.info("Elderly Agent: User response: %s", user_response)
         
         # Log the interaction
-        self.user_responses.append({
+        self.log_interaction({
             "timestamp": datetime.now().isoformat(),
             "birthday_info": birthday_info,
             "reminder_message": reminder_message,
             "user_response": user_response,
             "action": "birthday_reminder_interaction"
-        })
+        }, person=birthday_info.get('name'))
         
         # Send response to master agent
-        if self.master_agent:
-            await self.master_agent.handle_elderly_response(user_response, {
+        if self.bus is not None:
+            await self.bus.publish("elderly_response", response=user_response, context={
                 "birthday_info": birthday_info,
                 "reminder_message": reminder_message,
                 "action": "birthday_reminder_interaction"
             })
             
-    async def llm_call(self, prompt: str) -> str:
-        """Make a call to OpenAI GPT-4o"""
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,
-                temperature=0.8
-            )
-            return response.choices[0].message.content or "I'm here to help!"
-        except Exception as e:
-            print(f"Error calling OpenAI: {e}")
-            return "I'm having trouble processing that right now."
-            
     def get_user_responses(self) -> list:
-        """Get user response history for demo purposes"""
-        return self.user_responses 
\ No newline at end of file
+        """Most recent user responses (bounded; use ``interactions.page`` for history)"""
+        return self.interactions.recent(self.log_channel) 
\ No newline at end of file
@@ -0,0 +1,57 @@
+from typing import Optional
+
+
+class LLMError(Exception):
+    """An LLM request failed; raised instead of returning a placeholder reply"""
+
+
+class LLMRequestError(LLMError):
+    """The provider rejected the request (bad request, authentication, ...); retrying will not help"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMEmptyResponseError(LLMError):
+    """The provider answered with no content"""
+
+
+class LLMRetryableError(LLMError):
+    """A transient failure that may succeed when retried"""
+
+
+class LLMTimeoutError(LLMRetryableError):
+    """A request or the call's overall deadline timed out"""
+
+
+class LLMRateLimitError(LLMRetryableError):
+    """The provider (or the local RPM/TPM limiter) asked us to slow down"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMDeadlineError(LLMTimeoutError):
+    """The call's overall deadline ran out before the provider had its full ``request_timeout`` to answer"""
+
+
+class LLMQueueTimeoutError(LLMDeadlineError):
+    """The call's deadline ran out before its request was sent (waiting for quota or a request slot)"""
+
+
+class LLMQuotaError(LLMRateLimitError):
+    """The local RPM/TPM limiter has no quota within the call's deadline; nothing was sent"""
+
+
+class LLMUnavailableError(LLMRetryableError):
+    """The provider is unreachable or failing (connection errors, 5xx)"""
+
+
+class CircuitOpenError(LLMError):
+    """Requests are short-circuited because the provider has been failing"""
+
+    def __init__(self, message: str, retry_at: Optional[float] = None):
+        super().__init__(message)
+        self.retry_at = retry_at
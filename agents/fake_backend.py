@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import AsyncIterator, Dict, List, Optional, Union
+from .errors import LLMUnavailableError
+from .llm_transport import Completion
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+_PERSON_ID = re.compile(r'"person_id"\s*:\s*"([^"]+)"')
+
+
+class FakeBackendError(LLMUnavailableError):
+    """Injected failure of the fake backend"""
+
+
+class FakeBackend:
+    """Offline, deterministic stand-in for ``OpenAIBackend``.
+
+    Each request waits for a time-to-first-token drawn from
+    ``latency_distribution`` (mean ``mean_latency`` seconds) plus the
+    completion's length at ``tokens_per_second``, then returns text derived
+    from a hash of the prompt. A fraction ``failure_rate`` of requests raise
+    ``FakeBackendError``. Draws come from a ``seed``-ed generator, so a run
+    with the same requests in the same order behaves identically.
+    ``time_scale`` shrinks every wait (e.g. 0.01 to run 100x faster).
+    """
+
+    def __init__(self, mean_latency: float = 0.8, latency_distribution: str = "lognormal", latency_sigma: float = 0.5,
+                 tokens_per_second: float = 60.0, completion_tokens: int = 120, failure_rate: float = 0.0,
+                 seed: Optional[int] = 0, time_scale: float = 1.0):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {latency_distribution!r}")
+        self.mean_latency = mean_latency
+        self.latency_distribution = latency_distribution
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.failure_rate = failure_rate
+        self.time_scale = time_scale
+        self.random = random.Random(seed)
+        self.stats = {"calls": 0, "failures": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _first_token_latency(self) -> float:
+        mean = self.mean_latency
+        if self.latency_distribution == "constant":
+            return mean
+        if self.latency_distribution == "uniform":
+            return self.random.uniform(0, 2 * mean)
+        if self.latency_distribution == "exponential":
+            return self.random.expovariate(1 / mean) if mean > 0 else 0.0
+        # Lognormal with the requested mean: mu = ln(mean) - sigma^2 / 2
+        sigma = self.latency_sigma
+        return self.random.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma) if mean > 0 else 0.0
+
+    def _reply(self, messages: List[Dict[str, str]], max_tokens: int, json_output: bool) -> Completion:
+        prompt = messages[-1]["content"]
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4 + 1
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        completion_tokens = max(1, min(max_tokens, self.completion_tokens))
+        if json_output:
+            # Enough for the Memory Agent's batched analysis contract
+            people = [{"person_id": person_id, "analysis": f"Offline analysis {digest} for {person_id}."}
+                      for person_id in _PERSON_ID.findall(prompt)]
+            text = json.dumps({"people": people})
+        else:
+            # Several numbered lines, like real replies (and list-style outputs)
+            words = [f"w{digest[i % 12]}" for i in range(completion_tokens)]
+            lines = [f"{n}. " + " ".join(words[i:i + 10]) for n, i in enumerate(range(0, len(words), 10), 1)]
+            text = f"Offline reply {digest}:\n" + "\n".join(lines)
+        return Completion(text, prompt_tokens, completion_tokens)
+
+    def _plan(self, messages: List[Dict[str, str]], max_tokens: int, json_output: bool):
+        self.stats["calls"] += 1
+        failed = self.failure_rate > 0 and self.random.random() < self.failure_rate
+        first_token = self._first_token_latency() * self.time_scale
+        completion = self._reply(messages, max_tokens, json_output)
+        generation = completion.completion_tokens / self.tokens_per_second * self.time_scale
+        if failed:
+            self.stats["failures"] += 1
+        else:
+            self.stats["prompt_tokens"] += completion.prompt_tokens
+            self.stats["completion_tokens"] += completion.completion_tokens
+        return failed, first_token, generation, completion
+
+    async def complete(self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                       json_output: bool = False) -> Completion:
+        failed, first_token, generation, completion = self._plan(messages, max_tokens, json_output)
+        await asyncio.sleep(first_token)
+        if failed:
+            raise FakeBackendError("Injected fake backend failure")
+        await asyncio.sleep(generation)
+        return completion
+
+    async def stream(self, model: str, messages: List[Dict[str, str]], max_tokens: int,
+                     temperature: float) -> AsyncIterator[Union[str, Completion]]:
+        failed, first_token, generation, completion = self._plan(messages, max_tokens, False)
+        await asyncio.sleep(first_token)
+        if failed:
+            raise FakeBackendError("Injected fake backend failure")
+        words = completion.text.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(generation / len(words))
+            yield word if i == 0 else " " + word
+        yield Completion(None, completion.prompt_tokens, completion.completion_tokens)
+
+    async def aclose(self):
+        pass
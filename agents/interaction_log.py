@@ -0,0 +1,212 @@
+import json
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from .sqlite_store import add_columns, connect_store
+
+# Retention is enforced every this many appends (and when the log is opened)
+_PRUNE_EVERY = 500
+
+
+class InteractionLog:
+    """Log of agent interactions with bounded memory; entries are appended and only amended by ``update_latest``.
+
+    Entries are written to SQLite (indexed by timestamp, person,
+    channel/type and cascade) and only the most recent ``buffer_size`` per
+    channel are kept in memory. The dashboard reads one page at a time with ``page``.
+    With ``path=None`` nothing is persisted and the ring buffers are the
+    whole log. Entries older than ``retention_days`` are pruned.
+    """
+
+    def __init__(self, path: Optional[str] = "data/interactions.sqlite3", buffer_size: int = 200,
+                 retention_days: Optional[float] = 90):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, Deque[Tuple[int, Optional[str], Optional[str], Dict[str, Any]]]] = {}
+        self._counts: Dict[str, int] = {}
+        self._last_id = 0
+        self._appends = 0
+        self._db = None
+        if path:
+            self._db = connect_store(
+                path,
+                "CREATE TABLE IF NOT EXISTS interactions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, channel TEXT NOT NULL, "
+                "type TEXT, person TEXT, cascade TEXT, entry TEXT NOT NULL)",
+                "CREATE INDEX IF NOT EXISTS interactions_ts ON interactions (ts)",
+                "CREATE INDEX IF NOT EXISTS interactions_person ON interactions (person, ts)",
+                "CREATE INDEX IF NOT EXISTS interactions_channel ON interactions (channel, type, id)"
+            )
+            add_columns(self._db, "interactions", {"cascade": "TEXT"})
+            self._db.execute("CREATE INDEX IF NOT EXISTS interactions_cascade ON interactions (cascade, channel)")
+            self.prune()
+            self._last_id = self._db.execute("SELECT COALESCE(MAX(id), 0) FROM interactions").fetchone()[0]
+
+    def append(self, channel: str, entry: Dict[str, Any], person: Optional[str] = None,
+               cascade: Optional[str] = None) -> int:
+        """Record an entry (with "timestamp" and optionally "type") and return its id.
+
+        ``cascade`` is the id of the cascade that produced the entry, if any.
+        """
+        timestamp = entry.get("timestamp") or datetime.now().isoformat()
+        with self._lock:
+            if self._db is not None:
+                entry_id = self._db.execute(
+                    "INSERT INTO interactions (ts, channel, type, person, cascade, entry) VALUES (?, ?, ?, ?, ?, ?)",
+                    (timestamp, channel, entry.get("type"), person, cascade, json.dumps(entry, default=str))
+                ).lastrowid
+                self._db.commit()
+            else:
+                entry_id = self._last_id + 1
+            self._last_id = entry_id
+            buffer = self._buffers.get(channel)
+            if buffer is None:
+                buffer = self._buffers[channel] = deque(maxlen=self.buffer_size)
+            buffer.append((entry_id, person, cascade, entry))
+            self._counts[channel] = self._counts.get(channel, 0) + 1
+            self._appends += 1
+            prune_due = self._appends % _PRUNE_EVERY == 0
+        if prune_due:
+            self.prune()
+        return entry_id
+
+    def update_latest(self, channel: str, changes: Dict[str, Any], cascade: Optional[str] = None) -> bool:
+        """Merge ``changes`` into the newest entry of a channel this process appended (of ``cascade``, if given).
+
+        Updated in memory and on disk; False if there is no such entry.
+        """
+        with self._lock:
+            for entry_id, _, entry_cascade, entry in reversed(self._buffers.get(channel, ())):
+                if cascade is None or entry_cascade == cascade:
+                    break
+            else:
+                return False
+            entry.update(changes)
+            if self._db is not None:
+                self._db.execute("UPDATE interactions SET entry = ? WHERE id = ?",
+                                 (json.dumps(entry, default=str), entry_id))
+                self._db.commit()
+        return True
+
+    def last_id(self) -> int:
+        """Id of the newest entry; pass it to ``since`` to get what was logged afterwards"""
+        with self._lock:
+            if self._db is not None:
+                # Other processes may share the file
+                return self._db.execute("SELECT COALESCE(MAX(id), 0) FROM interactions").fetchone()[0]
+            return self._last_id
+
+    def recent(self, channel: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent entries of a channel from memory, oldest first"""
+        with self._lock:
+            entries = [entry for _, _, _, entry in self._buffers.get(channel, ())]
+        return entries[-limit:] if limit else entries
+
+    def since(self, channel: str, after_id: int) -> List[Dict[str, Any]]:
+        """Entries of a channel logged after ``after_id``, oldest first"""
+        if self._db is None:
+            with self._lock:
+                return [entry for entry_id, _, _, entry in self._buffers.get(channel, ()) if entry_id > after_id]
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT entry FROM interactions WHERE channel = ? AND id > ? ORDER BY id", (channel, after_id)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def for_cascades(self, channel: str, cascades: List[str]) -> List[Dict[str, Any]]:
+        """Entries of a channel produced by the given cascades, oldest first.
+
+        Unlike ``since``, this leaves out what other processes sharing the
+        file logged in the meantime.
+        """
+        if not cascades:
+            return []
+        if self._db is None:
+            wanted = set(cascades)
+            with self._lock:
+                return [entry for _, _, cascade, entry in self._buffers.get(channel, ()) if cascade in wanted]
+        placeholders = ", ".join("?" * len(cascades))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT entry FROM interactions WHERE cascade IN ({placeholders}) AND channel = ? ORDER BY id",
+                (*cascades, channel)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _where(self, channel: Optional[str], person: Optional[str], type: Optional[str],
+               since: Optional[str], until: Optional[str]) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        for column, value in (("channel", channel), ("person", person), ("type", type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def page(self, channel: Optional[str] = None, page: int = 0, page_size: int = 20, person: Optional[str] = None,
+             type: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """One page of entries, newest first, optionally filtered by person, type and timestamp range"""
+        if self._db is None:
+            entries = self._memory_entries(channel, person, type, since, until)[::-1]
+            return entries[page * page_size:(page + 1) * page_size]
+        where, params = self._where(channel, person, type, since, until)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT entry FROM interactions {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                (*params, page_size, page * page_size)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, channel: Optional[str] = None, person: Optional[str] = None, type: Optional[str] = None) -> int:
+        """Number of stored entries matching the filters (appended so far when not persisted)"""
+        if self._db is None:
+            if person is None and type is None:
+                with self._lock:
+                    return self._counts.get(channel, 0) if channel else sum(self._counts.values())
+            return len(self._memory_entries(channel, person, type, None, None))
+        where, params = self._where(channel, person, type, None, None)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM interactions {where}", params).fetchone()[0]
+
+    def appended(self, channel: str) -> int:
+        """Entries this process has appended to a channel since the log was opened"""
+        with self._lock:
+            return self._counts.get(channel, 0)
+
+    def _memory_entries(self, channel: Optional[str], person: Optional[str], type: Optional[str],
+                        since: Optional[str], until: Optional[str]) -> List[Dict[str, Any]]:
+        # Oldest first, from the ring buffers
+        with self._lock:
+            buffers = [self._buffers.get(channel, ())] if channel is not None else list(self._buffers.values())
+            rows = sorted((row for buffer in buffers for row in buffer), key=lambda row: row[0])
+        return [entry for _, entry_person, _, entry in rows
+                if (person is None or entry_person == person)
+                and (type is None or entry.get("type") == type)
+                and (since is None or entry.get("timestamp", "") >= since)
+                and (until is None or entry.get("timestamp", "") < until)]
+
+    def prune(self, before: Optional[datetime] = None) -> int:
+        """Delete persisted entries older than ``before`` (default: the retention window)"""
+        if self._db is None:
+            return 0
+        if before is None:
+            if not self.retention_days:
+                return 0
+            before = datetime.now() - timedelta(days=self.retention_days)
+        with self._lock:
+            removed = self._db.execute("DELETE FROM interactions WHERE ts < ?", (before.isoformat(),)).rowcount
+            self._db.commit()
+        return removed
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
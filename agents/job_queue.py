@@ -0,0 +1,138 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from .sqlite_store import add_columns, connect_store
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueue:
+    """Persistent SQLite job queue shared by dashboard and worker processes.
+
+    Dashboards ``enqueue`` jobs and read their results; any number of worker
+    processes ``claim`` them. Claiming happens inside an immediate
+    transaction, so a job is handed to exactly one worker. A worker renews
+    its claim with ``heartbeat`` while the job runs; ``requeue_stale`` hands
+    jobs whose worker stopped renewing back to the queue.
+    """
+
+    def __init__(self, path: str = "data/job_queue.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit mode; transactions are opened explicitly where needed
+        self._db = connect_store(
+            path,
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, result TEXT, error TEXT, worker TEXT, "
+            "created_at TEXT NOT NULL, started_at TEXT, heartbeat_at TEXT, finished_at TEXT)",
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)",
+            "CREATE INDEX IF NOT EXISTS jobs_kind ON jobs (kind, id)",
+            isolation_level=None
+        )
+        add_columns(self._db, "jobs", {"heartbeat_at": "TEXT"})
+        self._db.row_factory = sqlite3.Row
+
+    @staticmethod
+    def _job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def enqueue(self, kind: str, payload: Optional[Dict[str, Any]] = None) -> int:
+        """Add a job and return its id"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (kind, payload, status, created_at) VALUES (?, ?, ?, ?)",
+                (kind, json.dumps(payload or {}), QUEUED, datetime.now().isoformat())
+            )
+        return cursor.lastrowid
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job for ``worker``, or None if the queue is empty"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    started_at = datetime.now().isoformat()
+                    self._db.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                        (RUNNING, worker, started_at, started_at, row["id"])
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        job = self._job(row)
+        if job is not None:
+            job.update(status=RUNNING, worker=worker, started_at=started_at, heartbeat_at=started_at)
+        return job
+
+    def complete(self, job_id: int, result: Any):
+        self._finish(job_id, DONE, result=json.dumps(result, default=str))
+
+    def fail(self, job_id: int, error: str):
+        self._finish(job_id, FAILED, error=error)
+
+    def _finish(self, job_id: int, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, result, error, datetime.now().isoformat(), job_id)
+            )
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Renew ``worker``'s claim on a running job; False if the job was handed to another worker"""
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND status = ?",
+                (datetime.now().isoformat(), job_id, worker, RUNNING)
+            ).rowcount > 0
+
+    def requeue_stale(self, older_than: float) -> int:
+        """Hand running jobs without a heartbeat for ``older_than`` seconds (dead workers) back to the queue"""
+        cutoff = (datetime.now() - timedelta(seconds=older_than)).isoformat()
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?",
+                (QUEUED, RUNNING, cutoff)
+            ).rowcount
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row)
+
+    def recent(self, kind: Optional[str] = None, status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally filtered by kind and status"""
+        clauses, params = [], []
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT * FROM jobs {where}ORDER BY id DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [self._job(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from .sqlite_store import add_columns, connect_store
+
+# The disk tier is purged and trimmed every this many stores (and when opened)
+_TRIM_EVERY = 200
+
+
+class LLMCache:
+    """Content-addressed cache for LLM completions.
+
+    Entries are keyed by a hash of everything that determines the response
+    (model, system prompt, user prompt, temperature, max_tokens) and carry
+    their own expiry time. Lookups go to an in-memory LRU tier first and
+    then to an optional on-disk SQLite tier, so identical prompts are
+    answered locally across demo runs and dashboard reruns. Both tiers are
+    bounded: the disk tier keeps at most ``max_disk_entries`` rows, least
+    recently read or written first out, and drops expired rows, when opened
+    and as it is written.
+    """
+
+    def __init__(self, path: Optional[str] = "data/llm_cache.sqlite3", max_memory_entries: int = 1024,
+                 max_disk_entries: int = 50000):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stores = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0,
+                      "disk_evictions": 0}
+        self._db = None
+        if path:
+            self._db = connect_store(
+                path,
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL NOT NULL, "
+                "accessed_at REAL)",
+                "CREATE INDEX IF NOT EXISTS llm_cache_expires ON llm_cache (expires_at)"
+            )
+            add_columns(self._db, "llm_cache", {"accessed_at": "REAL"})
+            self._db.execute("UPDATE llm_cache SET accessed_at = created_at WHERE accessed_at IS NULL")
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+            self._db.commit()
+            self.purge_expired()
+            with self._lock:
+                self._trim_disk()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, prompt: str, temperature: float, max_tokens: int, **extra: Any) -> str:
+        """Hash the request parameters into a stable cache key"""
+        payload = json.dumps(
+            {"model": model, "system": system_prompt, "prompt": prompt,
+             "temperature": temperature, "max_tokens": max_tokens, **extra},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached completion for a key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self.stats["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        self._db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, value, expires_at)
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.stats["expired"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str, ttl: float):
+        """Store a completion for ``ttl`` seconds"""
+        if ttl <= 0:
+            return
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, now, expires_at, now)
+                )
+                self._db.commit()
+                self._stores += 1
+                trim_due = self._stores % _TRIM_EVERY == 0
+            else:
+                trim_due = False
+        if trim_due:
+            self.purge_expired()
+            with self._lock:
+                self._trim_disk()
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _trim_disk(self):
+        # Called with the lock held
+        removed = self._db.execute(
+            "DELETE FROM llm_cache WHERE key NOT IN "
+            "(SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT ?)", (self.max_disk_entries,)
+        ).rowcount
+        self._db.commit()
+        self.stats["disk_evictions"] += removed
+
+    def purge_expired(self) -> int:
+        """Drop expired entries from both tiers and return how many were removed"""
+        now = time.time()
+        with self._lock:
+            stale = [key for key, (_, expires_at) in self._memory.items() if expires_at <= now]
+            for key in stale:
+                del self._memory[key]
+            removed = len(stale)
+            if self._db is not None:
+                removed += self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+                self._db.commit()
+            self.stats["expired"] += removed
+            return removed
+
+    def get_stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters plus current memory tier size"""
+        with self._lock:
+            return {**self.stats, "memory_entries": len(self._memory)}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,551 @@
+import asyncio
+import contextlib
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+from .errors import (CircuitOpenError, LLMDeadlineError, LLMError, LLMQueueTimeoutError, LLMQuotaError, LLMRateLimitError,
+                     LLMRequestError, LLMRetryableError, LLMTimeoutError, LLMUnavailableError)
+from .llm_cache import LLMCache
+from .model_routing import ModelRouter
+from .resilience import CircuitBreaker, RateLimiter, RetryPolicy
+from .similarity_cache import SimilarityCache
+from .token_usage import TokenUsageLedger, estimate_tokens
+from .prompt_compaction import PromptCompactor
+from .cascade_scheduler import current_cascade
+from .tracing import current_span, tracer
+
+
+class Completion:
+    """Text of a completion plus the token usage reported by the API"""
+
+    __slots__ = ("text", "prompt_tokens", "completion_tokens")
+
+    def __init__(self, text: Optional[str], prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+
+class OpenAIBackend:
+    """Async OpenAI chat completions backend with a pooled HTTP client.
+
+    Pooled connections belong to the event loop that opened them, so the
+    client is (re)created lazily whenever it is used from a new loop, e.g.
+    across separate ``asyncio.run`` calls in the dashboard. The ``openai``
+    and ``httpx`` packages are imported only when this backend is built, so
+    other backends (e.g. ``FakeBackend``) work without them.
+    """
+
+    def __init__(self, openai_api_key: str, max_connections: int = 20, max_keepalive_connections: int = 10):
+        import httpx
+        self.openai_api_key = openai_api_key
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.client = None
+        self._loop = None
+
+    def _get_client(self) -> "openai.AsyncOpenAI":
+        import openai
+        loop = asyncio.get_running_loop()
+        if self.client is None or self._loop is not loop:
+            http_client = openai.DefaultAsyncHttpxClient(limits=self.limits)
+            # Retries and timeouts are handled by LLMTransport
+            self.client = openai.AsyncOpenAI(api_key=self.openai_api_key, http_client=http_client, max_retries=0)
+            self._loop = loop
+        return self.client
+
+    async def complete(self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+                       json_output: bool = False) -> Completion:
+        """Send one chat completion request and return its text and token usage"""
+        options = {"response_format": {"type": "json_object"}} if json_output else {}
+        try:
+            response = await self._get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **options
+            )
+        except Exception as e:
+            raise self._translate_error(e) from e
+        usage = response.usage
+        return Completion(
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0
+        )
+
+    async def stream(self, model: str, messages: List[Dict[str, str]], max_tokens: int,
+                     temperature: float) -> AsyncIterator[Union[str, Completion]]:
+        """Stream a completion: yields text deltas, then a ``Completion`` carrying only usage"""
+        try:
+            stream = await self._get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if chunk.usage:
+                    yield Completion(None, chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+        except Exception as e:
+            raise self._translate_error(e) from e
+
+    @staticmethod
+    def _translate_error(error: Exception) -> Exception:
+        """Map an openai exception onto the typed ``LLMError`` hierarchy"""
+        import openai
+        if isinstance(error, LLMError):
+            return error
+        if isinstance(error, openai.APITimeoutError):
+            return LLMTimeoutError(str(error))
+        if isinstance(error, openai.APIConnectionError):
+            return LLMUnavailableError(str(error))
+        if isinstance(error, openai.RateLimitError):
+            return LLMRateLimitError(str(error), retry_after=_retry_after(getattr(error, "response", None)))
+        if isinstance(error, openai.APIStatusError):
+            status = getattr(error, "status_code", None)
+            if status in (408, 409) or (status or 0) >= 500:
+                return LLMUnavailableError(str(error))
+            return LLMRequestError(str(error), status_code=status)
+        return error
+
+    async def aclose(self):
+        """Close the pooled HTTP connections"""
+        if self.client is not None and self._loop is asyncio.get_running_loop():
+            await self.client.close()
+        self.client = None
+        self._loop = None
+
+
+class _SharedRequest:
+    """An in-flight completion and the number of callers waiting on it"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class LLMTransport:
+    """Single async LLM transport shared by all agents.
+
+    The transport wraps a pluggable backend (anything with an async
+    ``complete(model, messages, max_tokens, temperature, json_output)`` method
+    returning a ``Completion``), so every agent reuses one connection pool
+    instead of opening its own client. At most ``max_in_flight`` requests
+    are sent concurrently, and when a cache is attached, completions are
+    served from it where possible. Token usage is recorded per agent, step,
+    model and cascade in ``usage``, ``compactor`` is the shared prompt
+    compaction policy and ``router`` picks the model for each agent step.
+
+    ``process_limiter`` optionally caps requests across processes too: any
+    semaphore with blocking ``acquire()``/``release()`` (e.g. a
+    ``multiprocessing`` semaphore shared by a process pool).
+
+    Every request goes through ``rate_limiter`` (optional RPM/TPM quotas),
+    per-attempt timeouts and retries with backoff per ``retry_policy``, and
+    ``circuit_breaker``. Waiting for quota or a slot counts against the
+    call's deadline but not ``request_timeout``; running out of time there
+    raises ``LLMQueueTimeoutError``. Only failures the provider is to blame
+    for count towards the circuit breaker: not local queueing or quota, and
+    not a request cut short by the call's deadline (``LLMDeadlineError``). Failures
+    raise ``LLMError`` subclasses; counts of retries, timeouts (provider and
+    queueing), rate limiting and short-circuited calls are in ``stats``.
+
+    Identical completions requested while one is already in flight share
+    that request (single-flight) instead of sending a duplicate; these are
+    counted in ``stats["coalesced"]``.
+
+    Each call is traced as an ``llm_call`` span with its cache outcome
+    (hit, coalesced or miss), attempts, time spent waiting for quota and a
+    slot (``queue_wait``), time on the wire (``network``) and token counts.
+    """
+
+    def __init__(self, backend, max_in_flight: int = 8, cache: Optional[LLMCache] = None,
+                 retry_policy: Optional[RetryPolicy] = None, rate_limiter: Optional[RateLimiter] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self.cache = cache
+        self.usage = TokenUsageLedger()
+        self.compactor = PromptCompactor()
+        self.router = ModelRouter()
+        # Approximate cache for templated steps (see Agent.llm_call); off unless set
+        self.similarity_cache: Optional[SimilarityCache] = None
+        self.process_limiter = None
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.stats = {"retries": 0, "timeouts": 0, "queue_timeouts": 0, "rate_limited": 0, "short_circuited": 0,
+                      "coalesced": 0}
+        self._semaphores = {}
+        self._in_flight: Dict[asyncio.AbstractEventLoop, Dict[str, _SharedRequest]] = {}
+
+    @classmethod
+    def for_openai(cls, openai_api_key: str, max_connections: int = 20, max_in_flight: int = 8) -> "LLMTransport":
+        """Build a transport backed by the OpenAI async client"""
+        return cls(OpenAIBackend(openai_api_key, max_connections=max_connections), max_in_flight=max_in_flight)
+
+    def set_max_in_flight(self, max_in_flight: int):
+        """Change the cap on concurrent LLM requests"""
+        self.max_in_flight = max_in_flight
+        self._semaphores = {}
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to one loop; keep one per running loop
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            self._semaphores = {loop: asyncio.Semaphore(self.max_in_flight)}
+            semaphore = self._semaphores[loop]
+        return semaphore
+
+    def _get_in_flight(self) -> Dict[str, "_SharedRequest"]:
+        loop = asyncio.get_running_loop()
+        in_flight = self._in_flight.get(loop)
+        if in_flight is None:
+            self._in_flight = {loop: {}}
+            in_flight = self._in_flight[loop]
+        return in_flight
+
+    async def _queue(self, waiting: Awaitable, expires: Optional[float]):
+        """Await a local slot or quota, giving up once the call's deadline has passed"""
+        if expires is None:
+            return await waiting
+        try:
+            return await asyncio.wait_for(waiting, max(0.0, expires - asyncio.get_running_loop().time()))
+        except asyncio.TimeoutError:
+            self.stats["queue_timeouts"] += 1
+            raise LLMQueueTimeoutError("LLM call deadline passed while waiting for a request slot") from None
+
+    @contextlib.asynccontextmanager
+    async def _request_slot(self, expires: Optional[float] = None):
+        semaphore = self._get_semaphore()
+        if semaphore.locked():
+            await self._queue(semaphore.acquire(), expires)
+        else:
+            await semaphore.acquire()
+        try:
+            limiter = self.process_limiter
+            if limiter is None:
+                yield
+                return
+            # Blocking acquire runs in a thread; if we stop waiting for it
+            # (cancelled or out of time), release the slot once the thread gets it
+            acquire = asyncio.ensure_future(asyncio.to_thread(limiter.acquire))
+            try:
+                await self._queue(asyncio.shield(acquire), expires)
+            except (asyncio.CancelledError, LLMQueueTimeoutError):
+                acquire.add_done_callback(lambda done: done.cancelled() or done.exception() or limiter.release())
+                raise
+            try:
+                yield
+            finally:
+                limiter.release()
+        finally:
+            semaphore.release()
+
+    async def _attempt(self, call: Callable[[], Awaitable[Completion]], estimated_tokens: int,
+                       expires: float) -> Completion:
+        loop = asyncio.get_running_loop()
+        span = current_span()
+        started = loop.time()
+        remaining = expires - started
+        if remaining <= 0:
+            raise LLMQueueTimeoutError("LLM call deadline exceeded")
+        reserved = 0
+        if self.rate_limiter is not None:
+            reserved = await self.rate_limiter.acquire(estimated_tokens, remaining)
+        completion = None
+        try:
+            # Waiting for a slot is bounded by the deadline only, and a
+            # request_timeout starts once the request is actually sent
+            async with self._request_slot(expires):
+                sent = loop.time()
+                cut_short = expires - sent < self.retry_policy.request_timeout
+                try:
+                    completion = await asyncio.wait_for(call(), min(self.retry_policy.request_timeout,
+                                                                     expires - sent))
+                    return completion
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    if cut_short:
+                        raise LLMDeadlineError("LLM call deadline passed while waiting for the reply") from None
+                    raise LLMTimeoutError("LLM request timed out") from None
+                finally:
+                    if span is not None:
+                        span.add("attempts", 1)
+                        span.add("queue_wait", sent - started)
+                        span.add("network", loop.time() - sent)
+        finally:
+            if reserved:
+                used = completion.prompt_tokens + completion.completion_tokens if completion else reserved
+                self.rate_limiter.settle(reserved, used)
+
+    def _retry_delay(self, error: LLMRetryableError, attempt: int, expires: float, trial: bool) -> float:
+        """Record a failed attempt and return the delay before the next one, or re-raise"""
+        if isinstance(error, LLMRateLimitError):
+            self.stats["rate_limited"] += 1
+        if isinstance(error, (LLMDeadlineError, LLMQuotaError)):
+            # Never sent, or not given a fair chance: says nothing about the provider
+            self.circuit_breaker.release_trial(trial)
+        elif isinstance(error, LLMRateLimitError):
+            # Throttled, but the provider is up
+            self.circuit_breaker.record_success()
+        else:
+            self.circuit_breaker.record_failure()
+        delay = self.retry_policy.backoff(attempt, error.retry_after if isinstance(error, LLMRateLimitError) else None)
+        if attempt >= self.retry_policy.max_attempts or asyncio.get_running_loop().time() + delay >= expires:
+            raise error
+        self.stats["retries"] += 1
+        return delay
+
+    def _check_circuit(self) -> bool:
+        try:
+            return self.circuit_breaker.before_request()
+        except CircuitOpenError:
+            self.stats["short_circuited"] += 1
+            raise
+
+    async def _send(self, call: Callable[[], Awaitable[Completion]], estimated_tokens: int,
+                    deadline: Optional[float]) -> Completion:
+        """Run ``call`` with rate limiting, timeouts, retries and the circuit breaker"""
+        expires = asyncio.get_running_loop().time() + (self.retry_policy.deadline if deadline is None else deadline)
+        attempt = 0
+        while True:
+            attempt += 1
+            trial = self._check_circuit()
+            try:
+                completion = await self._attempt(call, estimated_tokens, expires)
+            except LLMRetryableError as e:
+                await asyncio.sleep(self._retry_delay(e, attempt, expires, trial))
+                continue
+            except LLMError:
+                # Rejected outright, which still means the provider answered
+                self.circuit_breaker.record_success()
+                raise
+            except BaseException:
+                # Cancelled: no verdict on the provider
+                self.circuit_breaker.release_trial(trial)
+                raise
+            self.circuit_breaker.record_success()
+            return completion
+
+    async def complete(self, model: str, system_prompt: str, prompt: str, max_tokens: int, temperature: float,
+                       cache_ttl: Optional[float] = None, json_output: bool = False,
+                       agent: str = "", step: Optional[str] = None, deadline: Optional[float] = None,
+                       tier: Optional[str] = None) -> Optional[str]:
+        """Run a chat completion with the given system and user prompts.
+
+        When ``cache_ttl`` is given and a cache is attached, an unexpired
+        cached completion is returned instead of calling the backend, and
+        fresh completions are stored for ``cache_ttl`` seconds. With
+        ``json_output`` the model is asked to reply with a JSON object.
+        ``agent``, ``step`` and the routing ``tier`` label the call in the
+        token usage ledger.
+        The call gives up after ``deadline`` seconds (default: the retry
+        policy's) and failures raise ``LLMError`` subclasses.
+
+        If an identical request is already in flight, this call waits for
+        it and returns (or raises) the same result without sending another.
+        """
+        cascade = current_cascade.get()
+        with tracer.span("llm_call", agent=agent, step=step, model=model, cascade=cascade) as span:
+            key = LLMCache.make_key(model, system_prompt, prompt, temperature, max_tokens, json_output=json_output)
+            use_cache = self.cache is not None and cache_ttl
+            if use_cache:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.usage.record(agent, step, cascade, 0, 0, cached=True, model=model, tier=tier)
+                    span.set(cache="hit")
+                    return cached
+
+            in_flight = self._get_in_flight()
+            shared = in_flight.get(key)
+            if shared is not None:
+                self.stats["coalesced"] += 1
+                span.set(cache="coalesced")
+                content = await self._join(shared)
+                self.usage.record(agent, step, cascade, 0, 0, cached=True, model=model, tier=tier)
+                return content
+
+            span.set(cache="miss")
+            messages = self._messages(system_prompt, prompt)
+
+            async def fetch() -> Optional[str]:
+                completion = await self._send(
+                    lambda: self.backend.complete(model, messages, max_tokens, temperature, json_output=json_output),
+                    estimate_tokens(system_prompt) + estimate_tokens(prompt) + max_tokens,
+                    deadline
+                )
+                self.usage.record(agent, step, cascade, completion.prompt_tokens, completion.completion_tokens,
+                                  model=model, tier=tier)
+                span.set(prompt_tokens=completion.prompt_tokens, completion_tokens=completion.completion_tokens)
+                if use_cache and completion.text:
+                    self.cache.set(key, completion.text, cache_ttl)
+                return completion.text
+
+            shared = _SharedRequest(asyncio.ensure_future(fetch()))
+            in_flight[key] = shared
+            shared.task.add_done_callback(lambda _: in_flight.pop(key, None) if in_flight.get(key) is shared else None)
+            return await self._join(shared)
+
+    @staticmethod
+    async def _join(shared: "_SharedRequest") -> Optional[str]:
+        """Wait for a shared request; it is cancelled only once all its callers are"""
+        shared.waiters += 1
+        try:
+            return await asyncio.shield(shared.task)
+        except asyncio.CancelledError:
+            if shared.waiters == 1:
+                shared.task.cancel()
+            raise
+        finally:
+            shared.waiters -= 1
+
+    async def stream(self, model: str, system_prompt: str, prompt: str, max_tokens: int, temperature: float,
+                     cache_ttl: Optional[float] = None, agent: str = "", step: Optional[str] = None,
+                     deadline: Optional[float] = None, tier: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream a chat completion as text deltas.
+
+        Same caching, accounting and resilience as ``complete``; a cached
+        completion is yielded as a single chunk. The concurrency slot is held
+        until the stream is exhausted, and a failed attempt is only retried
+        if none of its text was yielded yet.
+        """
+        cascade = current_cascade.get()
+        # Not activated: the generator's code runs in whichever context consumes it
+        with tracer.span("llm_call", activate=False, agent=agent, step=step, model=model, cascade=cascade,
+                         streamed=True) as span:
+            cache_key = None
+            if self.cache is not None and cache_ttl:
+                # Keyed like complete()'s non-JSON calls, so streamed and unstreamed calls share entries
+                cache_key = LLMCache.make_key(model, system_prompt, prompt, temperature, max_tokens, json_output=False)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self.usage.record(agent, step, cascade, 0, 0, cached=True, model=model, tier=tier)
+                    span.set(cache="hit")
+                    yield cached
+                    return
+
+            span.set(cache="miss")
+            loop = asyncio.get_running_loop()
+            expires = loop.time() + (self.retry_policy.deadline if deadline is None else deadline)
+            messages = self._messages(system_prompt, prompt)
+            estimated_tokens = estimate_tokens(system_prompt) + estimate_tokens(prompt) + max_tokens
+            chunks = []
+            usage = Completion(None)
+            attempt = 0
+            while True:
+                attempt += 1
+                trial = self._check_circuit()
+                reserved = 0
+                started = loop.time()
+                sent = None
+                cut_short = False
+                try:
+                    if expires - loop.time() <= 0:
+                        raise LLMQueueTimeoutError("LLM call deadline exceeded")
+                    if self.rate_limiter is not None:
+                        reserved = await self.rate_limiter.acquire(estimated_tokens, expires - loop.time())
+                    async with self._request_slot(expires):
+                        sent = loop.time()
+                        span.add("attempts", 1)
+                        span.add("queue_wait", sent - started)
+                        cut_short = expires - sent < self.retry_policy.request_timeout
+                        request_expires = min(expires, sent + self.retry_policy.request_timeout)
+                        items = self.backend.stream(model, messages, max_tokens, temperature)
+                        try:
+                            while True:
+                                try:
+                                    item = await asyncio.wait_for(items.__anext__(),
+                                                                  max(0.0, request_expires - loop.time()))
+                                except StopAsyncIteration:
+                                    break
+                                if isinstance(item, Completion):
+                                    usage = item
+                                    continue
+                                chunks.append(item)
+                                yield item
+                        finally:
+                            await items.aclose()
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    error = (LLMDeadlineError("LLM call deadline passed while streaming the reply") if cut_short
+                             else LLMTimeoutError("LLM stream timed out"))
+                except LLMRetryableError as e:
+                    error = e
+                except LLMError:
+                    self.circuit_breaker.record_success()
+                    raise
+                except BaseException:
+                    # Cancelled, or the consumer stopped reading: no verdict on the provider
+                    self.circuit_breaker.release_trial(trial)
+                    raise
+                else:
+                    self.circuit_breaker.record_success()
+                    break
+                finally:
+                    if sent is not None:
+                        span.add("network", loop.time() - sent)
+                    if reserved:
+                        self.rate_limiter.settle(reserved, usage.prompt_tokens + usage.completion_tokens or reserved)
+                if chunks:
+                    # Part of the reply was already delivered; a retry would repeat it
+                    if isinstance(error, LLMDeadlineError):
+                        self.circuit_breaker.release_trial(trial)
+                    else:
+                        self.circuit_breaker.record_failure()
+                    raise error
+                await asyncio.sleep(self._retry_delay(error, attempt, expires, trial))
+
+            self.usage.record(agent, step, cascade, usage.prompt_tokens, usage.completion_tokens, model=model,
+                              tier=tier)
+            span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+            content = "".join(chunks)
+            if cache_key is not None and content:
+                self.cache.set(cache_key, content, cache_ttl)
+
+    @staticmethod
+    def _messages(system_prompt: str, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def aclose(self):
+        """Release backend resources (HTTP connections)"""
+        close = getattr(self.backend, "aclose", None)
+        if close:
+            await close()
+
+
+def _retry_after(response) -> Optional[float]:
+    """Seconds to wait from a response's retry-after-ms / Retry-After headers"""
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+_shared_transports: Dict[str, LLMTransport] = {}
+
+
+def get_shared_transport(openai_api_key: str) -> LLMTransport:
+    """Return the process-wide transport for an API key, creating it on first use"""
+    transport = _shared_transports.get(openai_api_key)
+    if transport is None:
+        transport = LLMTransport.for_openai(openai_api_key)
+        _shared_transports[openai_api_key] = transport
+    return transport
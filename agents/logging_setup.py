@@ -0,0 +1,40 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: str = "INFO", trace_path: Optional[str] = None) -> logging.handlers.QueueListener:
+    """Send all log records through a queue so the event loop never blocks on terminal or file I/O.
+
+    Agent messages keep their plain one-line format on stdout. With
+    ``trace_path`` every finished span is also appended to that file as one
+    JSON object per line. Calling this again is a no-op.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    console.setLevel(level)
+    handlers = [console]
+    root = logging.getLogger()
+    root.setLevel(level)
+    if trace_path:
+        trace_file = logging.FileHandler(trace_path, encoding="utf-8")
+        trace_file.setFormatter(logging.Formatter("%(message)s"))
+        # Only the span records: one JSON object per line
+        trace_file.addFilter(lambda record: record.name == "agents.tracing" and record.levelno == logging.DEBUG)
+        handlers.append(trace_file)
+        logging.getLogger("agents.tracing").setLevel(logging.DEBUG)
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(_listener.stop)
+    return _listener
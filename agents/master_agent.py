@@ -1,12 +1,24 @@
-import asyncio
-import json
-from datetime import datetime
-from typing import Dict, List, Any
+import logging
+from datetime import date, datetime
+from typing import Dict, List, Any, Optional
 from .base_agent import Agent
-import openai
+from .llm_transport import LLMTransport, get_shared_transport
+from .interaction_log import InteractionLog
+from .message_bus import MessageBus
+from .precompute_store import PrecomputeStore
+from .prompt_compaction import PERSON_FIELDS
+
+logger = logging.getLogger(__name__)
 
 class MasterAgent(Agent):
-    def __init__(self, openai_api_key: str):
+    max_tokens = 500
+    temperature = 0.7
+    log_channel = "master"
+    subscriptions = {"birthday_alert": "handle_birthday_alert", "elderly_response": "handle_elderly_response"}
+    
+    def __init__(self, openai_api_key: str, transport: Optional[LLMTransport] = None,
+                 interaction_log: Optional[InteractionLog] = None, precomputed: Optional[PrecomputeStore] = None,
+                 bus: Optional[MessageBus] = None):
         super().__init__(
             name="Master Agent",
             system_prompt="""You are a Master Agent that coordinates between specialized AI agents to help reconnect families. 
@@ -16,21 +28,43 @@ class MasterAgent(Agent):
             3. Manage the flow of information between agents
             4. Ensure smooth communication between family members
             
-            Always be helpful, empathetic, and focused on fostering family connections."""
+            Always be helpful, empathetic, and focused on fostering family connections.""",
+            transport=transport or get_shared_transport(openai_api_key)
         )
-        self.openai_client = openai.OpenAI(api_key=openai_api_key)
         self.agents = {}
-        self.conversation_log = []
+        # Bounded in memory; persisted when the log has a path
+        self.interactions = interaction_log or InteractionLog(None)
+        self.precomputed = precomputed
+        # Agents talk through the master's bus; registering subscribes them
+        self.bus = bus or MessageBus()
         
     def register_agent(self, agent_name: str, agent_instance):
-        """Register other agents with the master agent"""
+        """Register other agents with the master agent and subscribe the master's handlers"""
         self.agents[agent_name] = agent_instance
-        print(f"Master Agent: Registered {agent_name}")
+        self.subscribe(self.bus)
+        logger.info("Master Agent: Registered %s", agent_name)
         
     async def handle_birthday_alert(self, birthday_info: Dict[str, Any]):
         """Handle birthday alerts from Memory Agent using LLM reasoning"""
-        print(f"Master Agent: Received birthday alert for {birthday_info['name']}")
+        logger.info("Master Agent: Received birthday alert for %s", birthday_info['name'])
+        
+        response = await self.prepare_guidance(birthday_info, date.today())
+        logger.info("Master Agent LLM Response: %s", response)
+        
+        # Log the interaction
+        self.log_interaction({
+            "timestamp": datetime.now().isoformat(),
+            "type": "birthday_alert",
+            "data": birthday_info,
+            "llm_response": response
+        }, person=birthday_info['name'])
         
+        # Instruct Elderly Agent to remind the user
+        if not await self.bus.publish("remind_birthday", birthday_info=birthday_info, master_guidance=response):
+            logger.warning("Master Agent: Elderly Agent not registered")
+            
+    async def prepare_guidance(self, birthday_info: Dict[str, Any], day: date) -> str:
+        """Guidance for the Elderly Agent about a birthday on ``day`` (precomputed when available)"""
         # Use LLM to generate appropriate response
         prompt = f"""
         A birthday alert has been received for {birthday_info['name']} ({birthday_info['relationship']}).
@@ -40,7 +74,7 @@ class MasterAgent(Agent):
         2. Generate a warm, personalized message
         3. Suggest appropriate actions
         
-        Birthday Info: {json.dumps(birthday_info, indent=2)}
+        Birthday Info: {self.format_data(birthday_info, fields=PERSON_FIELDS + ('llm_analysis',), max_text_chars=800)}
         
         Generate a response that includes:
         - A warm birthday reminder message
@@ -48,32 +82,17 @@ class MasterAgent(Agent):
         - Any additional context that might be helpful
         """
         
-        response = await self.llm_call(prompt)
-        print(f"Master Agent LLM Response: {response}")
-        
-        # Log the interaction
-        self.conversation_log.append({
-            "timestamp": datetime.now().isoformat(),
-            "type": "birthday_alert",
-            "data": birthday_info,
-            "llm_response": response
-        })
-        
-        # Instruct Elderly Agent to remind the user
-        if "elderly_agent" in self.agents:
-            await self.agents["elderly_agent"].remind_birthday(birthday_info, response)
-        else:
-            print("Master Agent: Elderly Agent not registered")
+        return await self.precomputed_call(birthday_info, day, prompt, "master.guidance")
             
     async def handle_elderly_response(self, response: str, context: Dict[str, Any]):
         """Handle responses from the elderly user using LLM analysis"""
-        print(f"Master Agent: Elderly user response: {response}")
+        logger.info("Master Agent: Elderly user response: %s", response)
         
         # Use LLM to analyze the response and determine next steps
         prompt = f"""
         The elderly user has responded: "{response}"
         
-        Context: {json.dumps(context, indent=2)}
+        Context: {self.format_data(context, nested_fields={'birthday_info': PERSON_FIELDS}, max_text_chars=600)}
         
         Analyze this response and determine:
         1. What action the user wants to take
@@ -82,39 +101,21 @@ class MasterAgent(Agent):
         4. Any follow-up actions needed
         """
         
-        analysis = await self.llm_call(prompt)
-        print(f"Master Agent Analysis: {analysis}")
+        analysis = await self.llm_call(prompt, step="master.response_analysis")
+        logger.info("Master Agent Analysis: %s", analysis)
         
         # Log the interaction
-        self.conversation_log.append({
+        self.log_interaction({
             "timestamp": datetime.now().isoformat(),
             "type": "elderly_response",
             "response": response,
             "context": context,
             "analysis": analysis
-        })
+        }, person=context.get('birthday_info', {}).get('name'))
         
         # Notify Younger Relative Agent if needed
-        if "younger_relative_agent" in self.agents:
-            await self.agents["younger_relative_agent"].notify_interaction(response, context, analysis)
-            
-    async def llm_call(self, prompt: str) -> str:
-        """Make a call to OpenAI GPT-4o"""
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            return response.choices[0].message.content or "I'm having trouble processing that right now."
-        except Exception as e:
-            print(f"Error calling OpenAI: {e}")
-            return "I'm having trouble processing that right now."
+        await self.bus.publish("interaction", response=response, context=context, master_analysis=analysis)
             
     def get_conversation_log(self) -> List[Dict]:
-        """Get the conversation log for demo purposes"""
-        return self.conversation_log 
\ No newline at end of file
+        """Most recent conversation log entries (bounded; use ``interactions.page`` for history)"""
+        return self.interactions.recent(self.log_channel) 
\ No newline at end of file
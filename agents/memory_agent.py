@@ -1,13 +1,39 @@
 import json
 import asyncio
-from datetime import datetime, date
-from typing import Dict, List, Any
+import logging
+from datetime import datetime, date, time, timedelta
+from typing import Dict, List, Any, Optional, AsyncIterator, Tuple
 import os
 from .base_agent import Agent
-import openai
+from .llm_transport import LLMTransport, get_shared_transport
+from .cascade_scheduler import CascadeScheduler, CascadeResult, current_cascade
+from .birthday_store import BirthdayStore
+from .birthday_stream import iter_records, month_day_keys, falls_on, next_occurrence
+from .alert_ledger import AlertLedger
+from .precompute_store import PrecomputeStore
+from .errors import LLMError
+from .token_usage import estimate_tokens
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
 
 class MemoryAgent(Agent):
-    def __init__(self, openai_api_key: str, data_file_path: str = "data/birthdays.json"):
+    max_tokens = 400
+    temperature = 0.6
+    # Batched analysis: people per request, prompt token budget, reply tokens per person
+    analysis_batch_size = 10
+    analysis_prompt_budget = 3000
+    analysis_tokens_per_person = 160
+    # Streamed records wait at most this long for their analysis batch to fill
+    analysis_flush_seconds = 0.1
+    # Finished interactions are folded into the person's memory
+    subscriptions = {"interaction": "remember_interaction"}
+    # Longest wait before monitoring retries today's failed cascades
+    max_retry_delay = 30 * 60
+    
+    def __init__(self, openai_api_key: str, data_file_path: str = "data/birthdays.json", transport: Optional[LLMTransport] = None,
+                 max_concurrent_cascades: int = 10, streaming: bool = False, ledger: Optional[AlertLedger] = None,
+                 analysis_batch_size: Optional[int] = None, precomputed: Optional[PrecomputeStore] = None):
         super().__init__(
             name="Memory Agent",
             system_prompt="""You are a Memory Agent specialized in monitoring and analyzing important dates and events. 
@@ -17,107 +43,545 @@ class MemoryAgent(Agent):
             3. Provide intelligent alerts with context and suggestions
             4. Help maintain family connections through timely reminders
             
-            Always be thorough, accurate, and considerate of family relationships."""
+            Always be thorough, accurate, and considerate of family relationships.""",
+            transport=transport or get_shared_transport(openai_api_key)
         )
-        self.openai_client = openai.OpenAI(api_key=openai_api_key)
-        self.data_file_path = data_file_path
+        self.store = BirthdayStore(data_file_path)
         self.master_agent = None
+        self.scheduler = CascadeScheduler(max_concurrent_cascades)
+        # Stream records from disk instead of loading the whole file
+        self.streaming = streaming
+        # Which (person, date) alerts have already been delivered
+        self.ledger = ledger or AlertLedger(None)
+        if analysis_batch_size:
+            self.analysis_batch_size = analysis_batch_size
+        self.precomputed = precomputed
+        # Streaming builds no index: the data file's stat() signature and the
+        # next birthday date found by the last full scan stand in for it
+        self._watched_signature: Optional[Tuple[int, int]] = None
+        self._next_day_scan: Optional[Tuple[Any, Optional[date]]] = None
+        
+    @property
+    def data_file_path(self) -> str:
+        return self.store.data_file_path
+        
+    @data_file_path.setter
+    def data_file_path(self, data_file_path: str):
+        self.store = BirthdayStore(data_file_path)
         
     def register_master_agent(self, master_agent):
-        """Register the master agent for communication"""
+        """Register the master agent; alerts are published on its bus"""
         self.master_agent = master_agent
-        print(f"Memory Agent: Registered with Master Agent")
+        self.subscribe(master_agent.bus)
+        logger.info("Memory Agent: Registered with Master Agent")
         
-    def load_birthday_data(self) -> Dict[str, Any]:
-        """Load birthday data from JSON file"""
+    async def remember_interaction(self, response: str, context: Dict[str, Any], master_analysis: str):
+        """Fold a finished interaction into the person's running summary (``person_memory``).
+        
+        The prompt holds the previous summary and this interaction only, so
+        its size stays the same however much history there is.
+        """
+        birthday_info = context.get("birthday_info") or {}
+        if self.person_memory is None or not birthday_info:
+            return
+        cascade = current_cascade.get()
+        if cascade and self.checkpoints is not None and self.checkpoints.has(cascade, "memory.summary"):
+            # Already folded in before this cascade was interrupted; folding again would count it twice
+            return
+        name = birthday_info.get("name", "Unknown")
+        relationship = birthday_info.get("relationship", "family member")
+        summary = self.person_memory.get(birthday_info)
+        words = max(20, self.person_memory.max_chars // 7)
+        prompt = f"""
+        Update the running summary of the family's interactions about {name} ({relationship}).
+        
+        Summary so far: {summary or "(nothing yet)"}
+        New interaction on {date.today().isoformat()}:
+        Elderly user's response: "{self.forward_text(response, 400)}"
+        Master Agent analysis: {self.forward_text(master_analysis, 400)}
+        
+        Rewrite the summary to include what matters from the new interaction: preferences, plans,
+        how the elderly user felt and what they asked for. Keep the most useful earlier details and drop the rest.
+        Reply with the summary only, at most {words} words.
+        """
         try:
-            with open(self.data_file_path, 'r') as file:
-                return json.load(file)
-        except FileNotFoundError:
-            print(f"Memory Agent: Birthday file not found at {self.data_file_path}")
-            return {"birthdays": [], "events": []}
-        except json.JSONDecodeError:
-            print(f"Memory Agent: Invalid JSON in birthday file")
-            return {"birthdays": [], "events": []}
+            updated = await self.llm_call(prompt, step="memory.summary")
+        except LLMError as e:
+            logger.warning("Memory Agent: Could not update the memory of %s: %s", name, e)
+            return
+        self.person_memory.put(birthday_info, updated)
+        logger.info("Memory Agent: Updated the memory of %s", name)
+        
+    def load_birthday_data(self) -> Dict[str, Any]:
+        """Load birthday data, re-reading the JSON file only if it changed"""
+        self.store.refresh()
+        return self.store.data
+        
+    def get_todays_events(self) -> List[Dict[str, Any]]:
+        """Events (holidays, gatherings) falling on today's date, with any precomputed analysis"""
+        today = date.today()
+        events = self.store.events_on(today)
+        for event in events:
+            self._attach_precomputed(event, today)
+        return events
             
+    def get_cache_ttl(self) -> float:
+        """Analysis of today's birthdays stays valid until the end of the calendar day"""
+        now = datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        return (midnight - now).total_seconds()
+        
     async def analyze_todays_birthdays(self) -> List[Dict[str, Any]]:
         """Use LLM to analyze today's birthdays and provide context"""
         today = date.today()
-        birthday_data = self.load_birthday_data()
-        todays_birthdays = []
+        # Indexed (month, day) lookup; the file is only re-read when it changes
+        todays_birthdays = self.store.birthdays_on(today)
+        return await self.analyze_birthdays(todays_birthdays, today)
         
-        # Find birthdays for today
-        for birthday in birthday_data.get("birthdays", []):
-            try:
-                birthday_date = datetime.strptime(birthday["date"], "%Y-%m-%d").date()
-                if birthday_date.month == today.month and birthday_date.day == today.day:
-                    todays_birthdays.append(birthday)
-            except ValueError:
-                print(f"Memory Agent: Invalid date format for {birthday.get('name', 'Unknown')}")
-        
-        if todays_birthdays:
-            # Use LLM to analyze and enhance the birthday information
-            prompt = f"""
-            Analyze these birthdays for today ({today.strftime('%B %d')}):
-            {json.dumps(todays_birthdays, indent=2)}
-            
-            For each birthday, provide:
-            1. The significance of the relationship
-            2. Suggested ways to celebrate or connect
-            3. Any special considerations (age, distance, etc.)
-            4. Emotional context for the family
-            
-            Format your response as enhanced birthday information with additional context.
-            """
-            
-            analysis = await self.llm_call(prompt)
-            print(f"Memory Agent Analysis: {analysis}")
-            
-            # Enhance the birthday data with LLM analysis
-            for birthday in todays_birthdays:
-                birthday["llm_analysis"] = analysis
-                birthday["analysis_date"] = today.isoformat()
-                
+    async def analyze_birthdays(self, todays_birthdays: List[Dict[str, Any]], today: date,
+                                kind: str = "birthdays",
+                                slots: Optional[asyncio.Semaphore] = None) -> List[Dict[str, Any]]:
+        """Use LLM to analyze the given birthdays and attach each person's own analysis to their record.
+        
+        People are sent in batches of up to ``analysis_batch_size`` per request
+        (fewer when the prompt would exceed ``analysis_prompt_budget`` tokens),
+        and the model answers with structured JSON keyed per person. People
+        whose analysis for ``today`` was precomputed from an unchanged record
+        are not sent at all. ``kind`` names the records in the prompt ("events").
+        At most the transport's ``max_in_flight`` batches are requested at
+        once (or as many as ``slots`` allows, when calls share it), so the rest
+        do not spend their deadline queued for a slot.
+        """
+        pending = [b for b in todays_birthdays if not self._attach_precomputed(b, today)]
+        if pending:
+            batches = self._plan_analysis_batches(pending)
+            slots = slots or asyncio.Semaphore(max(1, self.transport.max_in_flight))
+            await asyncio.gather(*(self._analyze_batch(batch, today, kind, slots) for batch in batches))
         return todays_birthdays
         
-    async def check_and_alert(self):
-        """Check for birthdays and alert master agent with LLM-enhanced information"""
-        todays_birthdays = await self.analyze_todays_birthdays()
+    def _attach_precomputed(self, record: Dict[str, Any], day: date) -> bool:
+        analysis = self.precomputed.get(record, day, "memory.analysis") if self.precomputed is not None else None
+        if analysis is None:
+            return False
+        record["llm_analysis"] = analysis
+        record["analysis_date"] = day.isoformat()
+        return True
+        
+    def _plan_analysis_batches(self, birthdays: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        batches, current, current_tokens = [], [], 0
+        for birthday in birthdays:
+            tokens = estimate_tokens(birthday)
+            if current and (len(current) >= self.analysis_batch_size
+                            or current_tokens + tokens > self.analysis_prompt_budget):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(birthday)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+        
+    async def _analyze_batch(self, batch: List[Dict[str, Any]], today: date, kind: str = "birthdays",
+                             slots: Optional[asyncio.Semaphore] = None):
+        slots = slots or asyncio.Semaphore(max(1, self.transport.max_in_flight))
+        people = [{"person_id": f"p{i}", **birthday} for i, birthday in enumerate(batch, 1)]
+        prompt = f"""
+        Analyze these {kind} for today ({today.strftime('%B %d')}):
+        {self.format_data(people)}
+        
+        For each person, provide:
+        1. The significance of the relationship
+        2. Suggested ways to celebrate or connect
+        3. Any special considerations (age, distance, etc.)
+        4. Emotional context for the family
         
-        if todays_birthdays:
-            print(f"Memory Agent: Found {len(todays_birthdays)} birthday(s) today!")
+        Keep each analysis under 120 words and specific to that person.
+        Respond with a JSON object of the form
+        {{"people": [{{"person_id": "<person_id>", "analysis": "<analysis text>"}}]}}
+        with exactly one entry per person_id.
+        """
+        
+        max_tokens = min(self.analysis_tokens_per_person * len(batch) + 50, 4096)
+        try:
+            # Only the request holds a slot: retried halves below take their own
+            async with slots:
+                response = await self.llm_call(prompt, step="memory.analysis", max_tokens=max_tokens,
+                                               json_output=True)
+        except LLMError as e:
+            # Alerts still go out; these birthdays just carry no analysis
+            logger.warning("Memory Agent: Analysis unavailable for %s %s: %s", len(batch), kind, e)
+            return
+        analyses = self._parse_batch_analysis(response)
+        
+        missing = []
+        for person, birthday in zip(people, batch):
+            analysis = analyses.get(person["person_id"])
+            if analysis is None:
+                missing.append(birthday)
+                continue
+            self._attach_analysis(birthday, analysis, today)
             
-            for birthday in todays_birthdays:
-                print(f"Memory Agent: Alerting Master Agent about {birthday['name']}'s birthday")
-                
-                if self.master_agent:
-                    await self.master_agent.handle_birthday_alert(birthday)
-                else:
-                    print("Memory Agent: Master Agent not registered")
+        if not missing:
+            return
+        if len(batch) == 1:
+            # Unstructured reply for a single person: use the text as-is
+            self._attach_analysis(batch[0], response, today)
+        elif len(missing) < len(batch):
+            await self._analyze_batch(missing, today, kind, slots)
         else:
-            print("Memory Agent: No birthdays today")
+            # Nothing usable came back; retry in two smaller batches
+            half = len(batch) // 2
+            await asyncio.gather(self._analyze_batch(batch[:half], today, kind, slots),
+                                 self._analyze_batch(batch[half:], today, kind, slots))
             
-    async def start_monitoring(self, check_interval: int = 60):
-        """Start monitoring birthdays at regular intervals"""
-        print(f"Memory Agent: Starting birthday monitoring (checking every {check_interval} seconds)")
+    @staticmethod
+    def _parse_batch_analysis(response: str) -> Dict[str, str]:
+        try:
+            people = json.loads(response).get("people", [])
+            return {str(p["person_id"]): str(p["analysis"]) for p in people if "person_id" in p and "analysis" in p}
+        except (ValueError, AttributeError, TypeError):
+            return {}
+            
+    def _attach_analysis(self, birthday: Dict[str, Any], analysis: str, today: date):
+        logger.info("Memory Agent Analysis for %s: %s", birthday.get('name', 'Unknown'), analysis)
+        if self.precomputed is not None:
+            self.precomputed.put(birthday, today, "memory.analysis", analysis)
+        birthday["llm_analysis"] = analysis
+        birthday["analysis_date"] = today.isoformat()
+        
+    async def stream_todays_birthdays(self, yield_every: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Yield today's birthdays while the data file is still being read.
+        
+        Records are parsed one at a time, so memory stays flat regardless of
+        file size; the event loop gets a turn every ``yield_every`` records.
+        """
+        keys = month_day_keys(date.today())
+        try:
+            for scanned, record in enumerate(iter_records(self.data_file_path), 1):
+                if falls_on(record, keys):
+                    yield record
+                if scanned % yield_every == 0:
+                    await asyncio.sleep(0)
+        except FileNotFoundError:
+            logger.warning("Memory Agent: Birthday file not found at %s", self.data_file_path)
+        except ValueError as e:
+            logger.warning("Memory Agent: Invalid JSON in birthday file (%s)", e)
+            
+    async def _stream_batches(self, records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Group streamed records into analysis batches.
+        
+        A batch is passed on once it holds ``analysis_batch_size`` records or
+        ``analysis_flush_seconds`` after its first record arrived, so a slow
+        trickle of matches is not held back waiting for a full batch.
+        """
+        loop = asyncio.get_running_loop()
+        batch: List[Dict[str, Any]] = []
+        flush_at = None
+        # Awaited through wait() so a flush timeout never cancels the read
+        next_record = asyncio.ensure_future(records.__anext__())
+        try:
+            while True:
+                timeout = None if flush_at is None else max(0.0, flush_at - loop.time())
+                done, _ = await asyncio.wait((next_record,), timeout=timeout)
+                if done:
+                    try:
+                        record = next_record.result()
+                    except StopAsyncIteration:
+                        break
+                    next_record = asyncio.ensure_future(records.__anext__())
+                    if not batch:
+                        flush_at = loop.time() + self.analysis_flush_seconds
+                    batch.append(record)
+                    if len(batch) < self.analysis_batch_size:
+                        continue
+                yield batch
+                batch, flush_at = [], None
+            if batch:
+                yield batch
+        finally:
+            next_record.cancel()
+            
+    async def check_and_alert(self, skip_alerted: bool = False) -> List[CascadeResult]:
+        """Check for birthdays and alert master agent with LLM-enhanced information.
         
+        With ``skip_alerted``, people already alerted today (per the persisted
+        ledger) are skipped before any LLM work is done. Each run is traced as
+        a ``check_and_alert`` span enclosing its cascade spans.
+        """
+        with tracer.span("check_and_alert", streaming=self.streaming) as span:
+            if self.streaming:
+                results = await self.stream_and_alert(skip_alerted)
+            else:
+                results = await self._check_and_alert(skip_alerted)
+            span.set(**CascadeScheduler.summarize(results))
+            return results
+            
+    async def _check_and_alert(self, skip_alerted: bool) -> List[CascadeResult]:
+        today = date.today()
+        todays_birthdays = self.store.birthdays_on(today)
+        
+        if not todays_birthdays:
+            logger.info("Memory Agent: No birthdays today")
+            return []
+            
+        logger.info("Memory Agent: Found %s birthday(s) today!", len(todays_birthdays))
+        return await self.alert_birthdays(todays_birthdays, today, skip_alerted)
+        
+    async def alert_birthdays(self, todays_birthdays: List[Dict[str, Any]], today: date,
+                              skip_alerted: bool = False) -> List[CascadeResult]:
+        """Analyze the given birthdays and run their cascades, at most ``max_concurrent_cascades`` at a time.
+        
+        The birthdays may come from any number of data files (see
+        ``sharded_runner``); they share the analysis batches and the cap.
+        """
+        if skip_alerted:
+            todays_birthdays = [b for b in todays_birthdays if not self.ledger.has_alerted(b, today)]
+            if not todays_birthdays:
+                logger.info("Memory Agent: All of today's birthdays were already alerted")
+                return []
+        if not self.master_agent:
+            logger.warning("Memory Agent: Master Agent not registered")
+            return []
+            
+        await self.analyze_birthdays(todays_birthdays, today)
+        
+        async def alert(birthday: Dict[str, Any]):
+            logger.info("Memory Agent: Alerting Master Agent about %s's birthday", birthday['name'])
+            # Returns once the whole cascade has been handled downstream
+            await self.bus.request("birthday_alert", birthday_info=birthday)
+            self._finish_cascade(birthday, today)
+            
+        # Birthdays run concurrently; each person's own cascade stays ordered
+        results = await self.scheduler.run(todays_birthdays, alert)
+        self._report(results)
+        return results
+            
+    async def stream_and_alert(self, skip_alerted: bool = False) -> List[CascadeResult]:
+        """Streaming variant of check_and_alert: birthdays are analyzed and
+        alerted while the rest of the file is still being parsed.
+        
+        Matches are analyzed in batches like ``alert_birthdays`` does (see
+        ``_stream_batches``); each batch's request starts as soon as the batch
+        is complete and its people's cascades start alongside it.
+        """
+        if not self.master_agent:
+            logger.warning("Memory Agent: Master Agent not registered")
+            return []
+        today = date.today()
+        # Changes from here on re-trigger monitoring (see wait_for_next_trigger)
+        self._watched_signature = self._data_signature()
+        slots = asyncio.Semaphore(max(1, self.transport.max_in_flight))
+        analyses: Dict[int, asyncio.Future] = {}
+        
+        async def pending_birthdays() -> AsyncIterator[Dict[str, Any]]:
+            async for birthday in self.stream_todays_birthdays():
+                if not (skip_alerted and self.ledger.has_alerted(birthday, today)):
+                    yield birthday
+                    
+        async def analyzed_birthdays() -> AsyncIterator[Dict[str, Any]]:
+            async for batch in self._stream_batches(pending_birthdays()):
+                analysis = asyncio.ensure_future(self.analyze_birthdays(batch, today, slots=slots))
+                for birthday in batch:
+                    analyses[id(birthday)] = analysis
+                    yield birthday
+                    
+        async def analyze_and_alert(birthday: Dict[str, Any]):
+            # Shared by the whole batch: one cascade failing must not cancel it
+            await asyncio.shield(analyses.pop(id(birthday)))
+            logger.info("Memory Agent: Alerting Master Agent about %s's birthday", birthday['name'])
+            # Returns once the whole cascade has been handled downstream
+            await self.bus.request("birthday_alert", birthday_info=birthday)
+            self._finish_cascade(birthday, today)
+            
+        results = await self.scheduler.run_stream(analyzed_birthdays(), analyze_and_alert)
+        if not results:
+            logger.info("Memory Agent: No new birthdays today")
+            return results
+        logger.info("Memory Agent: Found %s birthday(s) today!", len(results))
+        self._report(results)
+        return results
+        
+    def _finish_cascade(self, birthday: Dict[str, Any], today: date):
+        """Record a completed cascade in the ledger; its step checkpoints are no longer needed"""
+        self.ledger.mark_alerted(birthday, today)
+        if self.checkpoints is not None:
+            self.checkpoints.clear(current_cascade.get())
+            
+    def _report(self, results: List[CascadeResult]):
+        for result in results:
+            status = "ok" if result.ok else f"failed ({result.error!r})"
+            tokens = self.transport.usage.cascade_usage(result.cascade_id)
+            logger.info("Memory Agent: Cascade for %s took %.2fs, %s+%s tokens - %s", result.key, result.latency,
+                        tokens['prompt_tokens'], tokens['completion_tokens'], status)
+        logger.info("Memory Agent: Cascade summary %s", CascadeScheduler.summarize(results))
+        
+    async def precompute(self, days_ahead: int = 7, start: Optional[date] = None) -> Dict[str, int]:
+        """Generate tomorrow's (or ``start``'s) and the following days' outputs ahead of time.
+        
+        For every birthday in the next ``days_ahead`` days the analysis,
+        Master Agent guidance and Elderly Agent reminder are generated and
+        kept in the precompute store, so on the day the cascade looks them up
+        instead of calling the LLM; records edited in the meantime are simply
+        regenerated then. Events get their analysis. Nothing is delivered or
+        logged. Already-stored outputs are skipped, so re-running is cheap.
+        """
+        if self.precomputed is None or self.master_agent is None:
+            logger.warning("Memory Agent: Precompute needs a precompute store and a registered Master Agent")
+            return {"birthdays": 0, "events": 0, "failed": 0}
+        start = start or date.today() + timedelta(days=1)
+        end = start + timedelta(days=days_ahead - 1)
+        by_day: Dict[date, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+        for day, birthday in self.store.birthdays_between(start, end):
+            by_day.setdefault(day, ([], []))[0].append(birthday)
+        for day, event in self.store.events_between(start, end):
+            by_day.setdefault(day, ([], []))[1].append(event)
+        logger.info("Memory Agent: Precomputing %s to %s (%s days with dates)",
+                    start.isoformat(), end.isoformat(), len(by_day))
+        
+        semaphore = asyncio.Semaphore(self.scheduler.max_concurrent_cascades)
+        elderly_agent = self.master_agent.agents.get("elderly_agent")
+        
+        async def prepare(birthday: Dict[str, Any], day: date):
+            async with semaphore:
+                guidance = await self.master_agent.prepare_guidance(birthday, day)
+                if elderly_agent is not None:
+                    await elderly_agent.prepare_reminder(birthday, guidance, day)
+                    
+        counts = {"birthdays": 0, "events": 0, "failed": 0}
+        # Nearest days first, so a window that closes early still covers them
+        for day, (birthdays, events) in sorted(by_day.items()):
+            await self.analyze_birthdays(birthdays, day)
+            if events:
+                await self.analyze_birthdays(events, day, kind="events")
+            # Without an analysis the guidance would not match the day's prompt
+            ready = [birthday for birthday in birthdays if "llm_analysis" in birthday]
+            results = await asyncio.gather(*(prepare(birthday, day) for birthday in ready), return_exceptions=True)
+            failures = [result for result in results if isinstance(result, Exception)]
+            for failure in failures:
+                logger.warning("Memory Agent: Precompute failed for a birthday on %s: %s", day.isoformat(), failure)
+            counts["birthdays"] += len(ready) - len(failures)
+            counts["events"] += sum(1 for event in events if "llm_analysis" in event)
+            counts["failed"] += len(birthdays) - len(ready) + len(failures)
+        logger.info("Memory Agent: Precompute finished %s", counts)
+        return counts
+        
+    @staticmethod
+    def precompute_window(now: datetime, start_hour: int, end_hour: int) -> Tuple[datetime, datetime]:
+        """Start and end of the current or next daily low-traffic window (may wrap past midnight)"""
+        start = datetime.combine(now.date(), time(start_hour))
+        end = datetime.combine(now.date(), time(end_hour))
+        if end <= start:
+            end += timedelta(days=1)
+            if now < end - timedelta(days=1):
+                # Still inside the window that opened yesterday
+                start -= timedelta(days=1)
+                end -= timedelta(days=1)
+        if now >= end:
+            start += timedelta(days=1)
+            end += timedelta(days=1)
+        return start, end
+        
+    async def start_precompute(self, days_ahead: int = 7, start_hour: int = 2, end_hour: int = 5):
+        """Run ``precompute`` once a day inside the [start_hour, end_hour) local-time window.
+        
+        Work still pending when the window closes is left for the day itself.
+        """
         while True:
-            await self.check_and_alert()
-            await asyncio.sleep(check_interval)
+            start, end = self.precompute_window(datetime.now(), start_hour, end_hour)
+            wait = (start - datetime.now()).total_seconds()
+            if wait > 0:
+                logger.info("Memory Agent: Next precompute window opens in %.1f hours", wait / 3600)
+                await asyncio.sleep(wait)
+            try:
+                await asyncio.wait_for(self.precompute(days_ahead), (end - datetime.now()).total_seconds())
+            except asyncio.TimeoutError:
+                logger.info("Memory Agent: Precompute window closed; remaining dates are generated on the day")
+            # Sleep out the rest of the window so it runs once a day
+            await asyncio.sleep(max(0.0, (end - datetime.now()).total_seconds()))
             
-    async def llm_call(self, prompt: str) -> str:
-        """Make a call to OpenAI GPT-4o"""
+    def seconds_until_next_check(self, now: Optional[datetime] = None) -> float:
+        """Seconds until the next midnight on which someone has a birthday"""
+        now = now or datetime.now()
+        next_day = self._next_birthday_date(now.date() + timedelta(days=1))
+        if next_day is None:
+            # Nothing scheduled; wake at midnight anyway to re-evaluate
+            next_day = now.date() + timedelta(days=1)
+        return (datetime.combine(next_day, datetime.min.time()) - now).total_seconds()
+        
+    def _next_birthday_date(self, start: date) -> Optional[date]:
+        if not self.streaming:
+            return self.store.next_birthday_date(start)
+        # One pass over the file per change (or new day), not one per poll
+        key = (self._data_signature(), start)
+        if self._next_day_scan is None or self._next_day_scan[0] != key:
+            try:
+                next_day = next_occurrence(iter_records(self.data_file_path), start)
+            except (FileNotFoundError, ValueError):
+                next_day = None
+            self._next_day_scan = (key, next_day)
+        return self._next_day_scan[1]
+        
+    def _data_signature(self) -> Optional[Tuple[int, int]]:
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=400,
-                temperature=0.6
-            )
-            return response.choices[0].message.content or "No analysis available."
-        except Exception as e:
-            print(f"Error calling OpenAI: {e}")
-            return "I'm having trouble analyzing that right now." 
\ No newline at end of file
+            stat = os.stat(self.data_file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+        
+    def _data_changed(self) -> bool:
+        if not self.streaming:
+            # Cheap stat() of the data file; the index is rebuilt only if it changed
+            return self.store.refresh()
+        signature = self._data_signature()
+        if signature == self._watched_signature:
+            return False
+        self._watched_signature = signature
+        return True
+        
+    async def wait_for_next_trigger(self, poll_interval: float, retry_in: Optional[float] = None):
+        """Sleep until the next relevant date transition, until the data file changes, or ``retry_in`` seconds"""
+        loop = asyncio.get_running_loop()
+        retry_at = loop.time() + retry_in if retry_in is not None else None
+        
+        def time_left() -> float:
+            remaining = self.seconds_until_next_check()
+            return remaining if retry_at is None else min(remaining, retry_at - loop.time())
+            
+        remaining = time_left()
+        logger.info("Memory Agent: Next birthday check in %.1f hours (or when the data file changes)", remaining / 3600)
+        while remaining > 0:
+            await asyncio.sleep(min(poll_interval, remaining))
+            if self._data_changed():
+                logger.info("Memory Agent: Data file changed, re-checking today's birthdays")
+                return
+            remaining = time_left()
+            
+    async def start_monitoring(self, check_interval: int = 60):
+        """Start edge-triggered birthday monitoring.
+        
+        Birthdays are checked once per relevant date transition rather than on
+        every tick, and each (person, date) is alerted at most once, even
+        across restarts. ``check_interval`` is how often the data file is
+        polled for changes; polling never calls the LLM.
+        
+        Failed cascades are not recorded as alerted, so while any of today's
+        cascades failed the check is repeated after ``check_interval``
+        seconds, doubling up to ``max_retry_delay``.
+        
+        With ``streaming`` no index of the data file is built: the file is
+        re-read when it changes or to find the next birthday date.
+        """
+        logger.info("Memory Agent: Starting birthday monitoring (watching the data file every %s seconds)",
+                    check_interval)
+        
+        retry_delay = None
+        while True:
+            results = await self.check_and_alert(skip_alerted=True)
+            self.ledger.prune(date.today() - timedelta(days=7))
+            failed = sum(1 for result in results if not result.ok)
+            if failed:
+                retry_delay = min(self.max_retry_delay, retry_delay * 2) if retry_delay else check_interval
+                logger.warning("Memory Agent: %s cascade(s) failed; retrying in %s seconds", failed, retry_delay)
+            else:
+                retry_delay = None
+            await self.wait_for_next_trigger(check_interval, retry_delay)
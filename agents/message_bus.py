@@ -0,0 +1,244 @@
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class _Cascade:
+    """Completion of everything published on behalf of one ``request``.
+
+    The first error fails the cascade: its handlers still running are
+    cancelled, its messages still queued are dropped, and ``done`` raises
+    the error once all of them have stopped.
+    """
+
+    __slots__ = ("pending", "done", "error", "tasks")
+
+    def __init__(self, done: asyncio.Future):
+        self.pending = 0
+        self.done = done
+        self.error: Optional[BaseException] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    def fail(self, error: BaseException):
+        if self.error is not None:
+            return
+        self.error = error
+        for task in list(self.tasks):
+            task.cancel()
+
+    def finish(self, task: Optional[asyncio.Task] = None):
+        self.tasks.discard(task)
+        self.pending -= 1
+        if self.pending > 0 or self.done.done():
+            return
+        if isinstance(self.error, asyncio.CancelledError):
+            self.done.cancel()
+        elif self.error is not None:
+            self.done.set_exception(self.error)
+        else:
+            self.done.set_result(None)
+
+
+# The cascade the current handler belongs to; travels with each message
+_current_cascade: contextvars.ContextVar[Optional[_Cascade]] = contextvars.ContextVar("bus_cascade", default=None)
+
+
+class _Message:
+    __slots__ = ("payload", "context", "cascade", "enqueued_at")
+
+    def __init__(self, payload: Dict[str, Any], context: contextvars.Context, cascade: Optional[_Cascade]):
+        self.payload = payload
+        self.context = context
+        self.cascade = cascade
+        self.enqueued_at = time.perf_counter()
+
+
+class Subscription:
+    """One subscriber's bounded queue on a topic, drained by its own worker pool"""
+
+    def __init__(self, topic: str, subscriber: str, handler: Callable[..., Awaitable[Any]],
+                 concurrency: int, queue_size: int):
+        self.topic = topic
+        self.subscriber = subscriber
+        self.handler = handler
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.stats = {"published": 0, "handled": 0, "failed": 0, "cancelled": 0, "dropped": 0, "max_depth": 0,
+                      "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                      "busy_seconds": 0.0, "max_busy_seconds": 0.0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._loop = None
+
+    def _ensure_started(self):
+        # Queues and workers are bound to one loop; restart them on a new one
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._queue = asyncio.Queue(self.queue_size)
+        self._workers = [loop.create_task(self._work()) for _ in range(self.concurrency)]
+        self._loop = loop
+
+    async def put(self, message: _Message):
+        self._ensure_started()
+        # Waits while the queue is full: backpressure on the publisher
+        await self._queue.put(message)
+        self.stats["published"] += 1
+        self.stats["max_depth"] = max(self.stats["max_depth"], self._queue.qsize())
+
+    async def _work(self):
+        while True:
+            message = await self._queue.get()
+            cascade = message.cascade
+            if cascade is not None and cascade.error is not None:
+                # Its cascade has already failed; nobody is waiting for this
+                self.stats["dropped"] += 1
+                self._queue.task_done()
+                cascade.finish()
+                continue
+            started = time.perf_counter()
+            wait = started - message.enqueued_at
+            self.stats["wait_seconds"] += wait
+            self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], wait)
+            # Run in the publisher's context (cascade id, bus cascade, parent span, ...)
+            task = message.context.run(asyncio.ensure_future, self._handle(message.payload, wait))
+            if cascade is not None:
+                cascade.tasks.add(task)
+            try:
+                # Not awaited directly, so a handler cancelled by its cascade is told apart from this worker's
+                await asyncio.wait((task,))
+            except asyncio.CancelledError:
+                # The bus is closing: stop the handler and cancel its cascade
+                task.cancel()
+                self._done(message, started, task, asyncio.CancelledError())
+                raise
+            error = None
+            if task.cancelled():
+                self.stats["cancelled"] += 1
+            elif task.exception() is not None:
+                error = task.exception()
+                self.stats["failed"] += 1
+                logger.warning("Message Bus: %s failed on %s: %r", self.subscriber, self.topic, error)
+            else:
+                self.stats["handled"] += 1
+            self._done(message, started, task, error)
+
+    def _done(self, message: _Message, started: float, task: asyncio.Task, error: Optional[BaseException]):
+        busy = time.perf_counter() - started
+        self.stats["busy_seconds"] += busy
+        self.stats["max_busy_seconds"] = max(self.stats["max_busy_seconds"], busy)
+        self._queue.task_done()
+        if message.cascade is not None:
+            if error is not None:
+                message.cascade.fail(error)
+            message.cascade.finish(task)
+
+    async def _handle(self, payload: Dict[str, Any], wait: float):
+        with tracer.span("bus.handle", topic=self.topic, subscriber=self.subscriber, queue_wait=wait):
+            await self.handler(**payload)
+
+    def metrics(self) -> Dict[str, Any]:
+        handled = self.stats["handled"] + self.stats["failed"] + self.stats["cancelled"]
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "workers": self.concurrency,
+            "queue_size": self.queue_size,
+            **{key: round(value, 4) if isinstance(value, float) else value for key, value in self.stats.items()},
+            "avg_wait_seconds": round(self.stats["wait_seconds"] / handled, 4) if handled else 0.0,
+            "avg_busy_seconds": round(self.stats["busy_seconds"] / handled, 4) if handled else 0.0
+        }
+
+    def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        self._loop = None
+
+
+class MessageBus:
+    """In-process async publish/subscribe between agents.
+
+    Every subscription has its own bounded queue and pool of worker tasks,
+    so each agent processes messages at its own concurrency and a slow
+    stage only backs up its own queue; publishers wait only when that queue
+    is full. Stages of different cascades overlap (pipelining).
+
+    ``request`` publishes a message and waits until it and every message
+    published while handling it (transitively) have been handled, raising
+    the first handler error. This is how a caller waits for a whole cascade.
+    After an error the rest of the cascade is cancelled, and the error is
+    raised once it has stopped, so nothing of a failed cascade runs on
+    after ``request`` returns.
+    """
+
+    def __init__(self, default_concurrency: int = 4, default_queue_size: int = 100):
+        self.default_concurrency = default_concurrency
+        self.default_queue_size = default_queue_size
+        self.subscriptions: Dict[str, Dict[str, Subscription]] = {}
+
+    def subscribe(self, topic: str, subscriber: str, handler: Callable[..., Awaitable[Any]],
+                  concurrency: Optional[int] = None, queue_size: Optional[int] = None) -> Subscription:
+        """Deliver ``topic`` messages to ``handler(**payload)``; re-subscribing replaces the handler"""
+        concurrency = concurrency or self.default_concurrency
+        queue_size = queue_size or self.default_queue_size
+        subscribers = self.subscriptions.setdefault(topic, {})
+        previous = subscribers.get(subscriber)
+        if previous is not None:
+            if (previous.handler, previous.concurrency, previous.queue_size) == (handler, concurrency, queue_size):
+                return previous
+            previous.close()
+        subscribers[subscriber] = Subscription(topic, subscriber, handler, concurrency, queue_size)
+        return subscribers[subscriber]
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self.subscriptions.get(topic))
+
+    async def publish(self, topic: str, **payload) -> bool:
+        """Queue a message for every subscriber of ``topic``; False if there are none"""
+        subscribers = list(self.subscriptions.get(topic, {}).values())
+        if not subscribers:
+            return False
+        cascade = _current_cascade.get()
+        for subscription in subscribers:
+            # Counted once queued: a put cancelled while waiting on a full queue
+            # (e.g. its cascade failed) queued nothing the cascade could wait for.
+            # No worker can take the message before this task next yields.
+            await subscription.put(_Message(payload, contextvars.copy_context(), cascade))
+            if cascade is not None:
+                cascade.pending += 1
+        return True
+
+    async def request(self, topic: str, **payload) -> bool:
+        """Publish and wait for the whole resulting cascade; False if nobody subscribes to ``topic``"""
+        cascade = _Cascade(asyncio.get_running_loop().create_future())
+        token = _current_cascade.set(cascade)
+        try:
+            published = await self.publish(topic, **payload)
+        finally:
+            _current_cascade.reset(token)
+        if not published:
+            return False
+        try:
+            await cascade.done
+        except asyncio.CancelledError:
+            # Nobody is waiting for the rest of the cascade any more
+            cascade.fail(asyncio.CancelledError())
+            raise
+        return True
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Depth, throughput and latency figures per ``subscriber:topic`` queue"""
+        return {f"{subscription.subscriber}:{topic}": subscription.metrics()
+                for topic, subscribers in self.subscriptions.items()
+                for subscription in subscribers.values()}
+
+    def close(self):
+        """Stop every subscription's workers (pending messages are dropped)"""
+        for subscribers in self.subscriptions.values():
+            for subscription in subscribers.values():
+                subscription.close()
@@ -0,0 +1,124 @@
+import json
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Per-million-token prices in USD; override them in the routing config
+DEFAULT_ROUTING: Dict[str, Any] = {
+    "tiers": {
+        "small": {"model": "gpt-4o-mini", "prompt_cost_per_1m": 0.15, "completion_cost_per_1m": 0.60},
+        "large": {"model": "gpt-4o", "prompt_cost_per_1m": 2.50, "completion_cost_per_1m": 10.00}
+    },
+    # Escalation order when a tier's output fails validation
+    "fallback": ["small", "large"],
+    "steps": {
+        "memory.analysis": {"tier": "large", "validate": "json"},
+        "memory.summary": {"tier": "small", "max_tokens": 200, "validate": "text"},
+        "master.guidance": {"tier": "large", "validate": "text"},
+        "master.response_analysis": {"tier": "large", "validate": "text"},
+        "elderly.reminder": {"tier": "large", "validate": "text"},
+        "elderly.suggestions": {"tier": "small", "max_tokens": 150, "validate": "list"},
+        "elderly.user_response": {"tier": "small", "max_tokens": 120, "validate": "text"},
+        "younger.insights": {"tier": "large", "validate": "text"},
+        "younger.suggestions": {"tier": "small", "max_tokens": 250, "validate": "list"}
+    }
+}
+
+_LIST_ITEM = re.compile(r"^\s*(\d+[.)]|[-*•])\s+\S", re.MULTILINE)
+
+
+def _valid_text(content: str) -> bool:
+    return len(content.strip()) >= 20
+
+
+def _valid_list(content: str) -> bool:
+    # At least two bulleted or numbered items, not just any two lines of prose
+    return len(_LIST_ITEM.findall(content)) >= 2
+
+
+def _valid_json(content: str) -> bool:
+    try:
+        return isinstance(json.loads(content), dict)
+    except ValueError:
+        return False
+
+
+VALIDATORS: Dict[str, Callable[[str], bool]] = {"text": _valid_text, "list": _valid_list, "json": _valid_json}
+
+
+class ModelTier:
+    """A named model with its token prices"""
+
+    def __init__(self, name: str, model: str, prompt_cost_per_1m: float = 0.0, completion_cost_per_1m: float = 0.0):
+        self.name = name
+        self.model = model
+        self.prompt_cost_per_1m = prompt_cost_per_1m
+        self.completion_cost_per_1m = completion_cost_per_1m
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.prompt_cost_per_1m + completion_tokens * self.completion_cost_per_1m) / 1_000_000
+
+
+class Route:
+    """Tiers to try for a step, in order, plus its token limit and output check"""
+
+    def __init__(self, tiers: List[ModelTier], max_tokens: Optional[int] = None, validate: Optional[str] = None):
+        self.tiers = tiers
+        self.max_tokens = max_tokens
+        self.validator = VALIDATORS[validate] if validate else None
+
+    def accepts(self, content: Optional[str]) -> bool:
+        return bool(content) and (self.validator is None or self.validator(content))
+
+
+class ModelRouter:
+    """Maps named agent steps (e.g. "elderly.suggestions") to model tiers.
+
+    A step runs on its configured tier; when the output fails the step's
+    validator it is retried on each larger tier of ``fallback`` in turn.
+    Latency and fallbacks are recorded per tier, and ``report`` prices the
+    token usage of each tier (counted per tier, so tiers sharing a model are
+    not double-counted). Steps without a route use the agent's own model.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or DEFAULT_ROUTING
+        self.tiers = {name: ModelTier(name, **tier) for name, tier in config["tiers"].items()}
+        self.fallback = list(config.get("fallback", self.tiers))
+        self.routes: Dict[str, Route] = {}
+        for step, route in config.get("steps", {}).items():
+            tier = route["tier"]
+            escalation = self.fallback[self.fallback.index(tier) + 1:] if tier in self.fallback else []
+            self.routes[step] = Route([self.tiers[name] for name in [tier] + escalation],
+                                      route.get("max_tokens"), route.get("validate"))
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = {name: {"calls": 0, "fallbacks": 0, "latency_seconds": 0.0}
+                                                   for name in self.tiers}
+
+    def route(self, step: Optional[str]) -> Optional[Route]:
+        return self.routes.get(step) if step else None
+
+    def record(self, tier: ModelTier, latency: float, fell_back: bool = False):
+        with self._lock:
+            stats = self.stats[tier.name]
+            stats["calls"] += 1
+            stats["fallbacks"] += int(fell_back)
+            stats["latency_seconds"] += latency
+
+    def report(self, by_tier: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, Any]]:
+        """Calls, fallbacks, latency, tokens and cost per tier (``by_tier`` from the usage ledger)"""
+        with self._lock:
+            report = {}
+            for name, tier in self.tiers.items():
+                usage = by_tier.get(name, {})
+                prompt_tokens = usage.get("prompt_tokens", 0)
+                completion_tokens = usage.get("completion_tokens", 0)
+                report[name] = {
+                    "model": tier.model,
+                    **self.stats[name],
+                    "latency_seconds": round(self.stats[name]["latency_seconds"], 3),
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "cost_usd": round(tier.cost(prompt_tokens, completion_tokens), 6)
+                }
+            return report
@@ -0,0 +1,64 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+from .alert_ledger import AlertLedger
+from .prompt_compaction import truncate_text
+from .sqlite_store import connect_store
+
+
+class PersonMemory:
+    """A fixed-size running summary of past interactions per person.
+
+    Each new interaction is folded into the person's summary (see
+    ``MemoryAgent.remember_interaction``) rather than appended, and stored
+    summaries are capped at ``max_chars``. Reading a person's history is
+    one primary-key lookup, and including it adds a bounded amount to a
+    prompt however many years of interactions there have been.
+    """
+
+    def __init__(self, path: Optional[str] = "data/person_memory.sqlite3", max_chars: int = 600):
+        self.path = path or ":memory:"
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self._db = connect_store(
+            path,
+            "CREATE TABLE IF NOT EXISTS person_memory ("
+            "person TEXT PRIMARY KEY, summary TEXT NOT NULL, interactions INTEGER NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        self.stats = {"lookups": 0, "found": 0, "folded": 0}
+
+    def get(self, record: Dict[str, Any]) -> Optional[str]:
+        """The person's running summary, or None before their first interaction"""
+        with self._lock:
+            row = self._db.execute("SELECT summary FROM person_memory WHERE person = ?",
+                                   (AlertLedger.person_key(record),)).fetchone()
+            self.stats["lookups"] += 1
+            if row is None:
+                return None
+            self.stats["found"] += 1
+            return row[0]
+
+    def put(self, record: Dict[str, Any], summary: str) -> str:
+        """Replace the person's summary (cut to ``max_chars``) and count one more interaction"""
+        summary = truncate_text(summary, self.max_chars)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO person_memory (person, summary, interactions, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(person) DO UPDATE SET summary = excluded.summary, "
+                "interactions = interactions + 1, updated_at = excluded.updated_at",
+                (AlertLedger.person_key(record), summary, datetime.now().isoformat())
+            )
+            self._db.commit()
+            self.stats["folded"] += 1
+        return summary
+
+    def interactions(self, record: Dict[str, Any]) -> int:
+        """How many interactions have been folded into the person's summary"""
+        with self._lock:
+            row = self._db.execute("SELECT interactions FROM person_memory WHERE person = ?",
+                                   (AlertLedger.person_key(record),)).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+from .alert_ledger import AlertLedger
+from .sqlite_store import connect_store
+
+# Fields the agents add to a record; they do not change what the record says
+DERIVED_FIELDS = ("llm_analysis", "analysis_date")
+
+
+class PrecomputeStore:
+    """Persisted LLM outputs generated ahead of a birthday or event.
+
+    Entries are keyed by (person, occurrence date, step) and carry a
+    fingerprint of the source record, plus any other input such as the
+    person's memory summary, so an output is only served while what it was
+    generated from is unchanged; an edited record is simply regenerated on
+    the day. Outputs for dates before yesterday are pruned by the first
+    write of each day.
+    """
+
+    def __init__(self, path: Optional[str] = "data/precomputed.sqlite3"):
+        self.path = path or ":memory:"
+        self._lock = threading.Lock()
+        self._db = connect_store(
+            path,
+            "CREATE TABLE IF NOT EXISTS precomputed ("
+            "person TEXT NOT NULL, day TEXT NOT NULL, step TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+            "content TEXT NOT NULL, created_at TEXT NOT NULL, PRIMARY KEY (person, day, step))"
+        )
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "stored": 0, "pruned": 0}
+        self._pruned_on: Optional[date] = None
+
+    @staticmethod
+    def fingerprint(record: Dict[str, Any], context: Optional[str] = None) -> str:
+        """Hash of a record's own fields, and of ``context`` (other prompt inputs) when given"""
+        fields = {key: value for key, value in record.items() if key not in DERIVED_FIELDS}
+        payload = json.dumps(fields, sort_keys=True, default=str)
+        if context is not None:
+            payload += "\n" + context
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, record: Dict[str, Any], day: date, step: str, context: Optional[str] = None) -> Optional[str]:
+        """The stored output for ``step``, or None if missing or generated from an older record or context"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, content FROM precomputed WHERE person = ? AND day = ? AND step = ?",
+                (AlertLedger.person_key(record), day.isoformat(), step)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            if row[0] != self.fingerprint(record, context):
+                self.stats["stale"] += 1
+                return None
+            self.stats["hits"] += 1
+            return row[1]
+
+    def put(self, record: Dict[str, Any], day: date, step: str, content: str, context: Optional[str] = None):
+        today = date.today()
+        if self._pruned_on != today:
+            # Live cascades write here too, so the store is kept bounded as it is written
+            self._pruned_on = today
+            self.stats["pruned"] += self.prune(today - timedelta(days=1))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO precomputed (person, day, step, fingerprint, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (AlertLedger.person_key(record), day.isoformat(), step, self.fingerprint(record, context), content,
+                 datetime.now().isoformat())
+            )
+            self._db.commit()
+            self.stats["stored"] += 1
+
+    def count(self, day: Optional[date] = None) -> int:
+        """Stored outputs, optionally only those for one occurrence date"""
+        with self._lock:
+            if day is None:
+                return self._db.execute("SELECT COUNT(*) FROM precomputed").fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM precomputed WHERE day = ?",
+                                    (day.isoformat(),)).fetchone()[0]
+
+    def prune(self, before: date) -> int:
+        """Forget outputs for dates before ``before``; returns the number removed"""
+        with self._lock:
+            removed = self._db.execute("DELETE FROM precomputed WHERE day < ?", (before.isoformat(),)).rowcount
+            self._db.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._db.close()
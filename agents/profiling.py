@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+from .tracing import Tracer
+
+
+class StackSampler:
+    """Statistical profiler: samples one thread's Python stack from a background thread.
+
+    Stacks are counted in the folded format read by flamegraph.pl, inferno
+    and speedscope (``outer;inner;leaf <count>``). On the event loop thread
+    a sample shows the coroutine that is running at that moment; time spent
+    idle shows up under the loop's selector.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                             .replace(";", ":"))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def write_folded(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def write_profile(prefix: str, sampler: StackSampler, tracer: Tracer,
+                  extra: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    """Write ``<prefix>.folded`` (flame graph input) and ``<prefix>.steps.json`` (per-step latency breakdown)"""
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    folded_path, steps_path = f"{prefix}.folded", f"{prefix}.steps.json"
+    sampler.write_folded(folded_path)
+    spans: Dict[str, Dict[str, float]] = {}
+    for span in list(tracer.spans):
+        totals = spans.setdefault(span.name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        totals["count"] += 1
+        totals["total_seconds"] = round(totals["total_seconds"] + span.duration, 4)
+        totals["max_seconds"] = round(max(totals["max_seconds"], span.duration), 4)
+    with open(steps_path, "w", encoding="utf-8") as f:
+        json.dump({"samples": sum(sampler.counts.values()), "sample_interval": sampler.interval,
+                   "spans": spans, "steps": tracer.step_breakdown(), **(extra or {})}, f, indent=2)
+    return folded_path, steps_path
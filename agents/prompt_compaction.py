@@ -0,0 +1,94 @@
+import json
+import threading
+from typing import Any, Dict, Iterable, Optional
+from .token_usage import estimate_tokens
+
+# Birthday fields that are useful to the downstream agents' prompts
+PERSON_FIELDS = ("name", "relationship", "date", "age", "interests", "notes")
+
+
+class PromptCompactor:
+    """Shrinks structured data and upstream LLM text before it goes into a prompt.
+
+    Compaction means compact JSON separators, whitelisting the fields a step
+    actually needs, and truncating forwarded LLM text at a sentence or word
+    boundary. With ``enabled=False`` the original verbose formatting
+    (``indent=2`` JSON, full text) is produced instead, which makes the
+    savings measurable; both sizes are tallied in ``stats`` either way.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.stats = {"original_tokens": 0, "compacted_tokens": 0}
+
+    def _tally(self, original: str, compacted: str):
+        with self._lock:
+            self.stats["original_tokens"] += estimate_tokens(original)
+            self.stats["compacted_tokens"] += estimate_tokens(compacted)
+
+    def json(self, value: Any, fields: Optional[Iterable[str]] = None,
+             nested_fields: Optional[Dict[str, Iterable[str]]] = None, max_text_chars: int = 0) -> str:
+        """Serialize ``value`` for a prompt.
+
+        ``fields`` whitelists top-level keys of a dict, ``nested_fields``
+        whitelists keys of nested dicts (e.g. ``{"birthday_info": PERSON_FIELDS}``)
+        and ``max_text_chars`` truncates long string values.
+        """
+        original = json.dumps(value, indent=2)
+        if not self.enabled:
+            self._tally(original, original)
+            return original
+        compacted = json.dumps(
+            self._prune(value, fields, nested_fields or {}, max_text_chars),
+            separators=(",", ":"), ensure_ascii=False
+        )
+        self._tally(original, compacted)
+        return compacted
+
+    def _prune(self, value: Any, fields: Optional[Iterable[str]], nested_fields: Dict[str, Iterable[str]],
+               max_text_chars: int) -> Any:
+        if isinstance(value, dict):
+            allowed = set(fields) if fields is not None else None
+            return {
+                key: self._prune(item, nested_fields.get(key), nested_fields, max_text_chars)
+                for key, item in value.items()
+                if (allowed is None or key in allowed) and item not in (None, "", [], {})
+            }
+        if isinstance(value, list):
+            return [self._prune(item, None, nested_fields, max_text_chars) for item in value]
+        if isinstance(value, str) and max_text_chars:
+            return truncate_text(value, max_text_chars)
+        return value
+
+    def text(self, value: str, max_chars: int) -> str:
+        """Forward upstream LLM text, truncated to roughly ``max_chars``"""
+        compacted = truncate_text(value, max_chars) if self.enabled else value
+        self._tally(value, compacted)
+        return compacted
+
+    def savings(self) -> Dict[str, Any]:
+        with self._lock:
+            original, compacted = self.stats["original_tokens"], self.stats["compacted_tokens"]
+        saved = original - compacted
+        return {
+            "original_tokens": original,
+            "compacted_tokens": compacted,
+            "saved_tokens": saved,
+            "saved_percent": round(100 * saved / original, 1) if original else 0.0
+        }
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Cut text to at most ``max_chars``, preferring a sentence, then a word boundary"""
+    text = text.strip()
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "), cut.rfind("\n"))
+    if sentence_end >= max_chars // 2:
+        return cut[:sentence_end + 1].rstrip() + " …"
+    word_end = cut.rfind(" ")
+    if word_end >= max_chars // 2:
+        cut = cut[:word_end]
+    return cut.rstrip() + " …"
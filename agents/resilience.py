@@ -0,0 +1,155 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Optional
+from .errors import CircuitOpenError, LLMQuotaError
+
+
+class RetryPolicy:
+    """How long an LLM call may take and how failed attempts are retried.
+
+    Each attempt is bounded by ``request_timeout`` and the whole call
+    (queueing, retries and backoff included) by ``deadline`` seconds. Between
+    attempts the delay is the server's Retry-After when given, otherwise
+    full-jitter exponential backoff: uniform(0, min(max_delay, base_delay * 2**n)).
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 20.0,
+                 request_timeout: float = 30.0, deadline: float = 90.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.random = random.Random()
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retrying after the ``attempt``-th (1-based) failed attempt"""
+        if retry_after is not None:
+            # Small jitter so callers told the same Retry-After do not return in lockstep
+            return retry_after + self.random.uniform(0, self.base_delay)
+        return self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` per second up to ``capacity``.
+
+    ``reserve`` takes tokens immediately (the balance may go negative) and
+    returns how long the caller must wait before using them, so concurrent
+    callers queue up fairly without a loop-bound lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount: float):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """Client-side requests-per-minute and tokens-per-minute quotas (0 = unlimited)"""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.requests = TokenBucket(rpm / 60, rpm) if rpm else None
+        self.tokens = TokenBucket(tpm / 60, tpm) if tpm else None
+
+    async def acquire(self, tokens: int, max_wait: float) -> int:
+        """Wait for one request and ``tokens`` tokens of quota; returns the tokens reserved"""
+        wait = 0.0
+        if self.requests is not None:
+            wait = self.requests.reserve(1)
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > max_wait:
+            self.cancel(tokens)
+            raise LLMQuotaError(f"Local RPM/TPM quota exhausted for {wait:.1f}s", retry_after=wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return tokens
+
+    def cancel(self, tokens: int):
+        """Give back a reservation whose request was never sent"""
+        if self.requests is not None:
+            self.requests.refund(1)
+        if self.tokens is not None:
+            self.tokens.refund(tokens)
+
+    def settle(self, reserved: int, used: int):
+        """Give back the part of a token reservation the request did not use"""
+        if self.tokens is not None and reserved > used:
+            self.tokens.refund(reserved - used)
+
+
+class CircuitBreaker:
+    """Fails LLM calls fast while the provider is down.
+
+    After ``failure_threshold`` consecutive transient failures the circuit
+    opens and every call raises ``CircuitOpenError`` immediately, so whole
+    cascades fail in milliseconds instead of each retrying to its deadline.
+    After ``reset_timeout`` seconds the circuit is half-open: one trial
+    request is let through while the others keep failing fast. A success
+    closes the circuit, a failure opens it for another period. Only
+    outcomes of requests that reached the provider should be recorded.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "open" if time.monotonic() - self.opened_at < self.reset_timeout else "half-open"
+
+    def before_request(self) -> bool:
+        """Raise ``CircuitOpenError`` unless the request may go ahead; True if it is the half-open trial"""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            retry_at = self.opened_at + self.reset_timeout
+            if time.monotonic() < retry_at or self._trial:
+                raise CircuitOpenError(
+                    f"LLM provider circuit open after {self.failures} consecutive failures", retry_at=retry_at
+                )
+            self._trial = True
+            return True
+
+    def release_trial(self, trial: bool):
+        """The trial request ended without reaching the provider (cancelled, local timeout); allow another"""
+        if trial:
+            with self._lock:
+                self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                # Trip, or re-open after a failed half-open trial
+                self.opened_at = time.monotonic()
+            self._trial = False
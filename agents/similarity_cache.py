@@ -0,0 +1,322 @@
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .precompute_store import DERIVED_FIELDS
+from .sqlite_store import connect_store
+
+# Placeholders are wrapped in a control character an LLM never produces
+_MARK = "\x1f"
+_PLACEHOLDER = re.compile(_MARK + r"(\w+)" + _MARK)
+_ISO_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+_JSON_AGE = re.compile(r'("age"\s*:\s*)\d+')
+_TOKEN = re.compile(r"\w+|" + _MARK + r"\w+" + _MARK, re.UNICODE)
+# The persisted table is trimmed to ``max_entries`` rows every this many stores (and when opened)
+_TRIM_EVERY = 100
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+           "November", "December")
+
+
+def _placeholder(name: str) -> str:
+    return f"{_MARK}{name}{_MARK}"
+
+
+def _ordinal(number: int) -> str:
+    suffix = "th" if 10 <= number % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th")
+    return f"{number}{suffix}"
+
+
+def _person_values(record: Dict[str, Any]) -> Dict[str, str]:
+    """The personal values of a record that a reply may mention, by placeholder name"""
+    values: Dict[str, str] = {}
+    parts = str(record.get("name") or "").split()
+    if parts:
+        values["name"] = " ".join(parts)
+        values["first_name"] = parts[0]
+        if len(parts) > 1:
+            values["last_name"] = parts[-1]
+    try:
+        born = date.fromisoformat(str(record.get("date", "")))
+    except ValueError:
+        born = None
+    if born is not None:
+        values["date"] = born.isoformat()
+        values["birthday"] = f"{_MONTHS[born.month - 1]} {born.day}"
+        values["birthday_ordinal"] = f"{_MONTHS[born.month - 1]} {_ordinal(born.day)}"
+    if isinstance(record.get("age"), int):
+        values["age"] = str(record["age"])
+        values["age_ordinal"] = _ordinal(record["age"])
+    return values
+
+
+def depersonalize(text: str, record: Dict[str, Any]) -> str:
+    """Replace the record's name, birth date and age in ``text`` with placeholders"""
+    values = _person_values(record)
+    # Longest first, so "Ann Smith" is replaced before "Ann"
+    for key in ("name", "first_name", "last_name", "date", "birthday_ordinal", "birthday"):
+        if key in values and len(values[key]) > 1:
+            text = re.sub(r"\b" + re.escape(values[key]) + r"\b", _placeholder(key), text)
+    if "age" in values:
+        age = re.escape(values["age"])
+        text = re.sub(r"\b" + re.escape(values["age_ordinal"]) + r"\b", _placeholder("age_ordinal"), text)
+        # Only numbers that read as the age, not list numbering or counts
+        text = re.sub(r"\b" + age + r"(?=[\s-]*(?:years?|yrs?)\b)", _placeholder("age"), text)
+        text = re.sub(r"\b((?:turning|turns|turn|aged|age) )" + age + r"\b", r"\1" + _placeholder("age"), text)
+    return text
+
+
+def repersonalize(template: str, record: Dict[str, Any]) -> Optional[str]:
+    """Fill a depersonalized text in for ``record``; None if it mentions something the record lacks"""
+    values = _person_values(record)
+    missing = False
+
+    def fill(match: "re.Match") -> str:
+        nonlocal missing
+        if match.group(1) not in values:
+            missing = True
+            return ""
+        return values[match.group(1)]
+
+    text = _PLACEHOLDER.sub(fill, template)
+    return None if missing else text
+
+
+def signature_text(prompt: str, record: Dict[str, Any]) -> str:
+    """The part of a prompt that decides the reply: personal values and derived LLM text removed"""
+    for field in DERIVED_FIELDS:
+        prompt = re.sub(r'"' + field + r'"\s*:\s*"(?:[^"\\]|\\.)*"', "", prompt)
+    prompt = depersonalize(prompt, record)
+    prompt = _JSON_AGE.sub(r"\1" + _placeholder("age"), prompt)
+    return _ISO_DATE.sub(_placeholder("date"), prompt)
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit SimHash over word shingles; similar texts get hashes a few bits apart"""
+    tokens = [token.lower() for token in _TOKEN.findall(text)]
+    shingles = Counter(" ".join(tokens[i:i + shingle]) for i in range(max(1, len(tokens) - shingle + 1)))
+    weights = [0] * 64
+    for feature, count in shingles.items():
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+class _Flight:
+    """A miss being generated; similar misses wait for its completion instead of calling the LLM"""
+
+    __slots__ = ("namespace", "value", "record", "future")
+
+    def __init__(self, namespace: str, value: int, record: Dict[str, Any], future: asyncio.Future):
+        self.namespace = namespace
+        self.value = value
+        self.record = record
+        self.future = future
+
+
+class SimilarityCache:
+    """Approximate completion cache for templated steps whose prompts differ only by person.
+
+    Prompts are reduced to a signature without the person's name, dates,
+    age and earlier LLM output, and indexed by SimHash. A step that missed
+    the exact cache is answered from the closest earlier completion within
+    ``max_distance`` bits, with the new person's name, birthday and age
+    substituted in. Candidates come from banding the hash into
+    ``max_distance + 1`` parts, so any hash within the distance shares at
+    least one band. ``exact_fields`` (e.g. the relationship, which decides
+    pronouns) must match exactly. Only ``steps`` are cached.
+
+    Misses are single-flight: while one is being generated (between
+    ``begin`` and ``finish``), ``join`` lets a similar miss wait for its
+    completion instead of sending its own request.
+
+    Entries live in memory (at most ``max_entries``) and, with ``path``,
+    in SQLite so they survive restarts; the table is trimmed to the newest
+    ``max_entries`` rows as it is written.
+    """
+
+    def __init__(self, path: Optional[str] = "data/similarity_cache.sqlite3", steps: Iterable[str] = (),
+                 max_distance: int = 3, exact_fields: Tuple[str, ...] = ("relationship",),
+                 max_entries: int = 10000):
+        self.steps = set(steps)
+        self.max_distance = max_distance
+        self.exact_fields = exact_fields
+        self.max_entries = max_entries
+        bits = 64 // (max_distance + 1)
+        self._bands = [(i * bits, 64 - i * bits if i == max_distance else bits) for i in range(max_distance + 1)]
+        self._entries: "OrderedDict[int, Tuple[str, int, str, float]]" = OrderedDict()
+        self._index: Dict[Tuple[str, int, int], List[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        # Misses being generated, per running loop, indexed like the entries
+        self._flights: Dict[asyncio.AbstractEventLoop, Dict[Tuple[str, int, int], List[_Flight]]] = {}
+        self._stores = 0
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "unfillable": 0, "coalesced": 0, "trimmed": 0}
+        self._db = None
+        if path:
+            self._db = connect_store(
+                path,
+                "CREATE TABLE IF NOT EXISTS similar_completions ("
+                "namespace TEXT NOT NULL, simhash INTEGER NOT NULL, template TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)",
+                "CREATE INDEX IF NOT EXISTS similar_completions_created ON similar_completions (created_at)"
+            )
+            self._trim()
+            rows = self._db.execute(
+                "SELECT namespace, simhash, template, expires_at FROM similar_completions "
+                "ORDER BY created_at DESC LIMIT ?", (max_entries,)
+            ).fetchall()
+            for namespace, signed, template, expires_at in reversed(rows):
+                self._remember(namespace, signed % (1 << 64), template, expires_at)
+
+    def covers(self, step: Optional[str]) -> bool:
+        return step in self.steps
+
+    def _namespace(self, step: str, record: Dict[str, Any]) -> str:
+        return "|".join([step] + [str(record.get(field, "")).strip().lower() for field in self.exact_fields])
+
+    def _band_keys(self, namespace: str, value: int):
+        for i, (shift, width) in enumerate(self._bands):
+            yield namespace, i, value >> shift & ((1 << width) - 1)
+
+    def _remember(self, namespace: str, value: int, template: str, expires_at: float):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (namespace, value, template, expires_at)
+        for key in self._band_keys(namespace, value):
+            self._index.setdefault(key, []).append(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._forget(next(iter(self._entries)))
+
+    def _forget(self, entry_id: int):
+        namespace, value, _, _ = self._entries.pop(entry_id)
+        for key in self._band_keys(namespace, value):
+            ids = self._index[key]
+            ids.remove(entry_id)
+            if not ids:
+                del self._index[key]
+
+    def _trim(self):
+        """Delete expired rows and all but the newest ``max_entries`` (which are all a restart would load)"""
+        removed = self._db.execute("DELETE FROM similar_completions WHERE expires_at <= ?", (time.time(),)).rowcount
+        removed += self._db.execute(
+            "DELETE FROM similar_completions WHERE rowid NOT IN "
+            "(SELECT rowid FROM similar_completions ORDER BY created_at DESC LIMIT ?)", (self.max_entries,)
+        ).rowcount
+        self._db.commit()
+        self.stats["trimmed"] += removed
+
+    def _get_flights(self) -> Dict[Tuple[str, int, int], List[_Flight]]:
+        loop = asyncio.get_running_loop()
+        flights = self._flights.get(loop)
+        if flights is None:
+            self._flights = {loop: {}}
+            flights = self._flights[loop]
+        return flights
+
+    async def join(self, step: str, prompt: str, record: Dict[str, Any]) -> Optional[str]:
+        """Wait for the closest similar miss in flight and return its completion for ``record``.
+
+        None if there is none, or it failed or cannot be filled in for
+        ``record``; the caller then generates its own.
+        """
+        namespace = self._namespace(step, record)
+        value = simhash(signature_text(prompt, record))
+        best, best_distance = None, self.max_distance + 1
+        flights = self._get_flights()
+        for key in self._band_keys(namespace, value):
+            for flight in flights.get(key, ()):
+                distance = bin(flight.value ^ value).count("1")
+                if distance < best_distance:
+                    best, best_distance = flight, distance
+        if best is None:
+            return None
+        # Shielded: a cancelled follower must not cancel the leader's result for the others
+        completion = await asyncio.shield(best.future)
+        if completion is None:
+            return None
+        content = repersonalize(depersonalize(completion, best.record), record)
+        with self._lock:
+            self.stats["coalesced" if content is not None else "unfillable"] += 1
+        return content
+
+    def begin(self, step: str, prompt: str, record: Dict[str, Any]) -> _Flight:
+        """Mark a miss as being generated; pass the result to ``finish``"""
+        flight = _Flight(self._namespace(step, record), simhash(signature_text(prompt, record)), record,
+                         asyncio.get_running_loop().create_future())
+        flights = self._get_flights()
+        for key in self._band_keys(flight.namespace, flight.value):
+            flights.setdefault(key, []).append(flight)
+        return flight
+
+    def finish(self, flight: _Flight, completion: Optional[str]):
+        """Hand ``completion`` (None if generating it failed) to the misses waiting on ``flight``"""
+        flights = self._get_flights()
+        for key in self._band_keys(flight.namespace, flight.value):
+            waiting = flights.get(key)
+            if waiting is not None and flight in waiting:
+                waiting.remove(flight)
+                if not waiting:
+                    del flights[key]
+        if not flight.future.done():
+            flight.future.set_result(completion)
+
+    def get(self, step: str, prompt: str, record: Dict[str, Any]) -> Optional[str]:
+        """The closest earlier completion re-personalized for ``record``, or None"""
+        namespace = self._namespace(step, record)
+        value = simhash(signature_text(prompt, record))
+        now = time.time()
+        with self._lock:
+            best, best_distance = None, self.max_distance + 1
+            for key in self._band_keys(namespace, value):
+                for entry_id in list(self._index.get(key, ())):
+                    _, candidate, template, expires_at = self._entries[entry_id]
+                    if expires_at <= now:
+                        self._forget(entry_id)
+                        continue
+                    distance = bin(candidate ^ value).count("1")
+                    if distance < best_distance:
+                        best, best_distance = template, distance
+            if best is None:
+                self.stats["misses"] += 1
+                return None
+            content = repersonalize(best, record)
+            self.stats["hits" if content is not None else "unfillable"] += 1
+            return content
+
+    def put(self, step: str, prompt: str, record: Dict[str, Any], completion: str, ttl: float):
+        """Remember ``completion`` (depersonalized) for prompts similar to ``prompt``"""
+        if ttl <= 0 or not completion:
+            return
+        namespace = self._namespace(step, record)
+        value = simhash(signature_text(prompt, record))
+        template = depersonalize(completion, record)
+        now = time.time()
+        with self._lock:
+            self._remember(namespace, value, template, now + ttl)
+            self.stats["stored"] += 1
+            if self._db is not None:
+                # SQLite integers are signed 64-bit
+                self._db.execute(
+                    "INSERT INTO similar_completions (namespace, simhash, template, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (namespace, value - (1 << 64) if value >= 1 << 63 else value, template, now, now + ttl)
+                )
+                self._db.commit()
+                self._stores += 1
+                if self._stores % _TRIM_EVERY == 0:
+                    self._trim()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries)}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,39 @@
+import os
+import sqlite3
+from typing import Dict, Optional
+
+
+def connect_store(path: Optional[str], *schema: str, timeout: float = 30,
+                  isolation_level: Optional[str] = "") -> sqlite3.Connection:
+    """Open the SQLite database of a local store and create its tables.
+
+    ``path=None`` (or empty) opens a private in-memory database. For a file
+    the directory is created and the database runs in WAL mode with
+    ``synchronous=NORMAL``: a commit appends to the log without waiting for
+    an fsync, readers do not block the writer, and a crash can lose the last
+    commits but not corrupt the file. ``schema`` statements
+    (``CREATE ... IF NOT EXISTS``) are run and committed. The connection may
+    be used from any thread; stores serialize access with their own lock.
+    """
+    if path:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    db = sqlite3.connect(path or ":memory:", timeout=timeout, isolation_level=isolation_level,
+                         check_same_thread=False)
+    if path:
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+    for statement in schema:
+        db.execute(statement)
+    db.commit()
+    return db
+
+
+def add_columns(db: sqlite3.Connection, table: str, columns: Dict[str, str]):
+    """Add ``columns`` (name to SQL type) missing from a table created by an older version"""
+    existing = {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+    for name, sql_type in columns.items():
+        if name not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+    db.commit()
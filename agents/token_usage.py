@@ -0,0 +1,83 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count (~4 characters per token) for budgeting prompts before sending"""
+    text = value if isinstance(value, str) else json.dumps(value)
+    return len(text) // 4 + 1
+
+
+def _empty_totals() -> Dict[str, int]:
+    return {"calls": 0, "cached_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+class TokenUsageLedger:
+    """Prompt/completion token totals per agent, step, model, routing tier and cascade.
+
+    Figures come from the API's ``usage`` fields; calls answered from the
+    response cache are counted separately and cost no tokens.
+    """
+
+    def __init__(self, max_cascades: int = 1000):
+        self.max_cascades = max_cascades
+        self._lock = threading.Lock()
+        self.total = _empty_totals()
+        self.by_agent: Dict[str, Dict[str, int]] = {}
+        self.by_step: Dict[str, Dict[str, int]] = {}
+        self.by_model: Dict[str, Dict[str, int]] = {}
+        self.by_tier: Dict[str, Dict[str, int]] = {}
+        # Only the most recent cascades are kept so the ledger stays bounded
+        self.by_cascade: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def record(self, agent: str, step: Optional[str], cascade: Optional[str],
+               prompt_tokens: int, completion_tokens: int, cached: bool = False, model: Optional[str] = None,
+               tier: Optional[str] = None):
+        with self._lock:
+            buckets = [self.total,
+                       self.by_agent.setdefault(agent, _empty_totals()),
+                       self.by_step.setdefault(step or agent, _empty_totals())]
+            if model:
+                buckets.append(self.by_model.setdefault(model, _empty_totals()))
+            if tier:
+                buckets.append(self.by_tier.setdefault(tier, _empty_totals()))
+            if cascade:
+                if cascade not in self.by_cascade:
+                    self.by_cascade[cascade] = _empty_totals()
+                    while len(self.by_cascade) > self.max_cascades:
+                        self.by_cascade.popitem(last=False)
+                buckets.append(self.by_cascade[cascade])
+            for bucket in buckets:
+                bucket["calls"] += 1
+                bucket["cached_calls"] += int(cached)
+                bucket["prompt_tokens"] += prompt_tokens
+                bucket["completion_tokens"] += completion_tokens
+
+    def cascade_usage(self, cascade: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.by_cascade.get(cascade, _empty_totals()))
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            cascades = list(self.by_cascade.values())
+            per_cascade = (sum(c["prompt_tokens"] for c in cascades) / len(cascades)) if cascades else 0
+            return {
+                "total": dict(self.total),
+                "by_agent": {name: dict(totals) for name, totals in self.by_agent.items()},
+                "by_step": {name: dict(totals) for name, totals in self.by_step.items()},
+                "by_model": {name: dict(totals) for name, totals in self.by_model.items()},
+                "by_tier": {name: dict(totals) for name, totals in self.by_tier.items()},
+                "cascades": len(cascades),
+                "avg_prompt_tokens_per_cascade": round(per_cascade, 1)
+            }
+
+    def reset(self):
+        with self._lock:
+            self.total = _empty_totals()
+            self.by_agent.clear()
+            self.by_step.clear()
+            self.by_model.clear()
+            self.by_tier.clear()
+            self.by_cascade.clear()
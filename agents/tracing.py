@@ -0,0 +1,152 @@
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """One timed operation (a check_and_alert run, a cascade, an LLM call, ...)"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name: str, trace_id: int, span_id: int, parent_id: Optional[int], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float):
+        """Accumulate a numeric attribute (e.g. seconds spent queueing across retries)"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "duration": round(self.duration, 6), **self.attributes}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span of the current task, if any"""
+    return _current_span.get()
+
+
+class Tracer:
+    """Records spans into a bounded in-memory buffer and the ``agents.tracing`` logger.
+
+    Spans nest through a context variable, so child tasks (and message bus
+    handlers, which run in their publisher's context) attach to the span
+    that was active when they were created. Finished spans are logged at
+    DEBUG as JSON, so a trace file is just a log handler on that logger.
+    """
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+        self._ids = itertools.count(1)
+
+    @contextlib.contextmanager
+    def span(self, name: str, activate: bool = True, **attributes) -> Iterator[Span]:
+        """Time the enclosed block; ``activate=False`` keeps it out of the context (for generators)"""
+        parent = _current_span.get()
+        span_id = next(self._ids)
+        span = Span(name, parent.trace_id if parent else span_id, span_id,
+                    parent.span_id if parent else None, attributes)
+        token = _current_span.set(span) if activate else None
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = repr(e)
+            raise
+        finally:
+            span.end = time.perf_counter()
+            if token is not None:
+                _current_span.reset(token)
+            self.spans.append(span)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s", json.dumps(span.to_dict(), default=str))
+
+    def step_breakdown(self) -> Dict[str, Dict[str, Any]]:
+        """Latency, queueing, network time, tokens and cache outcomes of the recorded LLM calls per step"""
+        by_step: Dict[str, List[Span]] = {}
+        for span in list(self.spans):
+            if span.name == "llm_call":
+                by_step.setdefault(span.attributes.get("step") or "unnamed", []).append(span)
+        breakdown = {}
+        for step, spans in sorted(by_step.items()):
+            durations = sorted(span.duration for span in spans)
+            totals: Dict[str, Any] = {"calls": len(spans), "total_seconds": round(sum(durations), 4),
+                                      "p50": round(durations[len(durations) // 2], 4),
+                                      "p95": round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 4),
+                                      "max": round(durations[-1], 4), "cache": {}}
+            for key in ("queue_wait", "network", "prompt_tokens", "completion_tokens"):
+                totals[key] = round(sum(span.attributes.get(key, 0) for span in spans), 4)
+            for span in spans:
+                cache = span.attributes.get("cache", "miss")
+                totals["cache"][cache] = totals["cache"].get(cache, 0) + 1
+            breakdown[step] = totals
+        return breakdown
+
+
+# Process-wide tracer shared by the transport, scheduler and message bus
+tracer = Tracer()
+
+
+class LoopLagSampler:
+    """Samples how late the event loop wakes a task that sleeps ``interval`` seconds.
+
+    Lag above ``warn_after`` seconds is logged as a warning: something is
+    blocking the loop (synchronous I/O, heavy parsing, ...).
+    """
+
+    def __init__(self, interval: float = 0.05, warn_after: float = 0.25, max_samples: int = 100000):
+        self.interval = interval
+        self.warn_after = warn_after
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples.append(lag)
+            if lag > self.warn_after:
+                logger.warning("Event loop lagged %.3fs", lag)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"samples": 0, "p50": None, "p99": None, "max": None}
+        return {"samples": len(samples), "p50": round(samples[len(samples) // 2], 4),
+                "p99": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 4),
+                "max": round(samples[-1], 4)}
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+
+class Step:
+    """One node in a workflow: an async function plus the steps it depends on"""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Awaitable[Any]], depends_on: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+class Workflow:
+    """Small dependency graph (DAG) of async steps.
+
+    Each step is started as soon as all of its dependencies have finished,
+    so independent LLM calls overlap and only true data dependencies stay
+    on the critical path. Step functions receive a dict holding the
+    workflow inputs plus the results of every completed dependency.
+    """
+
+    def __init__(self, steps: List[Step]):
+        self.steps = {step.name: step for step in steps}
+        self._check_graph()
+
+    def _check_graph(self):
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Workflow has a dependency cycle through '{name}'")
+            if name not in self.steps:
+                raise ValueError(f"Workflow step depends on unknown step '{name}'")
+            visiting.add(name)
+            for dependency in self.steps[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+    async def run(self, inputs: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Run all steps and return a dict of inputs plus each step's result"""
+        results: Dict[str, Any] = dict(inputs or {})
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(step: Step):
+            if step.depends_on:
+                await asyncio.gather(*(tasks[name] for name in step.depends_on))
+            results[step.name] = await step.func(results)
+
+        for step in self.steps.values():
+            tasks[step.name] = asyncio.ensure_future(run_step(step))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return results
@@ -1,12 +1,23 @@
-import asyncio
-import json
+import logging
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base_agent import Agent
-import openai
+from .cascade_scheduler import current_cascade
+from .llm_transport import LLMTransport, get_shared_transport
+from .interaction_log import InteractionLog
+from .workflow import Workflow, Step
+from .prompt_compaction import PERSON_FIELDS
+
+logger = logging.getLogger(__name__)
 
 class YoungerRelativeAgent(Agent):
-    def __init__(self, openai_api_key: str):
+    max_tokens = 500
+    temperature = 0.7
+    log_channel = "younger_relative"
+    subscriptions = {"interaction": "notify_interaction"}
+    
+    def __init__(self, openai_api_key: str, transport: Optional[LLMTransport] = None,
+                 interaction_log: Optional[InteractionLog] = None):
         super().__init__(
             name="Younger Relative Agent",
             system_prompt="""You are a Younger Relative Agent that helps adult children and younger family members stay connected with their elderly relatives. 
@@ -17,28 +28,32 @@ class YoungerRelativeAgent(Agent):
             4. Suggest meaningful ways to engage with elderly family members
             5. Consider emotional and practical aspects of family relationships
             
-            Always be supportive, understanding, and focused on strengthening family bonds."""
+            Always be supportive, understanding, and focused on strengthening family bonds.""",
+            transport=transport or get_shared_transport(openai_api_key)
         )
-        self.openai_client = openai.OpenAI(api_key=openai_api_key)
         self.master_agent = None
-        self.notifications = []
+        # Bounded in memory; persisted when the log has a path
+        self.interactions = interaction_log or InteractionLog(None)
         
     def register_master_agent(self, master_agent):
-        """Register the master agent for communication"""
+        """Register the master agent and subscribe to interaction notifications"""
         self.master_agent = master_agent
-        print(f"Younger Relative Agent: Registered with Master Agent")
+        self.subscribe(master_agent.bus)
+        logger.info("Younger Relative Agent: Registered with Master Agent")
         
     async def notify_interaction(self, response: str, context: Dict[str, Any], master_analysis: str):
         """Receive notification about elderly user interaction and provide intelligent insights"""
-        print(f"Younger Relative Agent: Received notification about interaction")
+        logger.info("Younger Relative Agent: Received notification about interaction")
         
         # Use LLM to analyze the interaction and provide insights
+        history = self.history(context.get("birthday_info", {}))
+        history_line = f"\n        Earlier interactions: {history}" if history else ""
         prompt = f"""
         Analyze this interaction between an elderly relative and the AI system:
         
         Elderly Response: "{response}"
-        Context: {json.dumps(context, indent=2)}
-        Master Agent Analysis: {master_analysis}
+        Context: {self.format_data(context, nested_fields={'birthday_info': PERSON_FIELDS}, max_text_chars=400)}
+        Master Agent Analysis: {self.forward_text(master_analysis, 800)}{history_line}
         
         Provide insights and suggestions for the younger relative:
         1. What does this interaction reveal about the elderly person's needs/desires?
@@ -50,32 +65,41 @@ class YoungerRelativeAgent(Agent):
         Format your response as helpful insights and actionable suggestions.
         """
         
-        insights = await self.llm_call(prompt)
-        print(f"Younger Relative Agent Insights: {insights}")
-        
-        # Log the notification
+        # Log the notification; insights and suggestions are filled in below
         notification = {
             "timestamp": datetime.now().isoformat(),
             "elderly_response": response,
             "context": context,
             "master_analysis": master_analysis,
-            "insights": insights,
             "action_taken": "analyzed_and_insights_provided"
         }
-        self.notifications.append(notification)
         
-        # Generate specific suggestions based on the interaction
-        await self.generate_suggestions(response, context, insights)
+        async def insights_step(results: Dict[str, Any]) -> str:
+            insights = await self.llm_call(prompt, step="younger.insights")
+            logger.info("Younger Relative Agent Insights: %s", insights)
+            notification["insights"] = insights
+            return insights
+            
+        async def suggestions_step(results: Dict[str, Any]):
+            # Suggestions build on the master's analysis, so they do not wait for the insights
+            await self.generate_suggestions(response, context, master_analysis, notification)
+            
+        await Workflow([
+            Step("insights", insights_step),
+            Step("suggestions", suggestions_step)
+        ]).run()
+        self.log_interaction(notification, person=context.get("birthday_info", {}).get("name"))
         
-    async def generate_suggestions(self, response: str, context: Dict[str, Any], insights: str):
+    async def generate_suggestions(self, response: str, context: Dict[str, Any], analysis: str,
+                                   notification: Optional[Dict[str, Any]] = None):
         """Generate specific, actionable suggestions for the younger relative"""
         birthday_info = context.get("birthday_info", {})
         
         prompt = f"""
         Based on this interaction:
         Elderly Response: "{response}"
-        Birthday Info: {json.dumps(birthday_info, indent=2)}
-        Insights: {insights}
+        Birthday Info: {self.format_data(birthday_info, fields=PERSON_FIELDS)}
+        Analysis: {self.forward_text(analysis, 800)}
         
         Generate 3-5 specific, actionable suggestions for the younger relative. 
         Make them practical and meaningful. Examples:
@@ -86,30 +110,16 @@ class YoungerRelativeAgent(Agent):
         Format as a numbered list of suggestions.
         """
         
-        suggestions = await self.llm_call(prompt)
-        print(f"Younger Relative Agent Suggestions: {suggestions}")
+        suggestions = await self.llm_call(prompt, step="younger.suggestions")
+        logger.info("Younger Relative Agent Suggestions: %s", suggestions)
         
-        # Add suggestions to the notification
-        if self.notifications:
-            self.notifications[-1]["suggestions"] = suggestions
-            
-    async def llm_call(self, prompt: str) -> str:
-        """Make a call to OpenAI GPT-4o"""
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            return response.choices[0].message.content or "No insights available."
-        except Exception as e:
-            print(f"Error calling OpenAI: {e}")
-            return "I'm having trouble analyzing that right now."
+        if notification is not None:
+            notification["suggestions"] = suggestions
+        else:
+            # Already logged: update this cascade's notification (others may have
+            # appended since) through the log, so a persisted entry changes too
+            self.interactions.update_latest(self.log_channel, {"suggestions": suggestions}, current_cascade.get())
             
     def get_notifications(self) -> List[Dict]:
-        """Get notification history for demo purposes"""
-        return self.notifications 
\ No newline at end of file
+        """Most recent notifications (bounded; use ``interactions.page`` for history)"""
+        return self.interactions.recent(self.log_channel) 
\ No newline at end of file
@@ -1,8 +1,20 @@
 import streamlit as st
 import os
 import asyncio
+import queue
+import threading
+import time
 from datetime import date
 from main import FamilyConnectionOrchestrator
+from agents.base_agent import streaming_tokens
+from agents.cascade_scheduler import current_cascade
+from agents.interaction_log import InteractionLog
+from agents.job_queue import JobQueue, QUEUED, RUNNING, DONE, FAILED
+from agents.logging_setup import configure_logging
+from worker import ANALYZE_TODAY, TRIGGER_REMINDERS
+
+# Agent logs go to the server console through a background thread (once per process)
+configure_logging(os.getenv("LOG_LEVEL", "INFO"), os.getenv("TRACE_PATH"))
 
 st.set_page_config(
     page_title="Family Connection AI Dashboard",
@@ -35,79 +47,214 @@ body {
 st.title("🎂 Family Connection AI Dashboard")
 st.write("Welcome! This dashboard helps you stay connected with your loved ones, remember important dates, and see how the AI agents are working together.")
 
-# Check API key
+# With FAMILY_WORKER_QUEUE set, agent work is done by worker.py processes:
+# the dashboard only enqueues jobs and reads their results from the queue
+worker_queue_path = os.getenv("FAMILY_WORKER_QUEUE")
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue(path):
+    return JobQueue(path)
+
+# Workers write their interactions here; the dashboard reads it page by page
+@st.cache_resource(show_spinner=False)
+def get_interaction_log(path):
+    return InteractionLog(path)
+
+PAGE_SIZE = 10
+
+# The orchestrator, its agents and their logs live for the whole server
+# process: Streamlit reruns this script on every interaction, and rebuilding
+# them each time would drop the logs and repeat LLM work. Agent coroutines
+# run on one long-lived event loop so pooled connections survive reruns.
+@st.cache_resource(show_spinner=False)
+def get_runtime(openai_api_key):
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="family-agents-loop", daemon=True).start()
+    return FamilyConnectionOrchestrator(openai_api_key), loop
+
 def get_orchestrator():
     openai_api_key = os.getenv("OPENAI_API_KEY")
     if not openai_api_key:
         st.error("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+        return None, None
+    return get_runtime(openai_api_key)
+
+job_queue = get_job_queue(worker_queue_path) if worker_queue_path else None
+orchestrator, agents_loop = (None, None) if job_queue else get_orchestrator()
+
+if orchestrator or job_queue:
+    # Layout first, so streamed tokens can be written into the sections below
+    # while the cascade is still running
+    st.subheader("🎉 Today's Birthdays")
+    birthdays_section = st.container()
+    st.subheader("🗒️ Master Agent Conversation Log")
+    master_section = st.container()
+    st.subheader("👵 Elderly Agent Responses")
+    elderly_live_slot = st.empty()
+    elderly_live = elderly_live_slot.container()
+    elderly_section = st.container()
+    st.subheader("🧑‍🦱 Younger Relative Notifications")
+    younger_live_slot = st.empty()
+    younger_live = younger_live_slot.container()
+    younger_section = st.container()
+
+    # Sidebar: Actions
+    st.sidebar.header("Actions")
+    refresh_requested = st.sidebar.button("🔄 Refresh Today's Birthdays")
+    trigger_requested = st.sidebar.button("🔔 Trigger Birthday Reminders")
+    today = date.today().isoformat()
+
+if job_queue:
+    def latest_analysis(day):
+        for job in job_queue.recent(kind=ANALYZE_TODAY, limit=10):
+            if job["payload"].get("day") == day:
+                return job
         return None
-    return FamilyConnectionOrchestrator(openai_api_key)
 
-orchestrator = get_orchestrator()
+    analysis_job = latest_analysis(today)
+    if refresh_requested or analysis_job is None or analysis_job["status"] == FAILED:
+        job_queue.enqueue(ANALYZE_TODAY, {"day": today})
+        analysis_job = latest_analysis(today)
+    if trigger_requested:
+        job_id = job_queue.enqueue(TRIGGER_REMINDERS)
+        st.sidebar.success(f"Reminders queued (job #{job_id})")
+    st.sidebar.caption(f"Worker queue: {job_queue.counts()}")
 
-if orchestrator:
-    # Get today's birthdays
+    todays_birthdays = (analysis_job["result"] or {}).get("birthdays") if analysis_job["status"] == DONE else None
+    interactions = get_interaction_log(os.getenv("INTERACTION_LOG_PATH", "data/interactions.sqlite3"))
+    pending = [job for job in job_queue.recent(kind=TRIGGER_REMINDERS, limit=5) if job["status"] in (QUEUED, RUNNING)]
+    for job in pending:
+        elderly_live.info(f"Reminder job #{job['id']} is {job['status']}; refresh to see its results.")
+
+elif orchestrator:
     memory_agent = orchestrator.agents["memory"]
-    elderly_agent = orchestrator.agents["elderly"]
-    master_agent = orchestrator.agents["master"]
-    younger_agent = orchestrator.agents["younger_relative"]
 
-    async def get_todays_birthdays():
-        return await memory_agent.analyze_todays_birthdays()
+    def run_on_agents_loop(coro):
+        return asyncio.run_coroutine_threadsafe(coro, agents_loop)
 
-    async def trigger_reminders():
-        await memory_agent.check_and_alert()
-        await asyncio.sleep(2)  # Let agents process
+    # Today's analysis is computed once per day (or on request), not per rerun
+    @st.cache_data(show_spinner="Looking up today's birthdays...")
+    def get_todays_birthdays(day):
+        return run_on_agents_loop(memory_agent.analyze_todays_birthdays()).result()
 
-    # Sidebar: Actions
-    st.sidebar.header("Actions")
-    if st.sidebar.button("🔔 Trigger Birthday Reminders"):
-        asyncio.run(trigger_reminders())
-        st.sidebar.success("Reminders triggered!")
+    # Steps whose completions are streamed into a section as they are generated
+    live_steps = {
+        "elderly.reminder": (elderly_live, "Reminder"),
+        "elderly.user_response": (elderly_live, "User Response"),
+        "younger.insights": (younger_live, "Insights"),
+        "younger.suggestions": (younger_live, "Suggestions"),
+    }
+    live_outputs = {}
+
+    # Listeners run on the agents' loop thread; tokens are handed over through
+    # a queue and drawn from the script thread, which owns the page
+    token_queue = queue.Queue()
+
+    def queue_tokens(agent_name, step, delta):
+        token_queue.put((current_cascade.get(), step, delta))
+
+    def show_tokens(cascade, step, delta):
+        key = (cascade, step)
+        if key not in live_outputs:
+            section, label = live_steps[step]
+            person = (key[0] or "").split("@")[0].split("#")[0]
+            live_outputs[key] = [section.empty(), f"**{label}** ({person}): ", ""]
+        output = live_outputs[key]
+        output[2] += delta
+        output[0].markdown(output[1] + output[2] + " ▌")
+
+    def drain_tokens():
+        while True:
+            try:
+                show_tokens(*token_queue.get_nowait())
+            except queue.Empty:
+                return
+
+    async def check_and_alert_streamed():
+        # The agents are shared by every session: only this run's live steps
+        # are streamed, and only to this session
+        with streaming_tokens(queue_tokens, live_steps):
+            return await memory_agent.check_and_alert()
+
+    def trigger_reminders():
+        future = run_on_agents_loop(check_and_alert_streamed())
+        while not future.done():
+            drain_tokens()
+            time.sleep(0.05)
+        drain_tokens()
+        results = future.result()
+        # Drop the cursor from the finished live outputs
+        for placeholder, prefix, text in live_outputs.values():
+            placeholder.markdown(prefix + text)
+        return results
+
+    if refresh_requested:
+        get_todays_birthdays.clear()
+    if trigger_requested:
+        failed = [result for result in trigger_reminders() if not result.ok]
+        if failed:
+            st.sidebar.warning(f"{len(failed)} reminders could not be completed: {failed[0].error}")
+        else:
+            st.sidebar.success("Reminders triggered!")
+        # The finished responses are listed in full below
+        elderly_live_slot.empty()
+        younger_live_slot.empty()
+
+    todays_birthdays = get_todays_birthdays(today)
+    interactions = orchestrator.interactions
+
+if orchestrator or job_queue:
+    def log_page(channel):
+        """The page of a channel's log selected in its section, newest first"""
+        pages = max(1, -(-interactions.count(channel) // PAGE_SIZE))
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                               key=f"{channel}_page") if pages > 1 else 1
+        return interactions.page(channel, page - 1, PAGE_SIZE)
 
     # Main: Today's Birthdays
-    st.subheader("🎉 Today's Birthdays")
-    todays_birthdays = asyncio.run(get_todays_birthdays())
-    if todays_birthdays:
-        for b in todays_birthdays:
-            st.info(f"**{b['name']}** ({b['relationship']}, Age {b.get('age', '?')}) - {b.get('notes', '')}")
-            if 'llm_analysis' in b:
-                st.write(f"_AI Insights:_ {b['llm_analysis']}")
-    else:
-        st.write("No birthdays today!")
+    with birthdays_section:
+        if todays_birthdays is None:
+            st.write("Waiting for the worker to look up today's birthdays...")
+        elif todays_birthdays:
+            for b in todays_birthdays:
+                st.info(f"**{b['name']}** ({b['relationship']}, Age {b.get('age', '?')}) - {b.get('notes', '')}")
+                if 'llm_analysis' in b:
+                    st.write(f"_AI Insights:_ {b['llm_analysis']}")
+        else:
+            st.write("No birthdays today!")
 
     # Conversation Log
-    st.subheader("🗒️ Master Agent Conversation Log")
-    master_log = master_agent.get_conversation_log()
-    if master_log:
-        for entry in master_log[::-1]:
-            st.markdown(f"**[{entry['timestamp']}]** {entry['type'].replace('_', ' ').title()}")
-            st.json(entry)
-    else:
-        st.write("No interactions yet.")
+    with master_section:
+        master_log = log_page("master")
+        if master_log:
+            for entry in master_log:
+                st.markdown(f"**[{entry['timestamp']}]** {entry['type'].replace('_', ' ').title()}")
+                st.json(entry)
+        else:
+            st.write("No interactions yet.")
 
     # Elderly Agent Responses
-    st.subheader("👵 Elderly Agent Responses")
-    elderly_responses = elderly_agent.get_user_responses()
-    if elderly_responses:
-        for r in elderly_responses[::-1]:
-            st.markdown(f"**[{r['timestamp']}]** {r['birthday_info']['name']}")
-            st.write(f"**Reminder:** {r['reminder_message']}")
-            st.write(f"**User Response:** {r['user_response']}")
-    else:
-        st.write("No responses yet.")
+    with elderly_section:
+        elderly_responses = log_page("elderly")
+        if elderly_responses:
+            for r in elderly_responses:
+                st.markdown(f"**[{r['timestamp']}]** {r['birthday_info']['name']}")
+                st.write(f"**Reminder:** {r['reminder_message']}")
+                st.write(f"**User Response:** {r['user_response']}")
+        else:
+            st.write("No responses yet.")
 
     # Younger Relative Notifications
-    st.subheader("🧑‍🦱 Younger Relative Notifications")
-    notifications = younger_agent.get_notifications()
-    if notifications:
-        for n in notifications[::-1]:
-            st.markdown(f"**[{n['timestamp']}]** Insights for {n['context']['birthday_info']['name']}")
-            st.write(f"**Insights:** {n['insights']}")
-            if 'suggestions' in n:
-                st.write(f"**Suggestions:** {n['suggestions']}")
-    else:
-        st.write("No notifications yet.")
+    with younger_section:
+        notifications = log_page("younger_relative")
+        if notifications:
+            for n in notifications:
+                st.markdown(f"**[{n['timestamp']}]** Insights for {n['context']['birthday_info']['name']}")
+                st.write(f"**Insights:** {n['insights']}")
+                if 'suggestions' in n:
+                    st.write(f"**Suggestions:** {n['suggestions']}")
+        else:
+            st.write("No notifications yet.")
 
     st.markdown("---")
-    st.caption("Made with ❤️ for families and connection.") 
\ No newline at end of file
+    st.caption("Made with ❤️ for families and connection.")
\ No newline at end of file
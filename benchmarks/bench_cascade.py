@@ -0,0 +1,222 @@
+"""End-to-end cascade benchmark on the offline fake LLM backend.
+
+Drives MemoryAgent.check_and_alert -> MasterAgent -> ElderlyAgent ->
+YoungerRelativeAgent over synthetic contact files and reports throughput,
+cascade latency percentiles, peak RSS and event-loop lag. Each dataset size
+runs in its own subprocess so peak RSS is per size. Results are saved as
+JSON and can be compared with an earlier run:
+
+    python -m benchmarks.bench_cascade --sizes 10 1000 100000 1000000
+    python -m benchmarks.bench_cascade --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from agents.fake_backend import FakeBackend
+from agents.llm_transport import LLMTransport
+from agents.tracing import LoopLagSampler
+from main import FamilyConnectionOrchestrator
+
+DEFAULT_SIZES = (10, 1000, 100000, 1000000)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+_RELATIONSHIPS = ("granddaughter", "grandson", "daughter", "son", "niece", "nephew", "friend", "sister")
+_INTERESTS = ("gardening", "chess", "music", "painting", "football", "cooking", "travel", "reading", "photography")
+
+
+def make_dataset(contacts: int, today: date, today_fraction: Optional[float], seed: int) -> str:
+    """Write (or reuse) an NDJSON file of synthetic contacts and return its path.
+
+    Birthdays are spread uniformly over the year unless ``today_fraction``
+    puts that share of contacts on ``today``; the first contact is always
+    on ``today`` so even tiny datasets run a cascade.
+    """
+    name = f"family-bench-v2-{contacts}-{seed}-{today.isoformat()}-{today_fraction}.jsonl"
+    path = os.path.join(tempfile.gettempdir(), name)
+    if os.path.exists(path):
+        return path
+    rng = random.Random(seed)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for i in range(contacts):
+            year = rng.randint(1935, 2015)
+            if i == 0 or today_fraction is not None and rng.random() < today_fraction:
+                month, day = today.month, today.day
+            else:
+                day_of_year = rng.randint(0, 364)
+                as_date = date.fromordinal(date(2001, 1, 1).toordinal() + day_of_year)
+                month, day = as_date.month, as_date.day
+            f.write(json.dumps({
+                "name": f"Contact {i}",
+                "relationship": rng.choice(_RELATIONSHIPS),
+                "date": f"{year:04d}-{month:02d}-{day:02d}",
+                "age": today.year - year,
+                "interests": rng.sample(_INTERESTS, rng.randint(1, 3)),
+                "notes": f"Synthetic contact {i}"
+            }) + "\n")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))], 4)
+
+
+async def run_size(contacts: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one check_and_alert over a synthetic file of ``contacts`` contacts"""
+    today = date.today()
+    path = make_dataset(contacts, today, options["today_fraction"], options["seed"])
+    backend = FakeBackend(
+        mean_latency=options["mean_latency"], latency_distribution=options["latency_distribution"],
+        tokens_per_second=options["tokens_per_second"], completion_tokens=options["completion_tokens"],
+        failure_rate=options["failure_rate"], seed=options["seed"], time_scale=options["time_scale"]
+    )
+    transport = LLMTransport(backend)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # Every store in memory, so nothing under data/ is opened; each contact's prompts
+        # are unique, so the memory-only response cache has no hits and the full cascade is measured
+        orchestrator = FamilyConnectionOrchestrator(
+            "offline", transport=transport, data_file_path=path, cache_path=None, ledger_path=None,
+            interaction_log_path=None, precompute_path=None, person_memory_path=None, checkpoint_path=None,
+            similarity_cache_path=None,
+            max_concurrent_cascades=options["max_concurrent_cascades"],
+            max_concurrent_llm_requests=options["max_concurrent_llm_requests"], streaming=options["streaming"]
+        )
+
+        monitor = LoopLagSampler(interval=0.01)
+        monitor.start()
+        started = time.perf_counter()
+        try:
+            results = await orchestrator.agents["memory"].check_and_alert()
+        finally:
+            elapsed = time.perf_counter() - started
+            await monitor.stop()
+            await orchestrator.close()
+
+    latencies = [result.latency for result in results]
+    usage = transport.usage.summary()["total"]
+    return {
+        "contacts": contacts,
+        "cascades": len(results),
+        "failed_cascades": sum(1 for result in results if not result.ok),
+        "wall_seconds": round(elapsed, 3),
+        "cascades_per_second": round(len(results) / elapsed, 2) if elapsed else None,
+        "contacts_per_second": round(contacts / elapsed, 1) if elapsed else None,
+        "llm_calls": usage["calls"],
+        "llm_failures": backend.stats["failures"],
+        "cascade_latency": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+                            "p99": percentile(latencies, 99)},
+        "loop_lag": {"p50": percentile(monitor.samples, 50), "p99": percentile(monitor.samples, 99),
+                     "max": round(max(monitor.samples), 4) if monitor.samples else None},
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    }
+
+
+def run_in_subprocess(contacts: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_cascade", "--single", str(contacts), "--options", json.dumps(options)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]):
+    """Print the change of each headline metric against an earlier results file"""
+    earlier = {result["contacts"]: result for result in previous["results"]}
+    print(f"\nCompared with {previous.get('git_commit')} ({previous.get('timestamp')}):")
+    for result in current["results"]:
+        before = earlier.get(result["contacts"])
+        if before is None:
+            continue
+        changes = []
+        for label, now, then in (
+            ("cascades/s", result["cascades_per_second"], before["cascades_per_second"]),
+            ("p95", result["cascade_latency"]["p95"], before["cascade_latency"]["p95"]),
+            ("lag p99", result["loop_lag"]["p99"], before["loop_lag"]["p99"]),
+            ("rss MB", result["peak_rss_mb"], before["peak_rss_mb"]),
+        ):
+            if now is not None and then:
+                changes.append(f"{label} {then} -> {now} ({100 * (now - then) / then:+.1f}%)")
+        print(f"  {result['contacts']:>9} contacts: " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Contacts per dataset")
+    parser.add_argument("--mean-latency", type=float, default=0.8, help="Mean time to first token (s)")
+    parser.add_argument("--latency-distribution", default="lognormal",
+                        choices=("constant", "uniform", "exponential", "lognormal"))
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--completion-tokens", type=int, default=120)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Multiplier on every fake wait")
+    parser.add_argument("--today-fraction", type=float, default=None,
+                        help="Share of contacts whose birthday is today (default: uniform over the year)")
+    parser.add_argument("--max-concurrent-cascades", type=int, default=10)
+    parser.add_argument("--max-concurrent-llm-requests", type=int, default=8)
+    parser.add_argument("--streaming", action="store_true", help="Stream the data file while alerting")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_DIR, help="Directory for the results JSON")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--options", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(asyncio.run(run_size(args.single, json.loads(args.options)))))
+        return
+
+    options = {key: getattr(args, key) for key in (
+        "mean_latency", "latency_distribution", "tokens_per_second", "completion_tokens", "failure_rate",
+        "time_scale", "today_fraction", "max_concurrent_cascades", "max_concurrent_llm_requests", "streaming", "seed"
+    )}
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": options,
+        "results": []
+    }
+    for contacts in args.sizes:
+        result = run_in_subprocess(contacts, options)
+        report["results"].append(result)
+        print(f"{contacts:>9} contacts: {result['cascades']} cascades in {result['wall_seconds']}s "
+              f"({result['cascades_per_second']}/s), latency {result['cascade_latency']}, "
+              f"loop lag {result['loop_lag']}, peak RSS {result['peak_rss_mb']} MB")
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"cascade-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {path}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,115 @@
+import argparse
 import asyncio
+import logging
 import os
 import json
 from datetime import datetime, date
+from typing import Any, Dict, List, Optional, Tuple
 from agents.master_agent import MasterAgent
 from agents.memory_agent import MemoryAgent
+from agents.cascade_scheduler import CascadeResult
 from agents.elderly_agent import ElderlyAgent
 from agents.younger_relative_agent import YoungerRelativeAgent
+from agents.llm_transport import LLMTransport, get_shared_transport
+from agents.llm_cache import LLMCache
+from agents.alert_ledger import AlertLedger
+from agents.resilience import RateLimiter, RetryPolicy
+from agents.interaction_log import InteractionLog
+from agents.precompute_store import PrecomputeStore
+from agents.person_memory import PersonMemory
+from agents.checkpoint_store import CheckpointStore
+from agents.message_bus import MessageBus
+from agents.model_routing import ModelRouter
+from agents.similarity_cache import SimilarityCache
+from agents.logging_setup import configure_logging
+from agents.profiling import StackSampler, write_profile
+from agents.tracing import LoopLagSampler, tracer
+
+logger = logging.getLogger(__name__)
 
 class FamilyConnectionOrchestrator:
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, max_concurrent_cascades: int = 10, max_concurrent_llm_requests: int = 8,
+                 cache_path: Optional[str] = "data/llm_cache.sqlite3", streaming: bool = False,
+                 ledger_path: Optional[str] = "data/alert_ledger.sqlite3", compact_prompts: bool = True,
+                 data_file_path: str = "data/birthdays.json", transport: Optional[LLMTransport] = None,
+                 interaction_log_path: Optional[str] = "data/interactions.sqlite3", interaction_buffer_size: int = 200,
+                 interaction_retention_days: Optional[float] = 90, request_timeout: float = 30.0,
+                 llm_deadline: float = 90.0, max_attempts: int = 4, rpm_limit: int = 0, tpm_limit: int = 0,
+                 precompute_path: Optional[str] = "data/precomputed.sqlite3", precompute_days: int = 0,
+                 precompute_window: Tuple[int, int] = (2, 5), agent_concurrency: Optional[Dict[str, int]] = None,
+                 bus_queue_size: int = 100, model_routing: Optional[Dict[str, Any]] = None,
+                 similarity_steps: Tuple[str, ...] = (),
+                 similarity_cache_path: Optional[str] = "data/similarity_cache.sqlite3",
+                 similarity_max_distance: int = 3,
+                 person_memory_path: Optional[str] = "data/person_memory.sqlite3", person_memory_chars: int = 0,
+                 checkpoint_path: Optional[str] = "data/checkpoints.sqlite3", cache_max_disk_entries: int = 50000):
         self.openai_api_key = openai_api_key
+        self.data_file_path = data_file_path
+        self.max_concurrent_cascades = max_concurrent_cascades
+        self.streaming = streaming
+        self.ledger = AlertLedger(ledger_path)
+        # Outputs generated ahead of the day during the low-traffic window
+        self.precomputed = PrecomputeStore(precompute_path)
+        self.precompute_days = precompute_days
+        # Opt-in fixed-size summary of earlier interactions per person (0 chars = off); costs one LLM call per cascade
+        self.person_memory = (PersonMemory(person_memory_path or None, person_memory_chars)
+                              if person_memory_chars else None)
+        # Outputs of each completed cascade step, so an interrupted run can be resumed;
+        # checkpoints left from earlier days can no longer be resumed
+        self.checkpoints = CheckpointStore(checkpoint_path or None)
+        self.checkpoints.prune(date.today())
+        self.precompute_window = precompute_window
+        # Agents exchange messages over a bus; each subscription has its own
+        # queue and workers (default: one worker per concurrent cascade)
+        self.bus = MessageBus(default_concurrency=max_concurrent_cascades, default_queue_size=bus_queue_size)
+        self.agent_concurrency = agent_concurrency or {}
+        # Started with the demo or monitoring loop; reported under "loop_lag"
+        self.loop_lag = LoopLagSampler()
+        self.interactions = InteractionLog(interaction_log_path or None, buffer_size=interaction_buffer_size,
+                                           retention_days=interaction_retention_days)
+        self.transport = transport or get_shared_transport(openai_api_key)
+        self.transport.set_max_in_flight(max_concurrent_llm_requests)
+        if self.transport.cache is None:
+            self.transport.cache = LLMCache(cache_path or None, max_disk_entries=cache_max_disk_entries)
+        self.transport.compactor.enabled = compact_prompts
+        # Model tier and max_tokens per agent step (None = built-in defaults)
+        self.transport.router = ModelRouter(model_routing)
+        # Opt-in: steps answered from similar prompts about other people
+        self.transport.similarity_cache = SimilarityCache(
+            similarity_cache_path or None, steps=similarity_steps, max_distance=similarity_max_distance
+        ) if similarity_steps else None
+        self.transport.retry_policy = RetryPolicy(max_attempts=max_attempts, request_timeout=request_timeout,
+                                                  deadline=llm_deadline)
+        if rpm_limit or tpm_limit:
+            self.transport.rate_limiter = RateLimiter(rpm=rpm_limit, tpm=tpm_limit)
         self.agents = {}
         self.setup_agents()
         
     def setup_agents(self):
         """Initialize all agents with AGNO and register them"""
-        print("Setting up Family Connection Agents...")
+        logger.info("Setting up Family Connection Agents...")
         
-        # Create agents
-        self.agents["master"] = MasterAgent(self.openai_api_key)
-        self.agents["memory"] = MemoryAgent(self.openai_api_key)
-        self.agents["elderly"] = ElderlyAgent(self.openai_api_key)
-        self.agents["younger_relative"] = YoungerRelativeAgent(self.openai_api_key)
+        # Create agents (all sharing one pooled async LLM transport)
+        self.agents["master"] = MasterAgent(self.openai_api_key, transport=self.transport,
+                                            interaction_log=self.interactions, precomputed=self.precomputed,
+                                            bus=self.bus)
+        self.agents["memory"] = MemoryAgent(self.openai_api_key, data_file_path=self.data_file_path,
+                                            transport=self.transport,
+                                            max_concurrent_cascades=self.max_concurrent_cascades,
+                                            streaming=self.streaming, ledger=self.ledger,
+                                            precomputed=self.precomputed)
+        self.agents["elderly"] = ElderlyAgent(self.openai_api_key, transport=self.transport,
+                                              interaction_log=self.interactions, precomputed=self.precomputed)
+        self.agents["younger_relative"] = YoungerRelativeAgent(self.openai_api_key, transport=self.transport,
+                                                               interaction_log=self.interactions)
         
-        # Register agents with master
+        for key, agent in self.agents.items():
+            agent.concurrency = self.agent_concurrency.get(key, self.bus.default_concurrency)
+            agent.queue_size = self.bus.default_queue_size
+            agent.person_memory = self.person_memory
+            agent.checkpoints = self.checkpoints
+            
+        # Register agents with master (subscribes them to the message bus)
         self.agents["master"].register_agent("memory_agent", self.agents["memory"])
         self.agents["master"].register_agent("elderly_agent", self.agents["elderly"])
         self.agents["master"].register_agent("younger_relative_agent", self.agents["younger_relative"])
@@ -33,10 +119,11 @@ class FamilyConnectionOrchestrator:
         self.agents["elderly"].register_master_agent(self.agents["master"])
         self.agents["younger_relative"].register_master_agent(self.agents["master"])
         
-        print("All agents registered and ready!")
+        logger.info("All agents registered and ready!")
         
     async def run_demo(self):
         """Run a demo scenario for the hackathon"""
+        self.loop_lag.start()
         print("\n" + "="*60)
         print("FAMILY CONNECTION AI AGENTS DEMO")
         print("="*60)
@@ -46,27 +133,17 @@ class FamilyConnectionOrchestrator:
         print(f"\nChecking for birthdays on {today.strftime('%B %d, %Y')}...")
         
         # Trigger the birthday check
+        # Returns once every birthday's whole cascade has been handled
         await self.agents["memory"].check_and_alert()
         
-        # Wait a moment for all interactions to complete
-        await asyncio.sleep(2)
-        
         # Display results
         print("\n" + "="*60)
         print("DEMO RESULTS")
         print("="*60)
         
-        # Show conversation log
-        master_log = self.agents["master"].get_conversation_log()
-        print(f"\nMaster Agent processed {len(master_log)} interactions")
-        
-        # Show elderly agent responses
+        print_report(self.report())
         elderly_responses = self.agents["elderly"].get_user_responses()
-        print(f"Elderly Agent had {len(elderly_responses)} interactions")
-        
-        # Show younger relative notifications
         younger_notifications = self.agents["younger_relative"].get_notifications()
-        print(f"Younger Relative Agent received {len(younger_notifications)} notifications")
         
         # Display detailed interaction if any occurred
         if elderly_responses:
@@ -83,12 +160,143 @@ class FamilyConnectionOrchestrator:
             if 'suggestions' in notification:
                 print(f"Suggestions: {notification['suggestions']}")
                 
+    async def resume(self) -> List[CascadeResult]:
+        """Finish today's cascades after a crash.
+        
+        Cascades the ledger shows as finished are skipped. The rest are run
+        again, with every step checkpointed before the crash returned from
+        the checkpoint store, so LLM calls start at each cascade's first
+        missing step.
+        """
+        pending = self.checkpoints.pending()
+        logger.info("Resuming today's cascades (%s interrupted: %s)", len(pending), ", ".join(pending) or "none")
+        return await self.agents["memory"].check_and_alert(skip_alerted=True)
+        
+    def report(self) -> Dict[str, Any]:
+        """Interaction counts, cache, token usage, compaction and LLM reliability figures so far"""
+        return {
+            # This run's entries only; the persisted log also holds earlier runs'
+            "interactions": {channel: self.interactions.appended(channel)
+                             for channel in ("master", "elderly", "younger_relative")},
+            "cache": self.transport.cache.get_stats() if self.transport.cache is not None else None,
+            "token_usage": self.transport.usage.summary(),
+            "compaction": self.transport.compactor.savings(),
+            "llm": dict(self.transport.stats, circuit=self.transport.circuit_breaker.state),
+            "precompute": dict(self.precomputed.stats),
+            "bus": self.bus.metrics(),
+            "models": self.transport.router.report(self.transport.usage.summary()["by_tier"]),
+            "similarity": (self.transport.similarity_cache.get_stats()
+                           if self.transport.similarity_cache is not None else None),
+            "person_memory": dict(self.person_memory.stats) if self.person_memory is not None else None,
+            "checkpoints": dict(self.checkpoints.stats),
+            "loop_lag": self.loop_lag.summary()
+        }
+        
+    async def close(self):
+        """Stop the message bus and release the LLM transport's connections and the local stores"""
+        await self.loop_lag.stop()
+        self.bus.close()
+        await self.transport.aclose()
+        self.interactions.close()
+        self.precomputed.close()
+        self.checkpoints.close()
+        if self.person_memory is not None:
+            self.person_memory.close()
+        if self.transport.similarity_cache is not None:
+            self.transport.similarity_cache.close()
+        
     async def run_continuous_monitoring(self, check_interval: int = 60):
-        """Run continuous monitoring for real-time birthday checks"""
-        print(f"Starting continuous monitoring (checking every {check_interval} seconds)...")
-        await self.agents["memory"].start_monitoring(check_interval)
+        """Run continuous monitoring for real-time birthday checks (plus daily precompute when enabled)"""
+        logger.info("Starting continuous monitoring (watching for data changes every %s seconds)...", check_interval)
+        self.loop_lag.start()
+        memory_agent = self.agents["memory"]
+        if not self.precompute_days:
+            await memory_agent.start_monitoring(check_interval)
+            return
+        await asyncio.gather(
+            memory_agent.start_monitoring(check_interval),
+            memory_agent.start_precompute(self.precompute_days, *self.precompute_window)
+        )
+
+def print_report(report: Dict[str, Any]):
+    """Print an orchestrator (or merged sharded) report"""
+    interactions = report["interactions"]
+    print(f"\nMaster Agent processed {interactions['master']} interactions")
+    print(f"Elderly Agent had {interactions['elderly']} interactions")
+    print(f"Younger Relative Agent received {interactions['younger_relative']} notifications")
+    
+    # Show response cache effectiveness and token spend
+    if report["cache"] is not None:
+        print(f"LLM cache: {report['cache']}")
+    usage = report["token_usage"]
+    print(f"Token usage: {usage['total']} "
+          f"(avg {usage['avg_prompt_tokens_per_cascade']} prompt tokens per cascade)")
+    for step, totals in usage["by_step"].items():
+        print(f"  {step}: {totals['prompt_tokens']} prompt + {totals['completion_tokens']} completion tokens")
+    print(f"Prompt compaction: {report['compaction']}")
+    print(f"LLM requests: {report['llm']}")
+    for tier, figures in report["models"].items():
+        calls = figures["calls"]
+        print(f"Model tier {tier} ({figures['model']}): {calls} calls, {figures['fallbacks']} fell back, "
+              f"avg latency {figures['latency_seconds'] / calls if calls else 0:.2f}s, ${figures['cost_usd']:.4f}")
+    print(f"Precomputed outputs: {report['precompute']}")
+    if report.get("similarity") is not None:
+        print(f"Similar-prompt cache: {report['similarity']}")
+    if report.get("person_memory") is not None:
+        print(f"Person memory: {report['person_memory']}")
+    if report.get("checkpoints") is not None:
+        print(f"Cascade checkpoints: {report['checkpoints']}")
+    for queue, metrics in report.get("bus", {}).items():
+        print(f"  {queue}: {metrics['handled']} handled, {metrics['failed']} failed, max depth {metrics['max_depth']}, "
+              f"avg wait {metrics['avg_wait_seconds']}s, avg handling {metrics['avg_busy_seconds']}s")
+    if report.get("loop_lag", {}).get("samples"):
+        print(f"Event loop lag: {report['loop_lag']}")
+
+def load_model_routing(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Read a model routing config (see agents/model_routing.py DEFAULT_ROUTING) from a JSON file"""
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-async def main():
+def orchestrator_options_from_env() -> Dict[str, Any]:
+    """``FamilyConnectionOrchestrator`` keyword arguments from the performance environment variables"""
+    return dict(
+        max_concurrent_cascades=int(os.getenv("MAX_CONCURRENT_CASCADES", "10")),
+        max_concurrent_llm_requests=int(os.getenv("MAX_CONCURRENT_LLM_REQUESTS", "8")),
+        cache_path=os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3"),
+        streaming=os.getenv("STREAM_BIRTHDAY_DATA", "").lower() in ("1", "true", "yes"),
+        ledger_path=os.getenv("ALERT_LEDGER_PATH", "data/alert_ledger.sqlite3"),
+        compact_prompts=os.getenv("COMPACT_PROMPTS", "1").lower() not in ("0", "false", "no"),
+        interaction_log_path=os.getenv("INTERACTION_LOG_PATH", "data/interactions.sqlite3"),
+        interaction_buffer_size=int(os.getenv("INTERACTION_BUFFER_SIZE", "200")),
+        interaction_retention_days=float(os.getenv("INTERACTION_RETENTION_DAYS", "90")),
+        request_timeout=float(os.getenv("LLM_REQUEST_TIMEOUT", "30")),
+        llm_deadline=float(os.getenv("LLM_DEADLINE", "90")),
+        max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "4")),
+        rpm_limit=int(os.getenv("LLM_RPM_LIMIT", "0")),
+        tpm_limit=int(os.getenv("LLM_TPM_LIMIT", "0")),
+        precompute_path=os.getenv("PRECOMPUTE_PATH", "data/precomputed.sqlite3"),
+        precompute_days=int(os.getenv("PRECOMPUTE_DAYS", "0")),
+        precompute_window=tuple(int(hour) for hour in os.getenv("PRECOMPUTE_WINDOW", "2-5").split("-", 1)),
+        agent_concurrency={agent: int(workers) for agent, workers in
+                           (item.split("=", 1) for item in os.getenv("AGENT_CONCURRENCY", "").split(",") if item)},
+        bus_queue_size=int(os.getenv("BUS_QUEUE_SIZE", "100")),
+        model_routing=load_model_routing(os.getenv("MODEL_ROUTING_PATH")),
+        similarity_steps=tuple(step for step in os.getenv("SIMILARITY_CACHE_STEPS", "").split(",") if step),
+        similarity_cache_path=os.getenv("SIMILARITY_CACHE_PATH", "data/similarity_cache.sqlite3"),
+        similarity_max_distance=int(os.getenv("SIMILARITY_MAX_DISTANCE", "3")),
+        person_memory_path=os.getenv("PERSON_MEMORY_PATH", "data/person_memory.sqlite3"),
+        person_memory_chars=int(os.getenv("PERSON_MEMORY_CHARS", "0")),
+        checkpoint_path=os.getenv("CHECKPOINT_PATH", "data/checkpoints.sqlite3"),
+        cache_max_disk_entries=int(os.getenv("LLM_CACHE_MAX_ROWS", "50000"))
+    )
+
+def create_orchestrator_from_env(openai_api_key: str) -> FamilyConnectionOrchestrator:
+    """Build an orchestrator configured by the performance environment variables"""
+    return FamilyConnectionOrchestrator(openai_api_key, **orchestrator_options_from_env())
+
+async def main(profile: Optional[str] = None, resume: bool = False):
     """Main function to run the family connection system"""
     # Get OpenAI API key from environment
     openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -96,15 +304,38 @@ async def main():
         print("Error: OPENAI_API_KEY environment variable not set")
         print("Please set your OpenAI API key: export OPENAI_API_KEY='your-key-here'")
         return
+    configure_logging(os.getenv("LOG_LEVEL", "INFO"), os.getenv("TRACE_PATH"))
         
     # Create orchestrator
-    orchestrator = FamilyConnectionOrchestrator(openai_api_key)
+    orchestrator = create_orchestrator_from_env(openai_api_key)
+    sampler = StackSampler() if profile else None
+    if sampler:
+        sampler.start()
     
-    # Run demo
-    await orchestrator.run_demo()
-    
-    # Optionally run continuous monitoring
-    # await orchestrator.run_continuous_monitoring(check_interval=30)
+    try:
+        if resume:
+            # Pick up where a crashed run stopped instead of running the demo
+            await orchestrator.resume()
+            print_report(orchestrator.report())
+        else:
+            # Run demo
+            await orchestrator.run_demo()
+        
+        # Optionally run continuous monitoring
+        # await orchestrator.run_continuous_monitoring(check_interval=30)
+    finally:
+        if sampler:
+            sampler.stop()
+            paths = write_profile(profile, sampler, tracer, {"loop_lag": orchestrator.loop_lag.summary()})
+            print(f"Profile written to {paths[0]} (flame graph) and {paths[1]} (per-step latency)")
+        await orchestrator.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the family connection agents demo")
+    parser.add_argument("--profile", nargs="?", metavar="PREFIX",
+                        const=f"data/profile-{datetime.now():%Y%m%d-%H%M%S}",
+                        help="sample stacks and trace LLM steps; writes PREFIX.folded and PREFIX.steps.json")
+    parser.add_argument("--resume", action="store_true",
+                        help="finish today's interrupted cascades, replaying completed steps from checkpoints")
+    args = parser.parse_args()
+    asyncio.run(main(args.profile, args.resume))
\ No newline at end of file
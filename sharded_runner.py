@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import glob
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Any, Dict, List, Optional
+from agents.birthday_store import BirthdayStore
+from agents.llm_transport import LLMTransport
+from agents.logging_setup import configure_logging
+from main import FamilyConnectionOrchestrator, orchestrator_options_from_env, print_report
+
+logger = logging.getLogger(__name__)
+
+HOUSEHOLD_PATTERNS = ("*.json", "*.jsonl", "*.ndjson")
+
+# Stores each shard keeps to itself (set by _run_shard, not taken from the options)
+SHARD_LOCAL_OPTIONS = ("cache_path", "ledger_path", "precompute_path", "person_memory_path", "checkpoint_path",
+                       "similarity_cache_path", "interaction_log_path", "data_file_path")
+
+# Cross-process cap on in-flight LLM requests, installed by the pool initializer
+_process_limiter = None
+
+
+def find_household_files(paths: List[str]) -> List[str]:
+    """Expand directories into the household data files they contain"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in HOUSEHOLD_PATTERNS:
+                files.extend(sorted(glob.glob(os.path.join(path, pattern))))
+        else:
+            files.append(path)
+    return files
+
+
+def partition(files: List[str], shards: int) -> List[List[str]]:
+    """Split files into shards of similar total size (largest first, onto the lightest shard)"""
+    buckets: List[List[str]] = [[] for _ in range(max(1, min(shards, len(files))))]
+    loads = [0] * len(buckets)
+    for path in sorted(files, key=lambda path: os.path.getsize(path) if os.path.exists(path) else 0, reverse=True):
+        lightest = loads.index(min(loads))
+        buckets[lightest].append(path)
+        loads[lightest] += os.path.getsize(path) if os.path.exists(path) else 0
+    return [bucket for bucket in buckets if bucket]
+
+
+def _init_process(limiter, log_level):
+    global _process_limiter
+    _process_limiter = limiter
+    configure_logging(log_level)
+
+
+def run_shard(shard: int, files: List[str], openai_api_key: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Process one shard of households in this worker process; returns its report"""
+    return asyncio.run(_run_shard(shard, files, openai_api_key, options))
+
+
+async def _run_shard(shard: int, files: List[str], openai_api_key: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    options = {key: value for key, value in options.items() if key not in SHARD_LOCAL_OPTIONS}
+    cache_dir = options.pop("cache_dir", None)
+    # A transport (and so cache and usage ledger) of its own per shard
+    transport = LLMTransport.for_openai(openai_api_key)
+    transport.process_limiter = _process_limiter
+    orchestrator = FamilyConnectionOrchestrator(
+        openai_api_key,
+        cache_path=os.path.join(cache_dir, f"llm_cache.shard{shard}.sqlite3") if cache_dir else None,
+        ledger_path=None,
+        precompute_path=None,
+        person_memory_path=None,
+        checkpoint_path=None,
+        similarity_cache_path=os.path.join(cache_dir, f"similarity_cache.shard{shard}.sqlite3") if cache_dir else None,
+        interaction_log_path=None,
+        transport=transport,
+        **options
+    )
+    orchestrator.loop_lag.start()
+    try:
+        # All of the shard's households go through one scheduler, so up to
+        # max_concurrent_cascades cascades are in flight whichever household they belong to
+        today = date.today()
+        birthdays = [birthday for path in files for birthday in BirthdayStore(path).birthdays_on(today)]
+        results = await orchestrator.agents["memory"].alert_birthdays(birthdays, today) if birthdays else []
+        latencies = [result.latency for result in results]
+        failed = sum(1 for result in results if not result.ok)
+        report = orchestrator.report()
+    finally:
+        await orchestrator.close()
+        if transport.cache is not None:
+            transport.cache.close()
+        orchestrator.ledger.close()
+    report.update(shards=1, households=len(files), cascade_latencies=latencies, failed_cascades=failed)
+    return report
+
+
+def _sum_into(target: Dict[str, Any], source: Dict[str, Any]):
+    for key, value in source.items():
+        if isinstance(value, dict):
+            _sum_into(target.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)):
+            target[key] = target.get(key, 0) + value
+
+
+def _merge_bus(target: Dict[str, Dict[str, Any]], source: Dict[str, Dict[str, Any]]):
+    for queue, metrics in source.items():
+        merged = target.setdefault(queue, {})
+        _sum_into(merged, {key: value for key, value in metrics.items() if not key.startswith(("avg_", "max_"))})
+        for key, value in metrics.items():
+            if key.startswith("max_"):
+                merged[key] = max(merged.get(key, 0), value)
+        # Same denominator as Subscription.metrics: every message a worker took up
+        handled = merged.get("handled", 0) + merged.get("failed", 0) + merged.get("cancelled", 0)
+        for key in ("wait", "busy"):
+            total = merged.get(f"{key}_seconds", 0.0)
+            merged[f"{key}_seconds"] = round(total, 4)
+            merged[f"avg_{key}_seconds"] = round(total / handled, 4) if handled else 0.0
+
+
+def merge_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-shard reports into one report in the shape ``print_report`` expects.
+
+    Counts are summed; maximum bus queue depths and waits, and event loop
+    lag, are those of the worst shard.
+    """
+    merged: Dict[str, Any] = {"shards": 0, "households": 0, "failed_cascades": 0, "cascade_latencies": [],
+                              "interactions": {}, "cache": None, "compaction": {}, "llm": {}, "precompute": {},
+                              "similarity": None, "person_memory": None, "checkpoints": None, "bus": {},
+                              "loop_lag": {"samples": 0, "p50": None, "p99": None, "max": None},
+                              "models": {}, "token_usage": {"total": {}, "by_agent": {}, "by_step": {}, "by_model": {},
+                                                            "by_tier": {}, "cascades": 0}}
+    prompt_tokens = 0
+    for report in reports:
+        for key in ("shards", "households", "failed_cascades"):
+            merged[key] += report[key]
+        merged["cascade_latencies"].extend(report["cascade_latencies"])
+        _sum_into(merged["interactions"], report["interactions"])
+        # Circuit state becomes a count of shards per state
+        llm = dict(report["llm"])
+        _sum_into(merged["llm"], dict(llm, circuit={llm.pop("circuit"): 1}))
+        _sum_into(merged["precompute"], report["precompute"])
+        for tier, figures in report["models"].items():
+            merged["models"].setdefault(tier, {"model": figures["model"]})
+            _sum_into(merged["models"][tier], figures)
+        _merge_bus(merged["bus"], report.get("bus", {}))
+        lag = report.get("loop_lag") or {}
+        if lag.get("samples"):
+            merged["loop_lag"]["samples"] += lag["samples"]
+            for key in ("p50", "p99", "max"):
+                merged["loop_lag"][key] = max(merged["loop_lag"][key] or 0.0, lag[key])
+        for key in ("cache", "similarity", "person_memory", "checkpoints"):
+            if report.get(key) is not None:
+                if merged[key] is None:
+                    merged[key] = {}
+                _sum_into(merged[key], report[key])
+        usage = report["token_usage"]
+        for key in ("total", "by_agent", "by_step", "by_model", "by_tier"):
+            _sum_into(merged["token_usage"][key], usage[key])
+        merged["token_usage"]["cascades"] += usage["cascades"]
+        prompt_tokens += usage["avg_prompt_tokens_per_cascade"] * usage["cascades"]
+        compaction = report["compaction"]
+        _sum_into(merged["compaction"], {"original_tokens": compaction["original_tokens"],
+                                         "compacted_tokens": compaction["compacted_tokens"]})
+
+    cascades = merged["token_usage"]["cascades"]
+    merged["token_usage"]["avg_prompt_tokens_per_cascade"] = round(prompt_tokens / cascades, 1) if cascades else 0
+    original = merged["compaction"].get("original_tokens", 0)
+    compacted = merged["compaction"].get("compacted_tokens", 0)
+    merged["compaction"] = {
+        "original_tokens": original,
+        "compacted_tokens": compacted,
+        "saved_tokens": original - compacted,
+        "saved_percent": round(100 * (original - compacted) / original, 1) if original else 0.0
+    }
+    return merged
+
+
+def run_sharded(files: List[str], openai_api_key: str, processes: Optional[int] = None,
+                max_llm_requests: int = 32, **options) -> Dict[str, Any]:
+    """Run every household file across a process pool and return the merged report.
+
+    Each worker process runs its own orchestrator, event loop and LLM cache;
+    at most ``max_llm_requests`` LLM requests are in flight across all of them.
+    Remaining ``options`` are passed to ``FamilyConnectionOrchestrator``
+    (plus ``cache_dir`` for the per-shard cache files); ``rpm_limit`` and
+    ``tpm_limit`` are account-wide and split evenly between the shards.
+    """
+    processes = processes or os.cpu_count() or 1
+    shards = partition(files, processes)
+    for quota in ("rpm_limit", "tpm_limit"):
+        if options.get(quota):
+            options[quota] = max(1, options[quota] // len(shards))
+    context = multiprocessing.get_context("spawn")
+    limiter = context.BoundedSemaphore(max_llm_requests)
+    options.setdefault("max_concurrent_llm_requests", max_llm_requests)
+    reports = []
+    with ProcessPoolExecutor(max_workers=len(shards) or 1, mp_context=context,
+                             initializer=_init_process,
+                             initargs=(limiter, logging.getLevelName(logging.getLogger().level))) as pool:
+        futures = {pool.submit(run_shard, shard, shard_files, openai_api_key, options): shard
+                   for shard, shard_files in enumerate(shards)}
+        for future in as_completed(futures):
+            report = future.result()
+            logger.info("Sharded Runner: Shard %s finished %s households", futures[future], report['households'])
+            reports.append(report)
+    return merge_reports(reports)
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"cascades": 0}
+    return {
+        "cascades": len(latencies),
+        "median": round(latencies[len(latencies) // 2], 3),
+        "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+        "max": round(latencies[-1], 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run birthday checks for many households across processes")
+    parser.add_argument("paths", nargs="+", help="Household data files, or directories of them")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-llm-requests", type=int,
+                        default=int(os.getenv("MAX_CONCURRENT_LLM_REQUESTS", "32")),
+                        help="LLM requests in flight across all processes")
+    parser.add_argument("--cache-dir", default=os.getenv("SHARD_CACHE_DIR", "data/shard_cache"),
+                        help="Directory for per-shard LLM cache files (empty = memory only)")
+    args = parser.parse_args()
+
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        print("Error: OPENAI_API_KEY environment variable not set")
+        return
+
+    files = find_household_files(args.paths)
+    configure_logging(os.getenv("LOG_LEVEL", "INFO"))
+    logger.info("Sharded Runner: %s households across %s processes",
+                len(files), min(len(files), args.processes or os.cpu_count() or 1))
+    # Same settings as a single orchestrator, except the stores each shard keeps
+    # to itself and the LLM request cap, which --max-llm-requests sets across processes
+    options = {key: value for key, value in orchestrator_options_from_env().items()
+               if key not in SHARD_LOCAL_OPTIONS and key != "max_concurrent_llm_requests"}
+    report = run_sharded(files, openai_api_key, processes=args.processes, max_llm_requests=args.max_llm_requests,
+                         cache_dir=args.cache_dir or None, **options)
+
+    print("\n" + "="*60)
+    print("SHARDED RUN RESULTS")
+    print("="*60)
+    print(f"{report['households']} households in {report['shards']} shards; "
+          f"cascade latency {summarize_latencies(report['cascade_latencies'])}, "
+          f"{report['failed_cascades']} failed")
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from datetime import date
+
+from agents.cascade_scheduler import CascadeScheduler, current_cascade
+from agents.errors import LLMError
+from agents.fake_backend import FakeBackend
+from agents.llm_transport import LLMTransport
+from main import FamilyConnectionOrchestrator
+
+
+def _orchestrator(tmp_path, data_file):
+    transport = LLMTransport(FakeBackend(seed=1, time_scale=0.01))
+    orchestrator = FamilyConnectionOrchestrator(
+        "offline", transport=transport, data_file_path=str(data_file), cache_path=None,
+        ledger_path=str(tmp_path / "ledger.sqlite3"), interaction_log_path=str(tmp_path / "interactions.sqlite3"),
+        precompute_path=str(tmp_path / "precomputed.sqlite3"), checkpoint_path=str(tmp_path / "checkpoints.sqlite3")
+    )
+    transport.cache = None
+    return orchestrator
+
+
+def _birthdays(tmp_path, names):
+    today = date.today()
+    path = tmp_path / "birthdays.json"
+    path.write_text(json.dumps({"birthdays": [
+        {"name": name, "relationship": "granddaughter", "date": f"2016-{today.month:02d}-{today.day:02d}", "age": 8}
+        for name in names
+    ]}))
+    return path
+
+
+def test_resume_skips_completed_steps_and_does_not_duplicate_log_entries(tmp_path):
+    data_file = _birthdays(tmp_path, ["Emma", "Lily"])
+
+    async def crash():
+        orchestrator = _orchestrator(tmp_path, data_file)
+        younger = orchestrator.agents["younger_relative"]
+        llm_call = younger.llm_call
+
+        async def failing(prompt, step=None, *args, **kwargs):
+            if step == "younger.suggestions":
+                raise LLMError("crash")
+            return await llm_call(prompt, step, *args, **kwargs)
+
+        younger.llm_call = failing
+        results = await orchestrator.agents["memory"].check_and_alert()
+        pending = orchestrator.checkpoints.pending()
+        await orchestrator.close()
+        return results, pending
+
+    async def resume():
+        orchestrator = _orchestrator(tmp_path, data_file)
+        results = await orchestrator.resume()
+        report = orchestrator.report()
+        logged = {channel: orchestrator.interactions.count(channel)
+                  for channel in ("master", "elderly", "younger_relative")}
+        again = await orchestrator.resume()
+        await orchestrator.close()
+        return results, report, logged, again
+
+    results, pending = asyncio.run(crash())
+    assert not any(result.ok for result in results)
+    assert len(pending) == 2
+
+    results, report, logged, again = asyncio.run(resume())
+    assert all(result.ok for result in results)
+    assert again == []
+    by_step = report["token_usage"]["by_step"]
+    # Completed before the crash: served from checkpoints, not the LLM
+    for step in ("elderly.user_response", "master.response_analysis"):
+        assert by_step[step]["cached_calls"] == by_step[step]["calls"] == 2
+    assert by_step["younger.suggestions"]["cached_calls"] == 0
+    # Across both runs, each entry is logged once
+    assert logged == {"master": 4, "elderly": 2, "younger_relative": 2}
+    # The report counts only what the resumed run logged
+    assert sum(report["interactions"].values()) < sum(logged.values())
+    assert report["checkpoints"]["cleared"] == 2
+
+
+def test_cascade_ids_differ_for_people_sharing_a_name():
+    async def run():
+        seen = []
+
+        async def handler(item):
+            seen.append(current_cascade.get())
+
+        await CascadeScheduler().run([{"name": "Ann", "date": "1950-01-01"}, {"name": "Ann", "date": "1980-05-05"}],
+                                     handler)
+        return seen
+
+    first, second = asyncio.run(run())
+    assert first != second
+    assert first.startswith("Ann#") and second.startswith("Ann#")
@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from agents.llm_cache import LLMCache
+
+
+def _rows(path):
+    db = sqlite3.connect(path)
+    try:
+        return db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+    finally:
+        db.close()
+
+
+def test_expired_rows_are_purged_when_opened(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = LLMCache(path)
+    cache.set("old", "value", 0.01)
+    cache.set("fresh", "value", 60)
+    cache.close()
+    time.sleep(0.02)
+    reopened = LLMCache(path)
+    assert _rows(path) == 1
+    assert reopened.get("fresh") == "value"
+    reopened.close()
+
+
+def test_disk_tier_keeps_the_most_recently_used_rows(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = LLMCache(path, max_memory_entries=1, max_disk_entries=10)
+    cache.set("kept", "value", 60)
+    for i in range(250):
+        if i % 5 == 0:
+            # A disk hit (the memory tier holds one entry) keeps the row recent
+            assert cache.get("kept") == "value"
+        cache.set(f"key{i}", "value", 60)
+    assert _rows(path) <= 10 + 199
+    cache.close()
+    reopened = LLMCache(path, max_disk_entries=10)
+    assert _rows(path) == 10
+    assert reopened.get("key249") == "value"
+    assert reopened.get("kept") == "value"
+    assert reopened.get("key0") is None
+    reopened.close()
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from agents.message_bus import MessageBus
+
+
+def test_failed_cascade_stops_its_other_handlers_before_raising():
+    async def run():
+        bus = MessageBus()
+        events = []
+
+        async def start():
+            await bus.publish("slow")
+            await bus.publish("broken")
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                events.append("slow cancelled")
+                raise
+
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        bus.subscribe("start", "a", start)
+        bus.subscribe("slow", "b", slow)
+        bus.subscribe("broken", "c", broken)
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(bus.request("start"), 1)
+        assert events == ["slow cancelled"]
+        metrics = bus.metrics()
+        assert metrics["b:slow"]["cancelled"] == 1
+        assert metrics["c:broken"]["failed"] == 1
+        bus.close()
+
+    asyncio.run(run())
+
+
+def test_closing_the_bus_cancels_a_pending_request():
+    async def run():
+        bus = MessageBus()
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        bus.subscribe("hang", "a", hang)
+        request = asyncio.ensure_future(bus.request("hang"))
+        await asyncio.sleep(0.01)
+        bus.close()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(request, 1)
+
+    asyncio.run(run())
+
+
+def test_failure_while_a_sibling_is_blocked_publishing_to_a_full_queue():
+    async def run():
+        bus = MessageBus()
+        release = asyncio.Event()
+
+        async def start():
+            await bus.publish("fill")
+            await bus.publish("broken")
+
+        async def fill():
+            # One "stuck" message is handled, one fills the queue and the third publish blocks
+            await bus.publish("stuck")
+            await bus.publish("stuck")
+            await bus.publish("stuck")
+
+        async def stuck():
+            await release.wait()
+
+        async def broken():
+            await asyncio.sleep(0.05)
+            raise ValueError("boom")
+
+        bus.subscribe("start", "a", start)
+        bus.subscribe("fill", "b", fill)
+        bus.subscribe("stuck", "c", stuck, concurrency=1, queue_size=1)
+        bus.subscribe("broken", "d", broken)
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(bus.request("start"), 1)
+        bus.close()
+
+    asyncio.run(run())
@@ -0,0 +1,23 @@
+from agents.model_routing import VALIDATORS, ModelRouter
+from agents.token_usage import TokenUsageLedger
+
+
+def test_list_validator_needs_list_items():
+    assert VALIDATORS["list"]("1. Call her\n2. Send photos")
+    assert VALIDATORS["list"]("- Call her\n- Send photos")
+    assert not VALIDATORS["list"]("Call her soon.\nShe would love to hear from you.")
+
+
+def test_report_counts_tiers_that_share_a_model_separately():
+    router = ModelRouter({
+        "tiers": {"small": {"model": "gpt-4o", "prompt_cost_per_1m": 1.0},
+                  "large": {"model": "gpt-4o", "prompt_cost_per_1m": 2.0}},
+        "steps": {}
+    })
+    usage = TokenUsageLedger()
+    usage.record("agent", "a", None, 1000, 0, model="gpt-4o", tier="small")
+    usage.record("agent", "b", None, 3000, 0, model="gpt-4o", tier="large")
+    report = router.report(usage.summary()["by_tier"])
+    assert report["small"]["prompt_tokens"] == 1000
+    assert report["large"]["prompt_tokens"] == 3000
+    assert report["large"]["cost_usd"] == 0.006
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+
+from agents.errors import CircuitOpenError, LLMQueueTimeoutError, LLMUnavailableError
+from agents.fake_backend import FakeBackend
+from agents.llm_transport import Completion, LLMTransport
+from agents.resilience import CircuitBreaker, RetryPolicy
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(3):
+        breaker.before_request()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_half_open_lets_a_single_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == "half-open"
+    assert breaker.before_request() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.before_request() is False
+
+
+def test_failed_trial_reopens_and_released_trial_allows_another():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    trial = breaker.before_request()
+    breaker.release_trial(trial)
+    assert breaker.before_request() is True
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_slot_waiting_does_not_trip_the_breaker():
+    async def run():
+        backend = FakeBackend(mean_latency=0.5, latency_distribution="constant", tokens_per_second=1e9,
+                              time_scale=0.1)
+        transport = LLMTransport(backend, max_in_flight=2,
+                                 retry_policy=RetryPolicy(max_attempts=1, deadline=0.2))
+        results = await asyncio.gather(*(transport.complete("m", "s", f"p{i}", 10, 0.0) for i in range(30)),
+                                       return_exceptions=True)
+        assert any(isinstance(r, LLMQueueTimeoutError) for r in results)
+        assert transport.stats["queue_timeouts"] > 0
+        assert transport.circuit_breaker.state == "closed"
+        assert await transport.complete("m", "s", "after", 10, 0.0)
+
+    asyncio.run(run())
+
+
+class _FailingBackend:
+    def __init__(self):
+        self.calls = 0
+
+    async def complete(self, model, messages, max_tokens, temperature, json_output=False):
+        self.calls += 1
+        raise LLMUnavailableError("down")
+
+
+def test_provider_failures_trip_the_breaker():
+    async def run():
+        backend = _FailingBackend()
+        transport = LLMTransport(backend, circuit_breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60),
+                                 retry_policy=RetryPolicy(max_attempts=1))
+        for i in range(3):
+            with pytest.raises(LLMUnavailableError):
+                await transport.complete("m", "s", f"p{i}", 10, 0.0)
+        with pytest.raises(CircuitOpenError):
+            await transport.complete("m", "s", "p3", 10, 0.0)
+        assert backend.calls == 3
+        assert transport.stats["short_circuited"] == 1
+
+    asyncio.run(run())
+
+
+def test_cancelled_trial_is_released():
+    async def run():
+        class SlowBackend:
+            async def complete(self, model, messages, max_tokens, temperature, json_output=False):
+                await asyncio.sleep(10)
+                return Completion("late")
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        await asyncio.sleep(0.02)
+        transport = LLMTransport(SlowBackend(), circuit_breaker=breaker)
+        task = asyncio.ensure_future(transport.complete("m", "s", "p", 10, 0.0))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.01)
+        assert breaker.before_request() is True
+
+    asyncio.run(run())
@@ -0,0 +1,66 @@
+import asyncio
+
+from agents.similarity_cache import SimilarityCache
+
+
+def _person(name):
+    return {"name": name, "relationship": "granddaughter", "date": "2016-05-04", "age": 8}
+
+
+def _prompt(record):
+    return f"Give guidance for {record['name']}'s birthday on 2016-05-04, turning 8, who likes art and reading."
+
+
+def test_similar_misses_wait_for_one_completion():
+    async def run():
+        cache = SimilarityCache(None, steps=("master.guidance",))
+        calls = []
+
+        async def call(record):
+            content = cache.get("master.guidance", _prompt(record), record)
+            if content is None:
+                content = await cache.join("master.guidance", _prompt(record), record)
+            if content is not None:
+                return content
+            flight = cache.begin("master.guidance", _prompt(record), record)
+            calls.append(record["name"])
+            await asyncio.sleep(0.05)
+            content = f"Call {record['name']} on her birthday."
+            cache.put("master.guidance", _prompt(record), record, content, 60)
+            cache.finish(flight, content)
+            return content
+
+        results = await asyncio.gather(*(call(_person(name)) for name in ("Emma Smith", "Lily Jones", "Ava Brown")))
+        assert calls == ["Emma Smith"]
+        assert results[1] == "Call Lily Jones on her birthday."
+        assert cache.stats["coalesced"] == 2
+
+    asyncio.run(run())
+
+
+def test_failed_flight_lets_followers_generate_their_own():
+    async def run():
+        cache = SimilarityCache(None, steps=("master.guidance",))
+        leader = _person("Emma Smith")
+        flight = cache.begin("master.guidance", _prompt(leader), leader)
+        follower = asyncio.ensure_future(cache.join("master.guidance", _prompt(_person("Lily Jones")),
+                                                    _person("Lily Jones")))
+        await asyncio.sleep(0)
+        cache.finish(flight, None)
+        assert await follower is None
+        assert await cache.join("master.guidance", _prompt(leader), leader) is None
+
+    asyncio.run(run())
+
+
+def test_persisted_rows_are_capped(tmp_path):
+    path = str(tmp_path / "similar.sqlite3")
+    cache = SimilarityCache(path, steps=("master.guidance",), max_entries=5)
+    for i in range(120):
+        record = _person(f"Person{i} Smith")
+        cache.put("master.guidance", f"prompt number {i} " * 5, record, f"text {i}", 60)
+    cache.close()
+    reopened = SimilarityCache(path, steps=("master.guidance",), max_entries=5)
+    assert reopened._db.execute("SELECT COUNT(*) FROM similar_completions").fetchone()[0] == 5
+    assert reopened.get_stats()["entries"] == 5
+    reopened.close()
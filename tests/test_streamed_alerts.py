@@ -0,0 +1,65 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+
+from agents.fake_backend import FakeBackend
+from agents.llm_transport import LLMTransport
+from main import FamilyConnectionOrchestrator
+
+
+def _orchestrator(data_file):
+    transport = LLMTransport(FakeBackend(seed=1, time_scale=0.01))
+    return FamilyConnectionOrchestrator(
+        "offline", transport=transport, data_file_path=str(data_file), cache_path=None, ledger_path=None,
+        interaction_log_path=None, precompute_path=None, person_memory_path=None, checkpoint_path=None,
+        similarity_cache_path=None, streaming=True
+    )
+
+
+def _birthdays(tmp_path, count, day):
+    path = tmp_path / "birthdays.json"
+    path.write_text(json.dumps({"birthdays": [
+        {"name": f"Person{i}", "relationship": "granddaughter", "date": f"2016-{day.month:02d}-{day.day:02d}", "age": 8}
+        for i in range(count)
+    ]}))
+    return path
+
+
+def test_streamed_birthdays_are_analyzed_in_batches(tmp_path):
+    data_file = _birthdays(tmp_path, 25, date.today())
+
+    async def run():
+        orchestrator = _orchestrator(data_file)
+        memory = orchestrator.agents["memory"]
+        llm_call = memory.llm_call
+        batches = []
+
+        async def counting(prompt, step=None, *args, **kwargs):
+            if step == "memory.analysis":
+                # One per person, plus the reply format's example
+                batches.append(prompt.count('"person_id"') - 1)
+            return await llm_call(prompt, step, *args, **kwargs)
+
+        memory.llm_call = counting
+        results = await memory.check_and_alert()
+        await orchestrator.close()
+        return results, batches
+
+    results, batches = asyncio.run(run())
+    assert len(results) == 25 and all(result.ok for result in results)
+    assert sorted(batches) == [5, 10, 10]
+
+
+def test_streamed_monitoring_builds_no_index(tmp_path):
+    tomorrow = date.today() + timedelta(days=1)
+    data_file = _birthdays(tmp_path, 3, tomorrow)
+    orchestrator = _orchestrator(data_file)
+    memory = orchestrator.agents["memory"]
+    now = datetime.combine(date.today(), datetime.min.time())
+    assert memory.seconds_until_next_check(now) == 24 * 3600
+    memory._data_changed()
+    assert not memory._data_changed()
+    data_file.write_text(data_file.read_text() + "\n")
+    assert memory._data_changed()
+    assert memory.store._signature is None
+    asyncio.run(orchestrator.close())
@@ -0,0 +1,47 @@
+import asyncio
+import json
+from datetime import date
+
+from agents.base_agent import streaming_tokens
+from agents.cascade_scheduler import current_cascade
+from agents.fake_backend import FakeBackend
+from agents.llm_transport import LLMTransport
+from main import FamilyConnectionOrchestrator
+
+
+def test_streamed_tokens_reach_only_the_context_that_asked_for_them(tmp_path):
+    today = date.today()
+    data_file = tmp_path / "birthdays.json"
+    data_file.write_text(json.dumps({"birthdays": [
+        {"name": name, "relationship": "granddaughter", "date": f"2016-{today.month:02d}-{today.day:02d}", "age": 8}
+        for name in ("Emma", "Lily")
+    ]}))
+
+    async def run():
+        transport = LLMTransport(FakeBackend(seed=1, time_scale=0.01))
+        orchestrator = FamilyConnectionOrchestrator(
+            "offline", transport=transport, data_file_path=str(data_file), cache_path=None, ledger_path=None,
+            interaction_log_path=None, precompute_path=None, person_memory_path=None, checkpoint_path=None,
+            similarity_cache_path=None
+        )
+        younger = orchestrator.agents["younger_relative"]
+        streamed, other = [], []
+
+        async def session():
+            with streaming_tokens(lambda agent, step, delta: streamed.append((current_cascade.get(), step)),
+                                  {"younger.insights"}):
+                return await orchestrator.agents["memory"].check_and_alert()
+
+        async def other_caller():
+            with streaming_tokens(lambda agent, step, delta: other.append(step), {"elderly.reminder"}):
+                await asyncio.sleep(0)
+            return await younger.llm_call("Suggest a gift for a cousin", step="younger.insights")
+
+        results, _ = await asyncio.gather(session(), other_caller())
+        await orchestrator.close()
+        return results, streamed, other, younger.token_listeners
+
+    results, streamed, other, listeners = asyncio.run(run())
+    assert {step for _, step in streamed} == {"younger.insights"}
+    assert {cascade for cascade, _ in streamed} == {result.cascade_id for result in results}
+    assert other == [] and listeners == []
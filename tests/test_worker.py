@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+from agents.cascade_scheduler import current_cascade
+from agents.fake_backend import FakeBackend
+from agents.interaction_log import InteractionLog
+from agents.job_queue import DONE, QUEUED, RUNNING, JobQueue
+from agents.llm_transport import LLMTransport
+from agents.younger_relative_agent import YoungerRelativeAgent
+import worker
+
+
+def test_for_cascades_leaves_out_other_workers_entries(tmp_path):
+    path = str(tmp_path / "interactions.sqlite3")
+    mine, theirs = InteractionLog(path), InteractionLog(path)
+    mine.append("master", {"type": "alert", "who": "mine"}, cascade="a@1")
+    theirs.append("master", {"type": "alert", "who": "theirs"}, cascade="b@1")
+    mine.append("master", {"type": "untagged"})
+    assert [entry["who"] for entry in mine.for_cascades("master", ["a@1"])] == ["mine"]
+    assert mine.for_cascades("master", []) == []
+    memory = InteractionLog(None)
+    memory.append("master", {"who": "mine"}, cascade="a@1")
+    memory.append("master", {"who": "theirs"}, cascade="b@1")
+    assert [entry["who"] for entry in memory.for_cascades("master", ["a@1"])] == ["mine"]
+
+
+def test_heartbeat_keeps_a_long_job_from_being_requeued(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+    job_id = queue.enqueue("slow")
+    queue.claim("w1")
+    time.sleep(0.2)
+    assert queue.heartbeat(job_id, "w1")
+    assert queue.requeue_stale(0.1) == 0
+    time.sleep(0.2)
+    assert queue.requeue_stale(0.1) == 1
+    assert queue.get(job_id)["status"] == QUEUED
+    assert not queue.heartbeat(job_id, "w1")
+
+
+def test_worker_renews_its_claim_while_the_job_runs(tmp_path, monkeypatch):
+    async def slow_job(orchestrator, payload):
+        await asyncio.sleep(0.5)
+        return {"ok": True}
+
+    monkeypatch.setitem(worker.JOB_HANDLERS, "slow", slow_job)
+
+    async def run():
+        queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+        job_id = queue.enqueue("slow")
+        first = asyncio.ensure_future(worker.run_worker(None, queue, "w1", poll_interval=0.02, stale_after=0.15))
+        second = asyncio.ensure_future(worker.run_worker(None, queue, "w2", poll_interval=0.02, stale_after=0.15))
+        await asyncio.sleep(0.3)
+        job = queue.get(job_id)
+        assert job["status"] == RUNNING and job["worker"] == "w1"
+        await asyncio.sleep(0.4)
+        first.cancel()
+        second.cancel()
+        assert queue.get(job_id)["status"] == DONE
+
+    asyncio.run(run())
+
+
+def test_worker_stops_a_job_whose_claim_was_taken_over(tmp_path, monkeypatch):
+    events = []
+
+    async def slow_job(orchestrator, payload):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        events.append("finished")
+
+    monkeypatch.setitem(worker.JOB_HANDLERS, "slow", slow_job)
+
+    async def run():
+        queue = JobQueue(str(tmp_path / "queue.sqlite3"))
+        job_id = queue.enqueue("slow")
+        first = asyncio.ensure_future(worker.run_worker(None, queue, "w1", poll_interval=0.02, stale_after=0.15))
+        await asyncio.sleep(0.07)
+        # Another worker took the job over (as if w1 had stalled past stale_after)
+        assert queue.requeue_stale(0) == 1
+        assert queue.claim("w2")["id"] == job_id
+        await asyncio.sleep(0.1)
+        first.cancel()
+        assert events == ["cancelled"]
+        job = queue.get(job_id)
+        assert job["status"] == RUNNING and job["worker"] == "w2"
+
+    asyncio.run(run())
+
+
+def test_late_suggestions_are_written_to_the_persisted_log(tmp_path):
+    path = str(tmp_path / "interactions.sqlite3")
+    log = InteractionLog(path)
+    agent = YoungerRelativeAgent("offline", transport=LLMTransport(FakeBackend(seed=1, time_scale=0.01)),
+                                 interaction_log=log)
+    log.append("younger_relative", {"who": "mine"}, cascade="a@1")
+    log.append("younger_relative", {"who": "theirs"}, cascade="b@1")
+
+    async def run():
+        current_cascade.set("a@1")
+        await agent.generate_suggestions("Lovely", {"birthday_info": {"name": "Emma"}}, "She was happy")
+
+    asyncio.run(run())
+    log.close()
+    entries = {entry["who"]: entry for entry in InteractionLog(path).page("younger_relative")}
+    assert entries["mine"]["suggestions"]
+    assert "suggestions" not in entries["theirs"]
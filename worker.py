@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict
+from agents.job_queue import JobQueue
+from agents.logging_setup import configure_logging
+from main import FamilyConnectionOrchestrator, create_orchestrator_from_env
+
+logger = logging.getLogger(__name__)
+
+# Job kinds enqueued by the dashboard (or by cron, for precompute)
+TRIGGER_REMINDERS = "trigger_reminders"
+ANALYZE_TODAY = "analyze_todays_birthdays"
+PRECOMPUTE = "precompute_reminders"
+
+
+async def trigger_reminders(orchestrator: FamilyConnectionOrchestrator, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Run today's birthday cascades and return the interactions they produced"""
+    interactions = orchestrator.interactions
+    # Entries are tagged with their cascade, so other workers sharing the log are left out
+    results = await orchestrator.agents["memory"].check_and_alert()
+    cascades = [result.cascade_id for result in results]
+    # This job's cascades only; the ledger's total covers every job this worker ran
+    token_usage: Dict[str, int] = {}
+    for cascade in cascades:
+        for key, value in orchestrator.transport.usage.cascade_usage(cascade).items():
+            token_usage[key] = token_usage.get(key, 0) + value
+    return {
+        "master_log": interactions.for_cascades("master", cascades),
+        "elderly_responses": interactions.for_cascades("elderly", cascades),
+        "notifications": interactions.for_cascades("younger_relative", cascades),
+        "token_usage": token_usage
+    }
+
+
+async def analyze_todays_birthdays(orchestrator: FamilyConnectionOrchestrator, payload: Dict[str, Any]) -> Dict[str, Any]:
+    birthdays = await orchestrator.agents["memory"].analyze_todays_birthdays()
+    return {"day": payload.get("day", date.today().isoformat()), "birthdays": birthdays}
+
+
+async def precompute_reminders(orchestrator: FamilyConnectionOrchestrator, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate the coming days' reminders ahead of time (payload: optional ``days``)"""
+    return await orchestrator.agents["memory"].precompute(int(payload.get("days", 7)))
+
+
+JOB_HANDLERS: Dict[str, Callable[[FamilyConnectionOrchestrator, Dict[str, Any]], Awaitable[Any]]] = {
+    TRIGGER_REMINDERS: trigger_reminders,
+    ANALYZE_TODAY: analyze_todays_birthdays,
+    PRECOMPUTE: precompute_reminders,
+}
+
+
+async def _keep_claim(job_queue: JobQueue, job_id: int, worker_id: str, interval: float, job: asyncio.Future):
+    """Renew the claim on a running job every ``interval`` seconds; cancel ``job`` once the claim is lost"""
+    while True:
+        await asyncio.sleep(interval)
+        if not await asyncio.to_thread(job_queue.heartbeat, job_id, worker_id):
+            logger.warning("Worker %s: Job #%s was handed to another worker, stopping it", worker_id, job_id)
+            job.cancel()
+            return
+
+
+async def run_worker(orchestrator: FamilyConnectionOrchestrator, job_queue: JobQueue, worker_id: str,
+                     poll_interval: float = 1.0, stale_after: float = 60.0):
+    """Claim and run queued jobs until cancelled.
+
+    A running job's claim is renewed several times per ``stale_after``
+    seconds, however long the job takes. Jobs whose worker has not renewed
+    for ``stale_after`` seconds (it died) are requeued, checked as often as
+    claims are renewed. A job whose claim was lost anyway (e.g. this worker
+    stalled) is cancelled and left to the worker that now holds it.
+    """
+    heartbeat_interval = stale_after / 3
+    loop = asyncio.get_running_loop()
+    next_requeue = loop.time()
+    logger.info("Worker %s: Waiting for jobs on %s", worker_id, job_queue.path)
+    while True:
+        if loop.time() >= next_requeue:
+            requeued = await asyncio.to_thread(job_queue.requeue_stale, stale_after)
+            if requeued:
+                logger.info("Worker %s: Requeued %s jobs abandoned by another worker", worker_id, requeued)
+            next_requeue = loop.time() + heartbeat_interval
+        job = await asyncio.to_thread(job_queue.claim, worker_id)
+        if job is None:
+            await asyncio.sleep(poll_interval)
+            continue
+
+        handler = JOB_HANDLERS.get(job["kind"])
+        logger.info("Worker %s: Running job #%s (%s)", worker_id, job['id'], job['kind'])
+        if handler is None:
+            await asyncio.to_thread(job_queue.fail, job["id"], f"Unknown job kind {job['kind']!r}")
+            continue
+        running = asyncio.ensure_future(handler(orchestrator, job["payload"]))
+        keep_claim = asyncio.ensure_future(_keep_claim(job_queue, job["id"], worker_id, heartbeat_interval, running))
+        try:
+            result = await running
+        except asyncio.CancelledError:
+            if not keep_claim.done() or keep_claim.cancelled():
+                # This worker is being stopped
+                raise
+            continue
+        except Exception as e:
+            logger.warning("Worker %s: Job #%s failed: %s", worker_id, job['id'], e)
+            await asyncio.to_thread(job_queue.fail, job["id"], str(e))
+        else:
+            await asyncio.to_thread(job_queue.complete, job["id"], result)
+        finally:
+            keep_claim.cancel()
+
+
+async def main():
+    """Headless worker: owns the agents and serves jobs enqueued by dashboards"""
+    configure_logging(os.getenv("LOG_LEVEL", "INFO"), os.getenv("TRACE_PATH"))
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        print("Error: OPENAI_API_KEY environment variable not set")
+        return
+
+    orchestrator = create_orchestrator_from_env(openai_api_key)
+    job_queue = JobQueue(os.getenv("FAMILY_WORKER_QUEUE", "data/job_queue.sqlite3"))
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    try:
+        await run_worker(orchestrator, job_queue, worker_id,
+                         poll_interval=float(os.getenv("WORKER_POLL_INTERVAL", "1.0")),
+                         stale_after=float(os.getenv("WORKER_STALE_AFTER", "60")))
+    finally:
+        await orchestrator.close()
+        job_queue.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass